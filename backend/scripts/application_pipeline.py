@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Tuple
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from llm_resilience import resilience_stats
+from rate_limiter import rate_limit_stats
+from llm_telemetry import telemetry_labels
+from llm_service import generate_text_async, usage_stats
+from prompt_context import read_resume
+from resume_tailor import resume_tailor
+from resume_sections import PatchError
+from cover_letter_generator import cover_letter_generator
+from latex_compiler import LatexCompileService, get_compile_service
+
+logger = logging.getLogger(__name__)
+
+
+class application_pipeline:
+    """
+    Produces a full application package for one job: tailored resume and cover letter,
+    as LaTeX and PDF.
+
+    Both LLM calls run concurrently, and each document is saved and queued for compiling
+    as soon as its own reply arrives, so the package takes about as long as the slower
+    document's generation plus its compile rather than the sum of every stage.
+    """
+    def __init__(
+        self,
+        tailor: Optional[resume_tailor] = None,
+        cover_letters: Optional[cover_letter_generator] = None,
+        compile_service: Optional[LatexCompileService] = None
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            tailor: Resume tailor to use, a new one by default
+            cover_letters: Cover letter generator to use, a new one by default
+            compile_service: Compile service to use, e.g. the worker's shared one; a new one
+                with temp dir LATEX_TEMP_DIR by default
+        """
+        self.tailor = tailor or resume_tailor()
+        self.cover_letters = cover_letters or cover_letter_generator()
+        self.compile_service = compile_service or get_compile_service()
+
+    async def generate_document(
+        self,
+        name: str,
+        request: Dict[str, Any],
+        finish: Callable[[str], str],
+        output_path: str,
+        compile_pdf: bool,
+        llm_provider: str,
+        api_key: Optional[str],
+        model: str,
+        compile_options: Optional[Dict[str, Any]] = None,
+        fallback_request: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Generate, save and compile one document.
+
+        compile_options are passed to LatexCompileService.compile_document, e.g. max_pages.
+        The .tex file is rewritten when the compile repaired or shortened the source. When
+        finish raises PatchError, fallback_request is sent instead and its reply used as is.
+
+        Returns:
+            Tuple of (result with tex_path, pdf_path, pages and error, stage timings in seconds)
+        """
+        result: Dict[str, Any] = {'tex_path': None, 'pdf_path': None, 'pages': None, 'error': None}
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        try:
+            with telemetry_labels(task=name):
+                reply = await generate_text_async(provider=llm_provider, model=model, api_key=api_key, **request)
+            try:
+                content = finish(reply)
+            except PatchError as e:
+                if fallback_request is None:
+                    raise
+                logger.warning(f"Could not apply the model's patch, generating the whole {name.replace('_', ' ')} instead: {e}")
+                with telemetry_labels(task=name):
+                    content = await generate_text_async(
+                        provider=llm_provider, model=model, api_key=api_key, **fallback_request
+                    )
+            timings[f"{name}_generate"] = time.perf_counter() - start
+
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, 'w') as f:
+                f.write(content)
+            result['tex_path'] = output_path
+
+            if compile_pdf:
+                compile_start = time.perf_counter()
+                output_dir, filename = os.path.split(output_path)
+                future = self.compile_service.submit_document(
+                    content, output_dir, os.path.splitext(filename)[0], **(compile_options or {})
+                )
+                compiled = await asyncio.wrap_future(future)
+                result['pdf_path'], result['pages'] = compiled.pdf_path, compiled.pages
+                timings[f"{name}_compile"] = time.perf_counter() - compile_start
+                if compiled.latex_content != content:
+                    # Keep the .tex file in step with the PDF
+                    with open(output_path, 'w') as f:
+                        f.write(compiled.latex_content)
+                if result['pdf_path'] is None:
+                    result['error'] = 'LaTeX compilation failed'
+        except Exception as e:
+            logger.error(f"Generating the {name.replace('_', ' ')} failed: {e}")
+            result['error'] = str(e)
+        return result, timings
+
+    async def generate_application(
+        self,
+        job_data: Dict[str, Any],
+        llm_provider: str,
+        api_key: Optional[str],
+        resume_path: str,
+        output_dir: str,
+        model: str = "gpt-4-turbo-preview",
+        incremental: bool = True,
+        compile_pdf: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Generate a tailored resume and cover letter for a job, and compile both to PDF.
+
+        A failure in one document is reported in its result and does not stop the other.
+
+        Args:
+            job_data: Dictionary containing job details
+            llm_provider: Name of the LLM provider to use
+            api_key: API key for the LLM provider
+            resume_path: Path to the base resume
+            output_dir: Directory to save the documents in
+            model: Model name to use for both documents
+            incremental: Tailor only the resume's bullet points, as in resume_tailor
+            compile_pdf: Compile both documents to PDF next to their .tex files, fitting each to one page
+
+        Returns:
+            Dict with 'resume' and 'cover_letter' results (tex_path, pdf_path, error) and
+            'timings', the seconds spent in each stage and in total
+        """
+        start = time.perf_counter()
+        resume_content = read_resume(resume_path)
+        if compile_pdf:
+            # A patched resume keeps the base preamble, so its format can be built while the models write
+            self.compile_service.executor.submit(self.compile_service.prepare, resume_content)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        resume_request, finish_resume = self.tailor.create_generation_request(job_data, resume_content, incremental)
+        full_resume_request, _ = self.tailor.create_generation_request(job_data, resume_content, incremental=False)
+        cover_letter_request = self.cover_letters.create_generation_request(job_data, resume_content)
+        (resume, resume_timings), (cover_letter, cover_letter_timings) = await asyncio.gather(
+            self.generate_document(
+                'resume', {'temperature': 0.7, **resume_request}, finish_resume,
+                os.path.join(output_dir, f"tailored_resume_{timestamp}.tex"),
+                compile_pdf, llm_provider, api_key, model,
+                {'max_pages': 1, 'priority_text': job_data.get('description')},
+                {'temperature': 0.7, **full_resume_request}
+            ),
+            self.generate_document(
+                'cover_letter', cover_letter_request, lambda text: text,
+                os.path.join(output_dir, self.cover_letters.output_filename(job_data, timestamp)),
+                compile_pdf, llm_provider, api_key, model,
+                {'max_pages': 1}
+            )
+        )
+
+        timings = {**resume_timings, **cover_letter_timings, 'total': time.perf_counter() - start}
+        logger.info("Application timings: " + ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+        return {
+            'resume': resume,
+            'cover_letter': cover_letter,
+            'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()}
+        }
+
+
+if __name__ == '__main__':
+
+    # Logs go to stderr so stdout stays machine-readable
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    parser = argparse.ArgumentParser(description='Generate a tailored resume and cover letter and compile both to PDF')
+    parser.add_argument('--job-data', type=str, required=True, help='JSON string of job data')
+    parser.add_argument('--llm-provider', type=str, required=True, help='LLM provider to use')
+    parser.add_argument('--model', type=str, default='gpt-4-turbo-preview', help='Model to use')
+    parser.add_argument('--api-key', type=str, help='API key for the LLM provider')
+    parser.add_argument('--primary-resume', type=str, required=True, help='Path to primary resume')
+    parser.add_argument('--output-dir', type=str, required=True, help='Output directory')
+    parser.add_argument('--full-document', action='store_true',
+                        help='Send the whole resume to the model instead of only its bullet points')
+    parser.add_argument('--no-compile', action='store_true', help='Only write the .tex files')
+
+    args = parser.parse_args()
+
+    try:
+        pipeline = application_pipeline()
+        result = asyncio.run(pipeline.generate_application(
+            job_data=json.loads(args.job_data),
+            llm_provider=args.llm_provider,
+            api_key=args.api_key,
+            resume_path=args.primary_resume,
+            output_dir=args.output_dir,
+            model=args.model,
+            incremental=not args.full_document,
+            compile_pdf=not args.no_compile
+        ))
+        pipeline.compile_service.shutdown()
+    except Exception as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    usage_stats.log_stats()
+    resilience_stats.log_stats()
+    rate_limit_stats.log_stats()
+    print(json.dumps(result))
+    if result['resume']['error'] and result['cover_letter']['error']:
+        sys.exit(1)
@@ -0,0 +1,114 @@
+"""
+Compare producing an application package stage by stage against the combined pipeline.
+
+The sequential run does what the separate scripts do today: tailor the resume, compile
+it, write the cover letter, compile it. The pipeline run calls
+application_pipeline.generate_application. Both use a local stub of the OpenAI chat
+completions endpoint that decodes at a fixed rate (see bench_incremental_tailor). When
+pdflatex is not installed, or with --simulate-compile, compiles are replaced by a fixed
+delay so the overlap can still be measured.
+
+Usage: python benchmarks/bench_application_pipeline.py [--tokens-per-second N] [--simulate-compile SECONDS]
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from bench_incremental_tailor import JOB_DATA, StubHandler, make_resume
+from latex_compiler import LatexCompileService
+
+class SimulatedCompileService(LatexCompileService):
+    """Compile service whose compiles take a fixed time and write an empty PDF"""
+    delay = 1.0
+
+    def prepare(self, template_content):
+        return None
+
+    def compile_once(self, latex_content, output_dir, output_filename):
+        time.sleep(self.delay)
+        output_pdf = os.path.join(output_dir, f"{output_filename}.pdf")
+        open(output_pdf, 'wb').close()
+        return output_pdf, 1
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the combined application pipeline')
+    parser.add_argument('--tokens-per-second', type=float, default=200.0, help='Simulated decoding speed')
+    parser.add_argument('--simulate-compile', type=float,
+                        help='Replace pdflatex with a compile of this many seconds; used by default without pdflatex')
+    args = parser.parse_args()
+
+    StubHandler.tokens_per_second = args.tokens_per_second
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ['LLM_RESPONSE_CACHE'] = '0'
+    # Both runs compile the same documents, so a PDF cache would hand the second its PDFs
+    os.environ['LATEX_PDF_CACHE'] = '0'
+
+    from application_pipeline import application_pipeline
+
+    work_dir = tempfile.mkdtemp(prefix='bench_application_')
+    resume_path = os.path.join(work_dir, 'resume.tex')
+    with open(resume_path, 'w') as f:
+        f.write(make_resume(entries=6))
+
+    simulate = args.simulate_compile
+    if simulate is None and shutil.which('pdflatex') is None:
+        simulate = 1.0
+    if simulate is not None:
+        SimulatedCompileService.delay = simulate
+        compile_service = SimulatedCompileService(temp_dir=os.path.join(work_dir, 'temp'))
+        print(f"Compiles simulated at {simulate:.1f}s each")
+    else:
+        compile_service = LatexCompileService(temp_dir=os.path.join(work_dir, 'temp'))
+        # Build the resume format up front so neither run pays for it
+        compile_service.prepare(make_resume(entries=6))
+    pipeline = application_pipeline(compile_service=compile_service)
+
+    # Sequential: one stage after another, as the separate scripts run
+    start = time.perf_counter()
+    stages = {}
+    stage_start = time.perf_counter()
+    resume = pipeline.tailor.tailor_resume(resume_path, JOB_DATA, api_key='sk-bench')
+    stages['resume_generate'] = time.perf_counter() - stage_start
+    stage_start = time.perf_counter()
+    compile_service.compile_latex_to_pdf(resume, work_dir, 'sequential_resume')
+    stages['resume_compile'] = time.perf_counter() - stage_start
+    stage_start = time.perf_counter()
+    cover_letter = pipeline.cover_letters.generate_cover_letter(resume_path, JOB_DATA, api_key='sk-bench')
+    stages['cover_letter_generate'] = time.perf_counter() - stage_start
+    stage_start = time.perf_counter()
+    compile_service.compile_latex_to_pdf(cover_letter, work_dir, 'sequential_cover_letter')
+    stages['cover_letter_compile'] = time.perf_counter() - stage_start
+    sequential = time.perf_counter() - start
+
+    result = asyncio.run(pipeline.generate_application(
+        job_data=JOB_DATA,
+        llm_provider='openai',
+        api_key='sk-bench',
+        resume_path=resume_path,
+        output_dir=os.path.join(work_dir, 'pipeline')
+    ))
+    for document in ('resume', 'cover_letter'):
+        assert result[document]['error'] is None, result[document]['error']
+
+    print(f"{'stage':<24} {'sequential s':>13} {'pipeline s':>11}")
+    for stage, seconds in stages.items():
+        print(f"{stage:<24} {seconds:>13.2f} {result['timings'][stage]:>11.2f}")
+    print(f"{'total':<24} {sequential:>13.2f} {result['timings']['total']:>11.2f}")
+    print(f"{'slowest stage':<24} {max(stages.values()):>13.2f}")
+    compile_service.shutdown()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
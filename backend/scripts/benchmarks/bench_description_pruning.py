@@ -0,0 +1,88 @@
+"""
+Measure prompt tokens before and after job description pruning on the stored sample jobs.
+
+Builds the whole-document tailoring prompt, the bullet-point patch prompt and the cover
+letter prompt for every distinct backend/data/temp/job_data_*.json, once with pruning
+off (JOB_DESCRIPTION_TOKEN_BUDGET=0) and once with the default budget. Token counts are
+estimated at 4 characters per token.
+
+Usage: python benchmarks/bench_description_pruning.py [--resume resume.tex] [--budget N]
+"""
+import os
+import sys
+import json
+import glob
+import argparse
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from job_description import estimate_tokens, DEFAULT_TOKEN_BUDGET
+from resume_sections import create_patch_instructions
+from prompt_context import get_context
+from resume_tailor import resume_tailor
+from cover_letter_generator import cover_letter_generator
+from bench_incremental_tailor import make_resume
+
+JOBS_GLOB = os.path.join(script_dir, '..', 'data', 'temp', 'job_data_*.json')
+
+def load_jobs():
+    """Distinct sample jobs; the directory holds many copies of the same few postings"""
+    jobs = {}
+    for path in sorted(glob.glob(JOBS_GLOB)):
+        with open(path, 'r') as f:
+            job = json.load(f)
+        jobs.setdefault(job.get('description', ''), job)
+    return list(jobs.values())
+
+def patch_prompt(job, resume):
+    context = get_context(resume, job)
+    return context.bullets_prefix() + context.job_details() + create_patch_instructions(job)
+
+def prompt_tokens(tailor, cover_letters, job, resume):
+    # The backend fills requirements with the description for cover letters
+    cover_job = {**job, 'location': job.get('location') or {}, 'requirements': job.get('description', '')}
+    return {
+        'tailor': estimate_tokens(tailor.create_tailoring_prompt(job, resume)),
+        'patch': estimate_tokens(patch_prompt(job, resume)),
+        'cover letter': estimate_tokens(cover_letters.create_cover_letter_prompt(cover_job, resume))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure prompt tokens with and without description pruning')
+    parser.add_argument('--resume', type=str, help='LaTeX resume to build prompts with; a generated one by default')
+    parser.add_argument('--budget', type=int, default=DEFAULT_TOKEN_BUDGET, help='Description token budget')
+    args = parser.parse_args()
+
+    if args.resume:
+        with open(args.resume, 'r') as f:
+            resume = f.read()
+    else:
+        resume = make_resume()
+
+    jobs = load_jobs()
+    if not jobs:
+        raise SystemExit(f"No sample jobs found at {JOBS_GLOB}")
+
+    tailor = resume_tailor()
+    cover_letters = cover_letter_generator()
+    totals = {}
+    print(f"{'job':<40} {'prompt':<13} {'before':>7} {'after':>7} {'saved':>6}")
+    for job in jobs:
+        os.environ['JOB_DESCRIPTION_TOKEN_BUDGET'] = '0'
+        before = prompt_tokens(tailor, cover_letters, job, resume)
+        os.environ['JOB_DESCRIPTION_TOKEN_BUDGET'] = str(args.budget)
+        after = prompt_tokens(tailor, cover_letters, job, resume)
+        for name in before:
+            print(f"{job.get('title', '')[:40]:<40} {name:<13} {before[name]:>7} {after[name]:>7} "
+                  f"{1 - after[name] / before[name]:>6.0%}")
+            total_before, total_after = totals.get(name, (0, 0))
+            totals[name] = (total_before + before[name], total_after + after[name])
+
+    print(f"\n{len(jobs)} distinct jobs, description budget {args.budget} tokens")
+    for name, (before, after) in totals.items():
+        print(f"{'total':<40} {name:<13} {before:>7} {after:>7} {1 - after / before:>6.0%}")
+
+if __name__ == "__main__":
+    main()
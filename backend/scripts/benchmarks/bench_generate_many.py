@@ -0,0 +1,99 @@
+"""
+Check that generate_many keeps request order and holds each provider's concurrency limit.
+
+Two fake providers registered in PROVIDERS answer after a delay without touching the
+network, and record how many of their calls are in flight at once. Later requests get
+shorter delays, so replies finish out of order. The batch mixes both providers, with a
+limit for each, and one request that fails. The check asserts that:
+
+- replies come back in request order
+- no provider ever has more calls in flight than its limit, and each reaches it
+- with return_exceptions, the failed request returns its exception in its place
+
+Then reports the batch time against running the requests one after another.
+
+Usage: python benchmarks/bench_generate_many.py [--requests N] [--delay S]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from llm_service import LLMProvider, PROVIDERS, generate_many
+
+class ConcurrencyRecordingProvider(LLMProvider):
+    """Replies after the delay given in the request and records its busiest moment"""
+    name = 'fake'
+    in_flight = {}
+    most_in_flight = {}
+
+    async def agenerate(self, prompt, model, system_prompt=None, temperature=0.7, max_tokens=None, cached_prefix=None, **kwargs):
+        counts = ConcurrencyRecordingProvider.in_flight
+        counts[self.name] = counts.get(self.name, 0) + 1
+        most = ConcurrencyRecordingProvider.most_in_flight
+        most[self.name] = max(most.get(self.name, 0), counts[self.name])
+        try:
+            await asyncio.sleep(kwargs['delay'])
+            if prompt == 'fail':
+                raise ValueError('the fake provider rejected this prompt')
+            return f"{self.name} reply to {prompt}"
+        finally:
+            counts[self.name] -= 1
+
+class OtherRecordingProvider(ConcurrencyRecordingProvider):
+    name = 'fake_other'
+
+def make_batch(requests: int, delay: float):
+    batch = []
+    for index in range(requests):
+        provider = 'fake' if index % 3 else 'fake_other'
+        # Later requests finish sooner, so completion order is the reverse of request order
+        batch.append({'prompt': f"prompt {index}", 'provider': provider, 'model': 'fake-model',
+                      'delay': delay * (1 + (requests - index) / requests)})
+    batch[requests // 2]['prompt'] = 'fail'
+    return batch
+
+def main():
+    parser = argparse.ArgumentParser(description='Check ordering and concurrency limits in generate_many')
+    parser.add_argument('--requests', type=int, default=30, help='Requests in the batch')
+    parser.add_argument('--delay', type=float, default=0.05, help='Seconds each fake call takes, roughly')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    PROVIDERS['fake'] = ConcurrencyRecordingProvider
+    PROVIDERS['fake_other'] = OtherRecordingProvider
+    os.environ.update({'FAKE_API_KEY': 'fake', 'FAKE_OTHER_API_KEY': 'fake', 'LLM_RESPONSE_CACHE': '0'})
+    limits = {'fake': 3, 'fake_other': 2}
+
+    batch = make_batch(args.requests, args.delay)
+    start = time.perf_counter()
+    results = asyncio.run(generate_many(batch, concurrency=limits, return_exceptions=True))
+    elapsed = time.perf_counter() - start
+
+    failures = []
+    for index, (request, result) in enumerate(zip(batch, results)):
+        if request['prompt'] == 'fail':
+            if not isinstance(result, ValueError):
+                failures.append(f"request {index} should have returned its ValueError, got {result!r}")
+        elif result != f"{request['provider']} reply to {request['prompt']}":
+            failures.append(f"request {index} got {result!r}")
+    most = ConcurrencyRecordingProvider.most_in_flight
+    for provider, limit in limits.items():
+        print(f"{provider:<11} limit {limit}, most in flight {most.get(provider, 0)}")
+        if most.get(provider, 0) != limit:
+            failures.append(f"{provider} had {most.get(provider, 0)} calls in flight with a limit of {limit}")
+
+    sequential = sum(request['delay'] for request in batch)
+    print(f"{len(batch)} requests in {elapsed:.2f}s, {sequential:.2f}s one after another")
+    if failures:
+        raise SystemExit('generate_many check failed:\n' + '\n'.join(failures))
+    print('replies in request order, failed request returned its exception: ok')
+
+if __name__ == "__main__":
+    main()
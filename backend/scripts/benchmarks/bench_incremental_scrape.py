@@ -0,0 +1,104 @@
+"""
+Compare repeated full-window searches with incremental ones that use scrape watermarks.
+
+Replaces jobspy's scrape_jobs with a fake job board where postings appear at a steady
+rate, and which costs a fixed time per posting returned (as LinkedIn does when it fetches
+each description). A clock that can be moved forward stands in for time.time, so the
+same search can be repeated hours apart without waiting. Each round reports the window
+requested, the postings the board returned, how many were written as new and how many
+the watermark skipped, and how long the round took.
+
+Usage: python benchmarks/bench_incremental_scrape.py [--rounds N] [--hours-between N] [--per-hour N]
+"""
+import io
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+import pandas as pd
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+import scrape_jobs
+import scrape_watermark
+
+class MovableClock:
+    """The time module, with time() shifted by a settable number of hours"""
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self):
+        return time.time() + self.offset
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+class FakeJobBoard:
+    """Postings arrive every 3600 / per_hour seconds; each one returned costs fetch_seconds"""
+    def __init__(self, clock: MovableClock, per_hour: int, fetch_seconds: float):
+        self.clock = clock
+        self.per_hour = per_hour
+        self.fetch_seconds = fetch_seconds
+        self.start = clock.time() - 100 * 3600
+        self.returned = 0
+        self.windows = []
+
+    def scrape_jobs(self, site_name, search_term, location, results_wanted, hours_old, **kwargs):
+        now = self.clock.time()
+        interval = 3600 / self.per_hour
+        newest = int((now - self.start) // interval)
+        oldest = max(0, int((now - hours_old * 3600 - self.start) // interval) + 1)
+        numbers = list(range(newest, oldest - 1, -1))[:results_wanted]
+        time.sleep(self.fetch_seconds * len(numbers))
+        self.returned += len(numbers)
+        self.windows.append(hours_old)
+        return pd.DataFrame({
+            'site': site_name[0],
+            'title': [f"{search_term} {number}" for number in numbers],
+            'company': [f"Company {number % 40}" for number in numbers],
+            'job_url': [f"https://example.com/{site_name[0]}/jobs/{number}" for number in numbers],
+            'description': [f"Posting {number} for {search_term} in {location}, with a long description." for number in numbers],
+        })
+
+def run_rounds(incremental, rounds, hours_between, per_hour, fetch_seconds, watermark_path):
+    clock = MovableClock()
+    board = FakeJobBoard(clock, per_hour, fetch_seconds)
+    scrape_jobs.scrape_jobs = board.scrape_jobs
+    scrape_jobs.time = clock
+    scrape_watermark.time = clock
+    mode = 'incremental' if incremental else 'full window'
+    for round_number in range(rounds):
+        argv = ['Data Engineer', 'Toronto', '500', '--sites', 'indeed', '--no-cache', '--no-archive',
+                '--watermark-path', watermark_path]
+        board.returned, board.windows = 0, []
+        out = io.StringIO()
+        start = time.perf_counter()
+        scrape_jobs.run_search(scrape_jobs.parse_args(argv + (['--incremental'] if incremental else [])), out=out)
+        elapsed = time.perf_counter() - start
+        written = len(json.loads(out.getvalue()))
+        print(f"{mode:<12} {round_number + 1:>5} {board.windows[0]:>7}h {board.returned:>9} {written:>8} "
+              f"{board.returned - written:>8} {elapsed:>8.2f}")
+        clock.offset += hours_between * 3600
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full-window and incremental repeated searches')
+    parser.add_argument('--rounds', type=int, default=4, help='Searches per mode')
+    parser.add_argument('--hours-between', type=float, default=3, help='Hours between searches')
+    parser.add_argument('--per-hour', type=int, default=20, help='New postings per hour on the fake board')
+    parser.add_argument('--fetch-ms', type=float, default=2.0, help='Cost of returning one posting, in ms')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"{'mode':<12} {'round':>5} {'window':>8} {'returned':>9} {'written':>8} {'skipped':>8} {'time s':>8}")
+    for incremental in (False, True):
+        watermark_path = os.path.join(tempfile.mkdtemp(prefix='bench_watermarks_'), 'watermarks.sqlite3')
+        run_rounds(incremental, args.rounds, args.hours_between, args.per_hour, args.fetch_ms / 1000, watermark_path)
+
+if __name__ == "__main__":
+    main()
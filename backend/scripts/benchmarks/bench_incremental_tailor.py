@@ -0,0 +1,207 @@
+"""
+Benchmark whole-document tailoring against bullet-point patches.
+
+Runs resume_tailor.tailor_resume in both modes against a local stub of the OpenAI chat
+completions endpoint that simulates decoding at a fixed rate, so wall-clock time grows
+with output tokens as it does for a real model. In whole-document mode the stub returns
+the resume it was sent; in patch mode it rewrites every other bullet point. Token counts
+are estimated at 4 characters per token. First checks that patches with the LaTeX the
+model is likely to write parse to the intended text, and that a reply that is not a
+usable patch raises PatchError, which sends tailoring back to the whole document.
+
+Usage: python benchmarks/bench_incremental_tailor.py [--tokens-per-second N] [resume.tex ...]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+JOB_DATA = {
+    'title': 'Machine Learning Engineer',
+    'company': 'Acme',
+    'description': 'Train and deploy deep learning models in Python with PyTorch on GCP.',
+    'skills': 'Python, PyTorch, MLOps, SQL'
+}
+
+PREAMBLE = r"""\documentclass[letterpaper,11pt]{article}
+\usepackage{latexsym}
+\usepackage[empty]{fullpage}
+\usepackage{titlesec}
+\usepackage[hidelinks]{hyperref}
+\usepackage{enumitem}
+\addtolength{\oddsidemargin}{-0.5in}
+\addtolength{\textwidth}{1in}
+\titleformat{\section}{\vspace{-4pt}\scshape\raggedright\large}{}{0em}{}[\titlerule \vspace{-5pt}]
+\newcommand{\resumeItem}[1]{\item\small{{#1 \vspace{-2pt}}}}
+\newcommand{\resumeSubheading}[4]{
+  \vspace{-2pt}\item
+    \begin{tabular*}{0.97\textwidth}[t]{l@{\extracolsep{\fill}}r}
+      \textbf{#1} & #2 \\
+      \textit{\small#3} & \textit{\small #4} \\
+    \end{tabular*}\vspace{-7pt}
+}
+\newcommand{\resumeSubHeadingListStart}{\begin{itemize}[leftmargin=0.15in, label={}]}
+\newcommand{\resumeSubHeadingListEnd}{\end{itemize}}
+\newcommand{\resumeItemListStart}{\begin{itemize}}
+\newcommand{\resumeItemListEnd}{\end{itemize}\vspace{-5pt}}
+"""
+
+BULLETS = [
+    r"Developed a deep reinforcement learning model to optimize HVAC electricity consumption, reducing simulated energy usage by 20\% (\textbf{Python}, PyTorch)",
+    r"Collaborated cross-functionally with domain experts to model complex HVAC systems using the APROS simulator",
+    r"Led the development of an LLM-based matching platform, coordinating ML scientists, engineers and business stakeholders",
+    r"Built a prompt evaluation framework with A/B testing and metric-driven optimization (OpenAI APIs, TensorFlow, GCP)",
+    r"Launched a FinTech portfolio management platform, improving portfolio returns by 30\%+ with deep reinforcement learning",
+    r"Implemented a hierarchical object detection model classifying over 50,000 grocery items with 93\% accuracy",
+    r"Designed inventory management software around shelf image analysis, from initial concept to completion",
+    r"Facilitated client workshops on identifying business problems suited to machine learning approaches",
+]
+
+def make_resume(entries: int = 6, bullets_per_entry: int = 3) -> str:
+    """A resume in the common \\resumeItem layout, with a few sections of bullet points"""
+    body = [r"\begin{document}", r"\begin{center}\textbf{\Huge Jane Doe} \\ jane@example.com $|$ github.com/jane\end{center}"]
+    for section in ('Experience', 'Projects'):
+        body.append(rf"\section{{{section}}}")
+        body.append(r"\resumeSubHeadingListStart")
+        for entry in range(entries // 2):
+            body.append(rf"\resumeSubheading{{Company {entry}}}{{2020 -- 2024}}{{Engineer}}{{Remote}}")
+            body.append(r"\resumeItemListStart")
+            for bullet in range(bullets_per_entry):
+                body.append(rf"\resumeItem{{{BULLETS[(entry * bullets_per_entry + bullet) % len(BULLETS)]}}}")
+            body.append(r"\resumeItemListEnd")
+        body.append(r"\resumeSubHeadingListEnd")
+    body.append(r"\section{Skills}")
+    body.append(r"\begin{itemize}[leftmargin=0.15in, label={}]")
+    body.append(r"\item \textbf{Languages}{: Python, Java, SQL, C++}")
+    body.append(r"\item \textbf{Frameworks}{: PyTorch, TensorFlow, FastAPI}")
+    body.append(r"\end{itemize}")
+    body.append(r"\end{document}")
+    return PREAMBLE + '\n'.join(body) + '\n'
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def stub_reply(system_prompt: str, prompt: str) -> str:
+    """What a model would send back: the whole resume, or a patch of every other bullet"""
+    if '"edits"' not in prompt:
+        return prompt.split("Applicant's resume (LaTeX):\n", 1)[1].split('\n\nJob Details:', 1)[0]
+    bullets = re.findall(r'^\[(\d+)\] (.*)$', prompt, re.MULTILINE)
+    return json.dumps({'edits': {
+        span_id: f"Applied Python and PyTorch: {text}" for span_id, text in bullets[::2]
+    }, 'remove': []})
+
+def check_patch_parsing() -> None:
+    from resume_sections import PatchError, parse_patch
+
+    cases = [
+        ('lone backslashes', r'{"edits": {"1": "Cut costs by 20\% with \textbf{Go} and R\&D"}}',
+         r'Cut costs by 20\% with \textbf{Go} and R\&D'),
+        ('doubled backslashes', r'{"edits": {"1": "Cut costs by 20\\% with \\textbf{Go}"}}',
+         r'Cut costs by 20\% with \textbf{Go}'),
+        ('commands that look like escapes', r'{"edits": {"1": "\newline \bullet \rightarrow \frac{1}{2}"}}',
+         r'\newline \bullet \rightarrow \frac{1}{2}'),
+        ('escaped quotes', r'{"edits": {"1": "Shipped \"Atlas\""}}', 'Shipped "Atlas"'),
+        ('raw tab', '{"edits": {"1": "Built\tGo"}}', PatchError),
+        ('truncated reply', '{"edits": {"1": "Built', PatchError),
+        ('edits as a list', '{"edits": ["Built Go"]}', PatchError),
+    ]
+    for name, reply, expected in cases:
+        try:
+            result = parse_patch(reply)['edits']['1']
+        except PatchError:
+            result = PatchError
+        status = 'ok' if result == expected else f"FAILED: got {result!r}"
+        print(f"{name:<34} {status}")
+        if result != expected:
+            raise SystemExit(f"Patch parsing check failed: {name}")
+    print()
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Chat completions stub that takes 1 / tokens_per_second per output token"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    tokens_per_second = 50.0
+    output_tokens = 0
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        messages = {message['role']: message['content'] for message in request['messages']}
+        reply = stub_reply(messages.get('system', ''), messages['user'])
+        tokens = estimate_tokens(reply)
+        StubHandler.output_tokens += tokens
+        time.sleep(tokens / StubHandler.tokens_per_second)
+        body = json.dumps({
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': 'stub-model',
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': estimate_tokens(messages['user']), 'completion_tokens': tokens, 'total_tokens': tokens}
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark whole-document against patch tailoring')
+    parser.add_argument('resumes', nargs='*', help='LaTeX resumes to tailor; a generated one by default')
+    parser.add_argument('--tokens-per-second', type=float, default=50.0, help='Simulated decoding speed')
+    args = parser.parse_args()
+
+    check_patch_parsing()
+    StubHandler.tokens_per_second = args.tokens_per_second
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    from resume_tailor import resume_tailor
+    from resume_sections import parse_resume
+
+    work_dir = tempfile.mkdtemp(prefix='bench_tailor_')
+    paths = args.resumes
+    if not paths:
+        paths = []
+        for entries in (4, 6, 10):
+            path = os.path.join(work_dir, f"resume_{entries}_entries.tex")
+            with open(path, 'w') as f:
+                f.write(make_resume(entries=entries))
+            paths.append(path)
+
+    tailor = resume_tailor()
+    print(f"{'resume':<28} {'mode':<10} {'bullets':>8} {'out tokens':>11} {'wall ms':>9}")
+    for path in paths:
+        with open(path, 'r') as f:
+            source = f.read()
+        results = {}
+        for mode, incremental in (('document', False), ('patch', True)):
+            StubHandler.output_tokens = 0
+            start = time.perf_counter()
+            tailored = tailor.tailor_resume(path, JOB_DATA, api_key='sk-bench', incremental=incremental)
+            results[mode] = (StubHandler.output_tokens, (time.perf_counter() - start) * 1000)
+            if incremental:
+                # The preamble is never sent to the model, so it must come back byte for byte
+                preamble_end = source.find('\\begin{document}')
+                assert tailored[:preamble_end] == source[:preamble_end]
+            print(f"{os.path.basename(path):<28} {mode:<10} {len(parse_resume(source).spans):>8} "
+                  f"{results[mode][0]:>11} {results[mode][1]:>9.0f}")
+        (document_tokens, document_ms), (patch_tokens, patch_ms) = results['document'], results['patch']
+        print(f"{'':<28} {'reduction':<10} {'':>8} {1 - patch_tokens / document_tokens:>10.0%} "
+              f"{1 - patch_ms / document_ms:>9.0%}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare the columnar job archive with one JSON file per job, as in backend/data/temp.
+
+Builds synthetic processed jobs whose descriptions mix lines of the stored
+job_data_*.json samples, then writes them both ways: one job_data_<n>.json file per job,
+and archive segments of 100 jobs each that are then compacted. Reports the bytes on disk
+and the time to read every job back, to read only titles and companies, and to read the
+latest copy of each posting after every job was archived twice.
+
+Usage: python benchmarks/bench_job_archive.py [jobs ...]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import shutil
+import logging
+import tempfile
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from job_archive import JobArchive
+
+SAMPLES_GLOB = os.path.join(script_dir, '..', 'data', 'temp', 'job_data_*.json')
+
+def make_jobs(count: int):
+    # The samples hold only a few distinct postings, so each job gets its own mix of their
+    # lines; repeating whole descriptions would flatter the compression
+    lines = sorted({line for path in glob.glob(SAMPLES_GLOB) for line in json.load(open(path))['description'].splitlines()
+                    if line.strip()}) or ['Build things.']
+    rng = random.Random(0)
+    descriptions = ['\n'.join(rng.sample(lines, min(len(lines), 40))) for _ in range(count)]
+    return [
+        {
+            'title': f"Software Engineer {index}",
+            'company': f"Company {index % 300}",
+            'companyUrl': f"https://example.com/company/{index % 300}",
+            'jobUrl': f"https://example.com/jobs/{index}",
+            'location': {'country': 'Canada', 'city': 'Toronto', 'state': 'ON'},
+            'isRemote': index % 3 == 0,
+            'description': descriptions[index],
+            'jobType': 'fulltime',
+            'salary': {'interval': 'yearly', 'minAmount': 90000.0, 'maxAmount': 120000.0, 'currency': 'CAD'},
+            'datePosted': '2025-04-28',
+            'companyIndustry': 'Software',
+            'companyLogo': None
+        }
+        for index in range(count)
+    ]
+
+def directory_bytes(directory: str) -> int:
+    return sum(os.path.getsize(path) for path in glob.glob(os.path.join(directory, '*')))
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def read_json_files(directory: str, fields=None):
+    jobs = []
+    for path in glob.glob(os.path.join(directory, 'job_data_*.json')):
+        with open(path, 'r') as f:
+            job = json.load(f)
+        jobs.append({field: job.get(field) for field in fields} if fields else job)
+    return jobs
+
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000]
+    print(f"{'jobs':>6} {'format':<22} {'disk KB':>9} {'read all s':>11} {'title+company s':>16} {'latest of 2x s':>15}")
+    for size in sizes:
+        jobs = make_jobs(size)
+        root = tempfile.mkdtemp(prefix='bench_job_archive_')
+
+        json_dir = os.path.join(root, 'json')
+        os.makedirs(json_dir)
+        for index, job in enumerate(jobs):
+            with open(os.path.join(json_dir, f"job_data_{index}.json"), 'w') as f:
+                json.dump(job, f)
+        read_all, _ = timed(lambda: read_json_files(json_dir))
+        projected, _ = timed(lambda: read_json_files(json_dir, ['title', 'company']))
+        print(f"{size:>6} {'JSON file per job':<22} {directory_bytes(json_dir) / 1024:>9.0f} {read_all:>11.3f} "
+              f"{projected:>16.3f} {'-':>15}")
+
+        for compression in ('zstd', None):
+            archive = JobArchive(os.path.join(root, f"archive_{compression}"), compression=compression, auto_compact_segments=0)
+            for start in range(0, size, 100):
+                archive.append(jobs[start:start + 100])
+            archive.compact()
+            read_all, table = timed(lambda: archive.scan_table())
+            assert table.num_rows == size
+            projected, _ = timed(lambda: archive.scan_table(['title', 'company']))
+            for start in range(0, size, 100):
+                archive.append(jobs[start:start + 100], source='tailor')
+            latest, table = timed(lambda: archive.scan_table(['title', 'company', 'source']))
+            assert table.num_rows == size and set(table.column('source').to_pylist()) == {'tailor'}
+            label = f"archive ({compression or 'uncompressed'})"
+            archive.compact()
+            print(f"{size:>6} {label:<22} {directory_bytes(archive.directory) / 1024:>9.0f} {read_all:>11.3f} "
+                  f"{projected:>16.3f} {latest:>15.3f}")
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Check which postings the duplicate index drops, and time it on synthetic cross-site results.
+
+First runs a few fixed cases: a repost of a job on another site under a tracking URL and
+with a lightly edited description is dropped, while one company's postings of the same
+role in another city, or of another role with the same boilerplate description, are kept.
+Then builds postings where a share are reposts across sites and reports the postings
+kept and dropped and the time per posting.
+
+Usage: python benchmarks/bench_job_dedup.py [postings ...]
+"""
+import os
+import sys
+import time
+import random
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from job_dedup import JobDedupIndex
+
+BOILERPLATE = ' '.join(
+    f"We are growing our platform team and need people who enjoy building reliable services at scale {index}."
+    for index in range(12)
+)
+
+def make_job(title: str, city: str, url: str, description: str = BOILERPLATE, company: str = 'Acme Corp'):
+    return {'title': title, 'company': company, 'jobUrl': url, 'location': {'city': city}, 'description': description}
+
+def check_cases() -> None:
+    base = make_job('Backend Engineer', 'Toronto', 'https://indeed.com/jobs/1')
+    cases = [
+        ('repost on another site', make_job('Backend Engineer', 'Toronto', 'https://linkedin.com/jobs/9?trk=abc',
+                                            BOILERPLATE + ' Apply today.'), False),
+        ('same URL with tracking', make_job('Backend Engineer', 'Toronto', 'https://www.indeed.com/jobs/1?utm_source=x'),
+         False),
+        ('same role in another city', make_job('Backend Engineer', 'Vancouver', 'https://indeed.com/jobs/2'), True),
+        ('another role, same description', make_job('Senior Staff Engineer', 'Toronto', 'https://indeed.com/jobs/3'), True),
+        ('another company', make_job('Backend Engineer', 'Toronto', 'https://indeed.com/jobs/4', company='Globex'), True),
+    ]
+    for name, job, expected in cases:
+        index = JobDedupIndex()
+        index.add(base)
+        kept = index.add(job)
+        status = 'ok' if kept == expected else 'FAILED'
+        print(f"{name:<32} {'kept' if kept else 'dropped':<8} {status}")
+        if kept != expected:
+            raise SystemExit(f"Duplicate check failed: {name}")
+
+def make_postings(count: int, repost_rate: float = 0.3):
+    rng = random.Random(0)
+    postings = []
+    for number in range(count):
+        if postings and rng.random() < repost_rate:
+            original = rng.choice(postings)
+            postings.append({**original, 'jobUrl': f"https://linkedin.com/jobs/{number}",
+                             'description': original['description'] + ' Apply on our site.'})
+            continue
+        postings.append(make_job(
+            f"Engineer {number}", rng.choice(['Toronto', 'Vancouver', 'Montreal']),
+            f"https://indeed.com/jobs/{number}", f"{BOILERPLATE} Team {number}.",
+            company=f"Company {number % 50}"
+        ))
+    return postings
+
+def main():
+    check_cases()
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000]
+    print(f"\n{'postings':>9} {'kept':>7} {'by URL':>7} {'near dup':>9} {'us/posting':>11}")
+    for size in sizes:
+        postings = make_postings(size)
+        index = JobDedupIndex()
+        start = time.perf_counter()
+        kept = index.filter(postings)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>9} {len(kept):>7} {index.dropped_by_url:>7} {index.dropped_near_duplicates:>9} "
+              f"{elapsed / size * 1e6:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark ranking scraped jobs against a resume with the incremental BM25 index.
+
+Builds synthetic postings from a vocabulary of tech skills and filler words, with a
+Zipf-like word distribution, and a resume from the bench_incremental_tailor layout.
+Reports how long indexing takes, how long one ranking query takes at each corpus size,
+and how long adding a new scrape and ranking again takes. As a check, the index's scores
+with a title weight of 1 are compared with job_description.bm25_scores over the same
+title and description texts.
+
+Usage: python benchmarks/bench_job_ranking.py [jobs ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from job_ranking import JobRankingIndex
+from job_description import bm25_scores, latex_to_text
+from bench_incremental_tailor import make_resume
+
+SKILLS = """python java javascript typescript go rust c++ c# sql postgresql mysql mongodb redis kafka spark
+hadoop airflow dbt snowflake bigquery aws gcp azure docker kubernetes terraform ansible linux react angular
+vue node.js django flask fastapi spring graphql rest pytorch tensorflow keras scikit-learn pandas numpy
+mlops llm nlp computer-vision reinforcement deep-learning statistics tableau excel salesforce sap figma
+""".split()
+FILLER = """build maintain scalable systems customers collaborate engineers product design deliver features
+fast-paced environment experience years strong communication skills degree computer science ownership
+impact growth mission remote hybrid benefits salary equity insurance vacation learning mentorship
+stakeholders requirements quality testing deployment monitoring performance reliability security
+""".split()
+TITLES = ['Software Engineer', 'Data Scientist', 'Machine Learning Engineer', 'Backend Developer',
+          'Frontend Developer', 'Data Engineer', 'DevOps Engineer', 'Product Manager', 'Business Analyst']
+
+def make_jobs(count: int, start: int = 0, seed: int = 0):
+    rng = np.random.default_rng(seed + start)
+    vocabulary = np.array(SKILLS + FILLER)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights = weights[rng.permutation(len(vocabulary))]
+    weights /= weights.sum()
+    jobs = []
+    for index in range(start, start + count):
+        words = rng.choice(vocabulary, size=int(rng.integers(150, 450)), p=weights)
+        jobs.append({
+            'title': f"{TITLES[index % len(TITLES)]} {index}",
+            'company': f"Company {index % 700}",
+            'jobUrl': f"https://example.com/jobs/{index}",
+            'description': ' '.join(words)
+        })
+    return jobs
+
+def check_scores(jobs, query):
+    """Largest difference between the index's scores and bm25_scores on the same texts"""
+    index = JobRankingIndex(title_weight=1)
+    index.add_many(jobs)
+    by_url = {result['job']['jobUrl']: result['score'] for result in index.rank(query, limit=None)}
+    expected = bm25_scores([f"{job['title']} {job['description']}" for job in jobs], query)
+    return max(abs(by_url.get(job['jobUrl'], 0.0) - score) for job, score in zip(jobs, expected))
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    query = latex_to_text(make_resume())
+    print(f"Score check against bm25_scores (500 jobs): max difference {check_scores(make_jobs(500), query):.2e}\n")
+
+    print(f"{'jobs':>7} {'terms':>6} {'index s':>8} {'rank ms':>8} {'add 1k s':>9} {'re-rank ms':>11}")
+    for size in sizes:
+        jobs = make_jobs(size)
+        index = JobRankingIndex()
+        start = time.perf_counter()
+        index.add_many(jobs)
+        indexed = time.perf_counter() - start
+
+        index.rank(query)
+        start = time.perf_counter()
+        runs = 5
+        for _ in range(runs):
+            results = index.rank(query, limit=20)
+        ranked = (time.perf_counter() - start) / runs
+
+        start = time.perf_counter()
+        index.add_many(make_jobs(1000, start=size))
+        added = time.perf_counter() - start
+        start = time.perf_counter()
+        index.rank(query, limit=20)
+        reranked = time.perf_counter() - start
+        print(f"{size:>7} {len(index.terms):>6} {indexed:>8.2f} {ranked * 1000:>8.1f} {added:>9.2f} {reranked * 1000:>11.1f}")
+
+    best = results[0]
+    print(f"\nBest match: {best['job']['title']} (score {best['score']}), terms: {', '.join(best['matchedTerms'][:6])}")
+
+if __name__ == "__main__":
+    main()
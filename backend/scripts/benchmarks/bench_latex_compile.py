@@ -0,0 +1,123 @@
+"""
+Benchmark cold pdflatex compiles against LatexCompileService with a precompiled preamble.
+
+The corpus is every .tex file given on the command line, or a set of generated resumes
+that share one preamble when none are given. Cold compiles run pdflatex on each document
+in its own directory, one after another; warm compiles reuse the preamble format, first
+sequentially and then on the worker pool. A last run gives every document its own preamble, as model-written
+cover letters have, to check that one-off preambles cost no more on the service than
+cold compiles, since no format is built for them.
+
+Usage: python benchmarks/bench_latex_compile.py [file.tex ...]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from latex_compiler import BEGIN_DOCUMENT, LatexCompileService, run_pdflatex
+
+PREAMBLE = r"""\documentclass[letterpaper,11pt]{article}
+\usepackage[T1]{fontenc}
+\usepackage{lmodern}
+\usepackage[margin=0.6in]{geometry}
+\usepackage{xcolor}
+\usepackage{tabularx}
+\usepackage[hidelinks]{hyperref}
+\pagestyle{empty}
+\newcommand{\resumeItem}[1]{\item\small{#1}}
+"""
+
+def make_resume(index: int) -> str:
+    """A one-page resume body with a few sections of bullet points"""
+    sections = []
+    for section in ('Experience', 'Projects', 'Education'):
+        items = '\n'.join(
+            rf"\resumeItem{{Item {i} of {section.lower()} for document {index}: built and shipped a feature.}}"
+            for i in range(5)
+        )
+        sections.append(rf"\section*{{{section}}}" + '\n\\begin{itemize}\n' + items + '\n\\end{itemize}')
+    return PREAMBLE + "\\begin{document}\n\\begin{center}{\\Large Jane Doe}\\end{center}\n" + '\n'.join(sections) + "\n\\end{document}\n"
+
+def load_corpus(paths):
+    if paths:
+        corpus = []
+        for path in paths:
+            with open(path, 'r') as f:
+                corpus.append(f.read())
+        return corpus
+    return [make_resume(i) for i in range(12)]
+
+def cold_compile(latex_content: str, output_dir: str, output_filename: str, temp_dir: str):
+    """Compile with plain pdflatex and no format, the way every compile used to run"""
+    compile_dir = tempfile.mkdtemp(prefix=f"{output_filename}_", dir=temp_dir)
+    tex_file = os.path.join(compile_dir, f"{output_filename}.tex")
+    with open(tex_file, 'w', encoding='utf-8') as f:
+        f.write(latex_content)
+    try:
+        run_pdflatex(tex_file, compile_dir)
+    except subprocess.CalledProcessError:
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+    return shutil.move(os.path.join(compile_dir, f"{output_filename}.pdf"), os.path.join(output_dir, f"{output_filename}.pdf"))
+
+def main():
+    if shutil.which('pdflatex') is None:
+        raise SystemExit("pdflatex is not installed")
+
+    # Every run compiles the same corpus, so compare compiles rather than PDF cache hits
+    os.environ['LATEX_PDF_CACHE'] = '0'
+    corpus = load_corpus(sys.argv[1:])
+    work_dir = tempfile.mkdtemp(prefix='bench_latex_')
+    output_dir = os.path.join(work_dir, 'pdf')
+
+    try:
+        cold_dir = os.path.join(work_dir, 'cold')
+        os.makedirs(cold_dir)
+        start = time.perf_counter()
+        cold = [cold_compile(doc, output_dir, f"cold_{i}", cold_dir) for i, doc in enumerate(corpus)]
+        cold_time = time.perf_counter() - start
+
+        service = LatexCompileService(temp_dir=os.path.join(work_dir, 'warm'))
+        start = time.perf_counter()
+        service.prepare(corpus[0])
+        format_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm = [service.compile_latex_to_pdf(doc, output_dir, f"warm_{i}") for i, doc in enumerate(corpus)]
+        warm_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pooled = service.compile_many([
+            {'latex_content': doc, 'output_dir': output_dir, 'output_filename': f"pool_{i}"}
+            for i, doc in enumerate(corpus)
+        ])
+        pool_time = time.perf_counter() - start
+
+        # One-off preambles: a comment makes each preamble unique without changing the output
+        one_off = [doc.replace(BEGIN_DOCUMENT, f"% one-off {i}\n{BEGIN_DOCUMENT}", 1) for i, doc in enumerate(corpus)]
+        start = time.perf_counter()
+        unique = [service.compile_latex_to_pdf(doc, output_dir, f"unique_{i}") for i, doc in enumerate(one_off)]
+        unique_time = time.perf_counter() - start
+        formats = len([name for name in os.listdir(service.formats.format_dir) if name.endswith('.fmt')])
+        service.shutdown()
+
+        count = len(corpus)
+        print(f"documents: {count}")
+        print(f"format build (once):  {format_time:.2f}s")
+        print(f"cold sequential:      {cold_time / count * 1000:>7.0f} ms/doc  ({sum(p is not None for p in cold)} ok)")
+        print(f"warm sequential:      {warm_time / count * 1000:>7.0f} ms/doc  ({sum(p is not None for p in warm)} ok)")
+        print(f"warm pool:            {pool_time / count * 1000:>7.0f} ms/doc  ({sum(p is not None for p in pooled)} ok)")
+        print(f"one-off preambles:    {unique_time / count * 1000:>7.0f} ms/doc  ({sum(p is not None for p in unique)} ok, "
+              f"{formats} formats on disk)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
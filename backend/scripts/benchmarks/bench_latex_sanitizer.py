@@ -0,0 +1,159 @@
+"""
+Measure what repairing LaTeX before compiling and fitting it to one page saves.
+
+Builds resumes of different lengths and breaks some of them the way model replies break:
+a markdown code fence, R&D, 30%, model_v2, $120K, or a missing closing brace. Reports
+how long sanitizing takes and how many broken documents it repairs, then runs every
+document through two flows on a compile service whose compiles take a fixed time:
+
+- retry: compile as is; a failed compile or a resume over one page goes back to the model
+  (a fixed delay) and is compiled again. The model is assumed to fix a failed compile and,
+  asked to shorten a resume, to cut a set share of its bullet points
+- sanitize and fit: LatexCompileService.compile_document with max_pages=1
+
+Both flows count a document as one page from the page count of its last compile. The
+simulated compile fails when the sanitizer would still find something to repair, and
+counts pages from the number of bullet points and the spacing commands at the top of the
+body, so the benchmark runs without pdflatex. First checks that fitting_steps ends by
+dropping every bullet point that can go, however few there are.
+
+Usage: python benchmarks/bench_latex_sanitizer.py [--documents N] [--compile-seconds S] [--retry-seconds S] [--shorten-share F]
+"""
+import os
+import re
+import sys
+import math
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_incremental_tailor import JOB_DATA, make_resume
+from latex_compiler import LatexCompileService
+from latex_sanitizer import sanitize_latex, fitting_steps, drop_lowest_priority
+from resume_sections import parse_resume
+
+LINES_PER_PAGE = 50
+ENLARGE_RE = re.compile(r'\\enlargethispage\{(\d+)\\baselineskip\}\\linespread\{([\d.]+)\}')
+FAULTS = {
+    'code fence': lambda source: f"```latex\n{source}```\nThis resume highlights your experience.",
+    'ampersand': lambda source: source.replace('Built', 'Built R&D', 1),
+    'percent': lambda source: source.replace('Built', 'Cut costs 30% and built', 1),
+    'underscore': lambda source: source.replace('Built', 'Built model_v2 and', 1),
+    'dollar amount': lambda source: source.replace('Built', 'Saved $120K and built', 1),
+    'missing brace': lambda source: source.replace('}\n\\resumeItemListEnd', '\n\\resumeItemListEnd', 1),
+}
+
+class SimulatedCompileService(LatexCompileService):
+    """Compile service whose compiles take a fixed time, fail on LaTeX errors and count pages"""
+    delay = 0.2
+
+    def prepare(self, template_content):
+        return None
+
+    def compile_once(self, latex_content, output_dir, output_filename):
+        time.sleep(self.delay)
+        if sanitize_latex(latex_content)[1]:
+            return None, None
+        match = ENLARGE_RE.search(latex_content)
+        extra_lines, spread = (int(match.group(1)), float(match.group(2))) if match else (0, 1.0)
+        # Heading and skills take about a dozen lines, each bullet point about two
+        lines = (12 + 2 * len(parse_resume(latex_content).spans)) * spread
+        output_pdf = os.path.join(output_dir, f"{output_filename}.pdf")
+        open(output_pdf, 'wb').close()
+        return output_pdf, max(1, math.ceil(lines / (LINES_PER_PAGE + extra_lines)))
+
+def make_documents(count: int, fault_rate: float):
+    rng = random.Random(0)
+    documents = []
+    for _ in range(count):
+        source = make_resume(entries=rng.choice([4, 6, 8]), bullets_per_entry=rng.choice([3, 4]))
+        faults = rng.sample(sorted(FAULTS), rng.randint(1, 2)) if rng.random() < fault_rate else []
+        for fault in faults:
+            source = FAULTS[fault](source)
+        documents.append((source, faults))
+    return documents
+
+def check_fitting_steps() -> None:
+    # (entries, bullet points per entry) -> bullet points dropped at each step; every list keeps one
+    cases = {(1, 2): [1], (2, 2): [2, 3], (3, 4): [2, 4, 7], (8, 4): [2, 4, 8, 16, 25]}
+    for (entries, bullets), expected in cases.items():
+        steps = [description for description, _ in fitting_steps(make_resume(entries=entries, bullets_per_entry=bullets))]
+        dropped = [int(re.search(r'dropped (\d+)', step).group(1)) for step in steps if 'dropped' in step]
+        status = 'ok' if dropped == expected else f"FAILED: got {dropped}"
+        print(f"fitting steps, {entries} entries of {bullets} bullet points: drops {expected} {status}")
+        if dropped != expected:
+            raise SystemExit(f"Fitting steps check failed for {entries} entries of {bullets} bullet points")
+    print()
+
+def retry_flow(service, source, output_dir, name, retry_seconds, shorten_share):
+    """Compile as is, send failures and long documents back to the model, and return (seconds, compiles, pages)"""
+    start = time.perf_counter()
+    compiles = 1
+    pdf_path, pages = service.compile_once(source, output_dir, name)
+    if pdf_path is None:
+        # The model is asked to fix its reply; assume it does
+        time.sleep(retry_seconds)
+        source = sanitize_latex(source)[0]
+        pdf_path, pages = service.compile_once(source, output_dir, name)
+        compiles += 1
+    if pages and pages > 1:
+        # The model is asked to shorten it to one page and cuts its share of bullet points
+        time.sleep(retry_seconds)
+        count = max(1, round(len(parse_resume(source).spans) * shorten_share))
+        source = drop_lowest_priority(source, count) or source
+        pdf_path, pages = service.compile_once(source, output_dir, name)
+        compiles += 1
+    return time.perf_counter() - start, compiles, pages
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sanitizing and fitting LaTeX before and during compiles')
+    parser.add_argument('--documents', type=int, default=20, help='Documents to compile')
+    parser.add_argument('--fault-rate', type=float, default=0.5, help='Share of documents with injected faults')
+    parser.add_argument('--compile-seconds', type=float, default=0.2, help='Simulated time of one compile')
+    parser.add_argument('--retry-seconds', type=float, default=1.0, help='Simulated time of one model retry')
+    parser.add_argument('--shorten-share', type=float, default=0.25,
+                        help='Share of bullet points the model cuts when asked to shorten a resume')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    check_fitting_steps()
+    os.environ['LATEX_PDF_CACHE'] = '0'
+    documents = make_documents(args.documents, args.fault_rate)
+
+    start = time.perf_counter()
+    repaired = [sanitize_latex(source) for source, _ in documents]
+    sanitize_ms = (time.perf_counter() - start) * 1000 / len(documents)
+    broken = [index for index, (_, faults) in enumerate(documents) if faults]
+    fixed = [index for index in broken if repaired[index][1] and not sanitize_latex(repaired[index][0])[1]]
+    print(f"sanitize: {sanitize_ms:.2f} ms per document, repaired {len(fixed)}/{len(broken)} broken documents")
+
+    SimulatedCompileService.delay = args.compile_seconds
+    work_dir = tempfile.mkdtemp(prefix='bench_latex_sanitizer_')
+    service = SimulatedCompileService(temp_dir=os.path.join(work_dir, 'temp'), workers=1)
+    totals = {'retry': [0.0, 0, 0], 'sanitize and fit': [0.0, 0, 0]}
+    for index, (source, _) in enumerate(documents):
+        seconds, compiles, pages = retry_flow(service, source, work_dir, f"retry_{index}",
+                                              args.retry_seconds, args.shorten_share)
+        totals['retry'][0] += seconds
+        totals['retry'][1] += compiles
+        totals['retry'][2] += pages == 1
+        result = service.compile_document(source, work_dir, f"fit_{index}", max_pages=1,
+                                          priority_text=JOB_DATA['description'])
+        totals['sanitize and fit'][0] += result.seconds
+        totals['sanitize and fit'][1] += result.attempts
+        totals['sanitize and fit'][2] += result.pages == 1
+    service.shutdown()
+
+    print(f"{'flow':<18} {'total s':>8} {'per doc s':>10} {'compiles':>9} {'one page':>9}")
+    for flow, (seconds, compiles, one_page) in totals.items():
+        print(f"{flow:<18} {seconds:>8.2f} {seconds / len(documents):>10.2f} {compiles:>9} {one_page:>9}")
+
+if __name__ == "__main__":
+    main()
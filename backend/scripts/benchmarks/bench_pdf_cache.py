@@ -0,0 +1,159 @@
+"""
+Measure the PDF cache on a workload with repeated documents, and check that compiles of
+the same output name no longer collide.
+
+Draws documents from a smaller set of distinct resumes and cover letters, as happens
+with re-downloads, regenerations that return the same cached text and shared templates.
+Some repeats differ only in line endings or trailing spaces, which the cache key
+ignores. Compiles them on LatexCompileService with and without the cache, and reports
+the time, compiles run and cache hits. Then compiles different documents under one
+output name from several threads with LatexCompiler, which goes through the shared
+compile service for its temporary directory, and counts PDFs that are missing or hold
+another document. Last, compiles one document twice through LatexCompiler and through
+compile_latex_to_pdf, and checks the second compile of each is a PDF cache hit.
+
+Without pdflatex, or with --simulate-compile, run_pdflatex is replaced by a compile that
+takes a fixed time and writes the source into the PDF.
+
+Usage: python benchmarks/bench_pdf_cache.py [--documents N] [--distinct N] [--simulate-compile SECONDS]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import latex_compiler
+from bench_incremental_tailor import make_resume
+from latex_compiler import LatexCompiler, LatexCompileService, PreambleFormatCache, compile_latex_to_pdf
+from latex_sanitizer import sanitize_latex
+from pdf_cache import PdfCache, get_pdf_cache
+
+class SimulatedPdflatex:
+    """Stands in for run_pdflatex: waits, then writes the .tex source out as the PDF"""
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.runs = 0
+
+    def __call__(self, tex_file, output_directory, format_name=None, format_dir=None):
+        time.sleep(self.delay)
+        self.runs += 1
+        with open(tex_file, 'rb') as f:
+            source = f.read()
+        pdf_file = os.path.join(output_directory, os.path.splitext(os.path.basename(tex_file))[0] + '.pdf')
+        # Write in pieces, as pdflatex does, so a shared directory shows up as mixed content
+        with open(pdf_file, 'wb') as f:
+            for start in range(0, len(source), 4096):
+                f.write(source[start:start + 4096])
+                time.sleep(0)
+        stdout = f"Output written on {pdf_file} (1 page, {len(source)} bytes).".encode()
+        return subprocess.CompletedProcess([tex_file], 0, stdout=stdout, stderr=b'')
+
+def make_workload(documents: int, distinct: int):
+    rng = random.Random(0)
+    sources = [make_resume(entries=4 + index % 5, bullets_per_entry=2 + index % 3) + f"% variant {index}\n"
+               for index in range(distinct)]
+    workload = []
+    for _ in range(documents):
+        source = rng.choice(sources)
+        variant = rng.random()
+        if variant < 0.2:
+            source = source.replace('\n', '\r\n')
+        elif variant < 0.4:
+            source = source.replace('\n', '  \n') + '\n\n'
+        workload.append(source)
+    return workload
+
+def run_workload(service, workload, output_dir):
+    start = time.perf_counter()
+    for index, source in enumerate(workload):
+        assert service.compile_once(source, output_dir, f"document_{index}")[0] is not None
+    return time.perf_counter() - start
+
+def check_collisions(threads: int, output_root: str, temp_dir: str) -> int:
+    """Compile different documents under one name in parallel; return how many PDFs are missing or wrong"""
+    # Padded inside the body, since the sanitizer drops anything after \end{document}
+    sources = [make_resume(entries=4, bullets_per_entry=3).replace(
+                   '\\end{document}', f"% document {index}\n" + '%' * 20000 + '\n\\end{document}')
+               for index in range(threads)]
+    compiler = LatexCompiler(temp_dir=temp_dir)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        paths = list(pool.map(
+            lambda index: compiler.compile_latex_to_pdf(sources[index], os.path.join(output_root, str(index)), 'resume'),
+            range(threads)
+        ))
+    wrong = 0
+    for source, path in zip(sources, paths):
+        if path is None:
+            wrong += 1
+            continue
+        with open(path, 'rb') as f:
+            wrong += f.read() != sanitize_latex(source)[0].encode()
+    return wrong
+
+def check_public_cache_hits(work_dir: str) -> int:
+    """Compile one document twice through each public entry point; return the PDF cache hits"""
+    os.environ['LATEX_PDF_CACHE'] = '1'
+    os.environ['LATEX_PDF_CACHE_DIR'] = os.path.join(work_dir, 'public_cache')
+    os.environ['LATEX_TEMP_DIR'] = os.path.join(work_dir, 'public_temp')
+    compiler = LatexCompiler(temp_dir=os.path.join(work_dir, 'public_compiler_temp'))
+    sources = [make_resume(entries=3, bullets_per_entry=2).replace('\\end{document}', f"% public {index}\n" + '\\end{document}')
+               for index in range(2)]
+    for attempt in range(2):
+        assert compiler.compile_latex_to_pdf(sources[0], os.path.join(work_dir, 'public'), f"compiler_{attempt}")
+        assert compile_latex_to_pdf(sources[1], os.path.join(work_dir, 'public'), f"function_{attempt}")
+    return get_pdf_cache().hits
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the PDF cache')
+    parser.add_argument('--documents', type=int, default=60, help='Documents to compile')
+    parser.add_argument('--distinct', type=int, default=15, help='Distinct documents among them')
+    parser.add_argument('--simulate-compile', type=float,
+                        help='Replace pdflatex with a compile of this many seconds; used by default without pdflatex')
+    args = parser.parse_args()
+
+    # The run without a cache must not fall back to the process-wide one
+    os.environ['LATEX_PDF_CACHE'] = '0'
+    logging.getLogger().setLevel(logging.WARNING)
+    simulated = args.simulate_compile is not None or shutil.which('pdflatex') is None
+    if simulated:
+        latex_compiler.run_pdflatex = SimulatedPdflatex(args.simulate_compile or 0.3)
+        PreambleFormatCache.get = lambda self, preamble, build=False: None
+
+    workload = make_workload(args.documents, args.distinct)
+    work_dir = tempfile.mkdtemp(prefix='bench_pdf_cache_')
+    try:
+        print(f"{'mode':<10} {'time s':>8} {'compiles':>9} {'hits':>6} {'cache KB':>9}")
+        for mode in ('no cache', 'cache'):
+            cache = PdfCache(os.path.join(work_dir, 'cache'), 64 * 1024 * 1024) if mode == 'cache' else None
+            service = LatexCompileService(temp_dir=os.path.join(work_dir, 'temp'), workers=1, pdf_cache=cache)
+            runs = latex_compiler.run_pdflatex.runs if simulated else 0
+            seconds = run_workload(service, workload, os.path.join(work_dir, mode.replace(' ', '_')))
+            compiles = latex_compiler.run_pdflatex.runs - runs if simulated else '-'
+            size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(cache.cache_dir)
+                       for name in names) / 1024 if cache else 0
+            print(f"{mode:<10} {seconds:>8.2f} {compiles:>9} {cache.hits if cache else 0:>6} {size:>9.0f}")
+            service.shutdown()
+
+        if simulated:
+            wrong = check_collisions(8, os.path.join(work_dir, 'collisions'), os.path.join(work_dir, 'collision_temp'))
+            print(f"Same-name compiles from 8 threads: {wrong} PDFs missing or with another document's content")
+            hits = check_public_cache_hits(work_dir)
+            print(f"Second compiles through LatexCompiler and compile_latex_to_pdf: {hits}/2 PDF cache hits")
+            if hits != 2:
+                raise SystemExit("Public compile functions missed the PDF cache")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
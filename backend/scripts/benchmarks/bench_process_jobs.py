@@ -0,0 +1,79 @@
+"""
+Benchmark the column-wise process_jobs against the per-row iterrows() path.
+
+Builds synthetic jobspy-shaped DataFrames, checks that both paths serialize to
+byte-identical JSON and reports the conversion time for each.
+
+Usage: python benchmarks/bench_process_jobs.py [rows ...]
+"""
+import os
+import sys
+import json
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from scrape_jobs import process_jobs, process_jobs_rowwise
+
+def make_jobs_df(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Build a DataFrame with the columns, dtypes and gaps jobspy produces"""
+    rng = np.random.default_rng(seed)
+    has_salary = rng.random(rows) < 0.4
+    min_amount = np.where(has_salary, rng.integers(40, 150, rows) * 1000.0, np.nan)
+    today = date(2025, 4, 28)
+
+    return pd.DataFrame({
+        'site': rng.choice(['indeed', 'linkedin'], rows),
+        'title': [f"Software Engineer {i}" for i in range(rows)],
+        'company': rng.choice(['Acme', 'Globex', 'Initech', None], rows),
+        'company_url': [f"https://example.com/company/{i % 500}" for i in range(rows)],
+        'job_url': [f"https://example.com/jobs/{i}" for i in range(rows)],
+        'location_country': rng.choice(['Canada', 'USA', 'nan'], rows),
+        'location_city': rng.choice(['Toronto', 'Vancouver', None], rows),
+        'location_state': rng.choice(['ON', 'BC', 'NaN'], rows),
+        'is_remote': rng.random(rows) < 0.3,
+        'description': ['**Responsibilities**\n\n* Build things\n* Ship things ' * 20] * rows,
+        'job_type': rng.choice(['fulltime', 'contract', None], rows),
+        'salary_interval': np.where(has_salary, 'yearly', None),
+        'salary_min_amount': min_amount,
+        'salary_max_amount': min_amount * 1.25,
+        'salary_currency': np.where(has_salary, 'CAD', None),
+        'date_posted': [today - timedelta(days=int(d)) if d < 5 else None for d in rng.integers(0, 6, rows)],
+        'company_industry': None,
+        'company_logo': None,
+    })
+
+def time_call(func, *args, repeat: int = 3) -> float:
+    """Return the best wall time of several calls"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+
+    print(f"{'rows':>8} {'rowwise (s)':>12} {'columns (s)':>12} {'speedup':>8}")
+    for rows in sizes:
+        jobs_df = make_jobs_df(rows)
+
+        expected = json.dumps(process_jobs_rowwise(jobs_df), default=str)
+        actual = json.dumps(process_jobs(jobs_df), default=str)
+        if expected != actual:
+            raise SystemExit(f"Output mismatch at {rows} rows")
+
+        repeat = 1 if rows >= 100_000 else 3
+        rowwise = time_call(process_jobs_rowwise, jobs_df, repeat=repeat)
+        columns = time_call(process_jobs, jobs_df, repeat=repeat)
+        print(f"{rows:>8} {rowwise:>12.3f} {columns:>12.3f} {rowwise / columns:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
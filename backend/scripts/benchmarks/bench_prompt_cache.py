@@ -0,0 +1,130 @@
+"""
+Measure how much of each prompt a provider's prefix cache can serve.
+
+Tailors a resume (as a patch and as a whole document) and writes a cover letter for each
+distinct sample job, one request at a time, against a local stub of the OpenAI chat
+completions endpoint. The stub reports cached prompt tokens the way OpenAI's automatic
+prompt caching does: the longest prefix shared with an earlier request, in 128-token
+blocks, once it is at least 1024 tokens long. Usage comes from llm_service.usage_stats,
+so the numbers are the ones the scripts log. Token counts are estimated at 4 characters
+per token.
+
+Usage: python benchmarks/bench_prompt_cache.py [--resume resume.tex] [--jobs N]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from bench_incremental_tailor import make_resume, estimate_tokens, stub_reply
+from bench_description_pruning import load_jobs
+
+MIN_CACHED_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+
+def shared_prefix(a: str, b: str) -> int:
+    length = min(len(a), len(b))
+    index = 0
+    while index < length and a[index] == b[index]:
+        index += 1
+    return index
+
+class CachingStubHandler(BaseHTTPRequestHandler):
+    """Chat completions stub that reports prefix cache hits against earlier prompts"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    seen = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        messages = {message['role']: message['content'] for message in request['messages']}
+        reply = stub_reply(messages.get('system', ''), messages['user'])
+        prompt = messages.get('system', '') + messages['user']
+        with CachingStubHandler.lock:
+            prefix = max((shared_prefix(prompt, earlier) for earlier in CachingStubHandler.seen), default=0)
+            CachingStubHandler.seen.append(prompt)
+        cached = estimate_tokens(prompt[:prefix]) // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS
+        if cached < MIN_CACHED_TOKENS:
+            cached = 0
+        body = json.dumps({
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': 'stub-model',
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': estimate_tokens(prompt),
+                'completion_tokens': estimate_tokens(reply),
+                'total_tokens': estimate_tokens(prompt) + estimate_tokens(reply),
+                'prompt_tokens_details': {'cached_tokens': cached}
+            }
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure prompt tokens served from a prefix cache')
+    parser.add_argument('--resume', type=str, help='LaTeX resume to use; a generated one by default')
+    parser.add_argument('--jobs', type=int, default=4, help='Number of sample jobs to use')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CachingStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ['LLM_RESPONSE_CACHE'] = '0'
+
+    from llm_service import usage_stats
+    from resume_tailor import resume_tailor
+    from cover_letter_generator import cover_letter_generator
+
+    if args.resume:
+        resume_path = args.resume
+    else:
+        resume_path = os.path.join(tempfile.mkdtemp(prefix='bench_prompt_cache_'), 'resume.tex')
+        with open(resume_path, 'w') as f:
+            f.write(make_resume(entries=10))
+
+    jobs = load_jobs()[:args.jobs]
+    if not jobs:
+        raise SystemExit("No sample jobs found")
+
+    tailor = resume_tailor()
+    cover_letters = cover_letter_generator()
+    tasks = (
+        ('patch', lambda job: tailor.tailor_resume(resume_path, job, api_key='sk-bench', incremental=True)),
+        ('document', lambda job: tailor.tailor_resume(resume_path, job, api_key='sk-bench', incremental=False)),
+        ('cover letter', lambda job: cover_letters.generate_cover_letter(
+            resume_path, {**job, 'location': job.get('location') or {}}, api_key='sk-bench'
+        ))
+    )
+    print(f"{'job':<40} {'task':<13} {'prompt':>7} {'cached':>7} {'share':>6}")
+    for job in jobs:
+        for name, run in tasks:
+            before = next(iter(usage_stats.totals().values()), dict.fromkeys(usage_stats.FIELDS, 0))
+            run(job)
+            after = next(iter(usage_stats.totals().values()))
+            prompt = after['prompt_tokens'] - before['prompt_tokens']
+            cached = after['cached_tokens'] - before['cached_tokens']
+            print(f"{job.get('title', '')[:40]:<40} {name:<13} {prompt:>7} {cached:>7} {cached / prompt:>6.0%}")
+
+    totals = next(iter(usage_stats.totals().values()))
+    print(f"\n{totals['calls']} calls, {totals['prompt_tokens']} prompt tokens, "
+          f"{totals['cached_tokens']} cached ({totals['cached_tokens'] / totals['prompt_tokens']:.0%})")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
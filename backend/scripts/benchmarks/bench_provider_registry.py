@@ -0,0 +1,77 @@
+"""
+Benchmark building a provider per call against reusing one from the provider registry.
+
+Runs a local stub of the OpenAI chat completions endpoint and sends the same request
+through a fresh get_provider() client each time and through provider_registry, which
+keeps the client and its keep-alive connection pool.
+
+Usage: python benchmarks/bench_provider_registry.py [calls]
+"""
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+COMPLETION = json.dumps({
+    'id': 'chatcmpl-stub',
+    'object': 'chat.completion',
+    'created': 0,
+    'model': 'stub-model',
+    'choices': [{
+        'index': 0,
+        'message': {'role': 'assistant', 'content': 'ok'},
+        'finish_reason': 'stop'
+    }],
+    'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}
+}).encode('utf-8')
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every POST with a fixed chat completion over a keep-alive connection"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    connections = set()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        StubHandler.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(COMPLETION)))
+        self.end_headers()
+        self.wfile.write(COMPLETION)
+
+    def log_message(self, format, *args):
+        pass
+
+def run(label: str, get, calls: int) -> None:
+    StubHandler.connections.clear()
+    start = time.perf_counter()
+    for _ in range(calls):
+        get('openai', 'sk-bench').generate(prompt='ping', model='stub-model', max_tokens=1)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed / calls * 1000:>8.2f} ms/call {len(StubHandler.connections):>6} connections")
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    from llm_service import get_provider, provider_registry
+
+    # Warm up imports and the server
+    get_provider('openai', 'sk-bench').generate(prompt='ping', model='stub-model', max_tokens=1)
+
+    run('get_provider per call', get_provider, calls)
+    run('provider_registry', provider_registry.get, calls)
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Check that the client-side rate limiter holds a provider's RPM and TPM limits.
+
+A fake provider that never touches the network records when each request reaches it.
+Each scenario sends a burst of requests through generate_many, in this process or
+spread across several processes, and reports the busiest one-second window against
+the bound below, the time the burst took and the queue wait recorded in rate_limit_stats.
+Buckets hold one second of each limit (LLM_RATE_LIMIT_BURST_SECONDS=1), so a token
+bucket lets through at most two seconds' worth of requests in any one-second window:
+the full bucket plus one second of refill.
+
+Usage: python benchmarks/bench_rate_limiter.py [--requests N] [--processes N] [--rpm N]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+import llm_service
+from llm_service import LLMProvider, PROVIDERS, generate_many
+from rate_limiter import rate_limit_stats
+
+class RecordingProvider(LLMProvider):
+    """Answers at once and records when each request arrived"""
+    name = 'fake'
+    arrivals = []
+
+    async def agenerate(self, prompt, model, system_prompt=None, temperature=0.7, max_tokens=None, cached_prefix=None, **kwargs):
+        RecordingProvider.arrivals.append(time.time())
+        return 'ok'
+
+def busiest_second(arrivals):
+    arrivals = sorted(arrivals)
+    busiest = 0
+    first = 0
+    for last, arrival in enumerate(arrivals):
+        while arrival - arrivals[first] >= 1.0:
+            first += 1
+        busiest = max(busiest, last - first + 1)
+    return busiest
+
+def send_burst(requests: int, prompt_chars: int, max_tokens: int):
+    """Send a burst in this process; returns (arrival times, seconds queued in total)"""
+    PROVIDERS['fake'] = RecordingProvider
+    RecordingProvider.arrivals = []
+    rate_limit_stats.reset()
+    llm_service._rate_limiter = None
+    batch = [{'prompt': 'x' * prompt_chars, 'provider': 'fake', 'model': 'fake-model', 'max_tokens': max_tokens}
+             for _ in range(requests)]
+    asyncio.run(generate_many(batch, concurrency=requests))
+    waited = sum(totals['wait_seconds'] for totals in rate_limit_stats.totals().values())
+    return RecordingProvider.arrivals, waited
+
+def run_scenario(name, env, requests, processes, prompt_chars, max_tokens, per_second):
+    os.environ.update(env)
+    start = time.time()
+    if processes == 1:
+        arrivals, waited = send_burst(requests, prompt_chars, max_tokens)
+    else:
+        children = [
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--child', str(requests // processes),
+                 '--prompt-chars', str(prompt_chars), '--max-tokens', str(max_tokens)],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=dict(os.environ)
+            )
+            for _ in range(processes)
+        ]
+        arrivals, waited = [], 0.0
+        for child in children:
+            result = json.loads(child.communicate()[0])
+            arrivals += result['arrivals']
+            waited += result['waited']
+    elapsed = max(arrivals) - start
+    print(f"{name:<40} {len(arrivals):>8} {busiest_second(arrivals):>9} {2 * per_second:>7.0f} "
+          f"{elapsed:>8.2f} {waited:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the LLM rate limiter against its limits')
+    parser.add_argument('--requests', type=int, default=30, help='Requests per scenario')
+    parser.add_argument('--processes', type=int, default=3, help='Processes in the cross-process scenarios')
+    parser.add_argument('--rpm', type=float, default=600, help='Requests per minute limit')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--prompt-chars', type=int, default=400, help=argparse.SUPPRESS)
+    parser.add_argument('--max-tokens', type=int, default=100, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        arrivals, waited = send_burst(args.child, args.prompt_chars, args.max_tokens)
+        print(json.dumps({'arrivals': arrivals, 'waited': waited}))
+        return
+
+    rate_dir = tempfile.mkdtemp(prefix='bench_rate_limits_')
+    base = {'FAKE_API_KEY': 'fake', 'LLM_RESPONSE_CACHE': '0', 'LLM_RATE_LIMIT_BURST_SECONDS': '1',
+            'LLM_RATE_LIMIT_DIR': rate_dir, 'FAKE_RPM': '', 'FAKE_TPM': ''}
+    # 2000 prompt characters and 500 max_tokens estimate to 1000 tokens per request
+    tpm = args.rpm * 500
+    print(f"{'scenario':<40} {'requests':>8} {'peak 1 s':>9} {'bound':>7} {'span s':>8} {'queued s':>9}")
+    run_scenario('no limit', base, args.requests, 1, 400, 100, float('inf'))
+    run_scenario('RPM, one process', {**base, 'FAKE_RPM': str(args.rpm)}, args.requests, 1, 400, 100, args.rpm / 60)
+    run_scenario('TPM, one process', {**base, 'FAKE_TPM': str(tpm)}, args.requests, 1, 2000, 500, tpm / 60 / 1000)
+    run_scenario(f"RPM, {args.processes} processes, memory buckets",
+                 {**base, 'FAKE_RPM': str(args.rpm), 'LLM_RATE_LIMIT_BACKEND': 'memory'},
+                 args.requests, args.processes, 400, 100, args.rpm / 60)
+    run_scenario(f"RPM, {args.processes} processes, file buckets",
+                 {**base, 'FAKE_RPM': str(args.rpm), 'LLM_RATE_LIMIT_BACKEND': 'file'},
+                 args.requests, args.processes, 400, 100, args.rpm / 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Exercise retries, circuit breaking and failover with fault-injecting fake providers.
+
+Registers two providers in llm_service.PROVIDERS that never touch the network: 'flaky',
+which fails a share of its calls with the configured HTTP status (and Retry-After for
+429), and 'backup', which always answers. Each scenario sends a batch of requests to
+flaky through generate_many, with backup as the failover, and reports how many
+succeeded, which provider answered and how the time split into provider wait and
+retry overhead.
+
+Usage: python benchmarks/bench_resilience.py [--requests N] [--latency SECONDS]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+import llm_service
+from llm_service import LLMProvider, PROVIDERS, generate_many
+from llm_resilience import ResilientCaller, RetryPolicy, resilience_stats
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+class FakeAPIError(Exception):
+    """Shaped like the OpenAI, Groq and Anthropic SDK status errors"""
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse({'retry-after': str(retry_after)} if retry_after is not None else {})
+
+class FaultInjectingProvider(LLMProvider):
+    """Answers after a fixed latency, failing a share of calls with an HTTP status"""
+    name = 'flaky'
+    latency = 0.02
+    failure_rate = 0.0
+    status = 503
+    retry_after = None
+
+    def generate(self, prompt, model, system_prompt=None, temperature=0.7, max_tokens=None, cached_prefix=None, **kwargs):
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise FakeAPIError(self.status, self.retry_after)
+        return f"{self.name}/{model}"
+
+    async def agenerate(self, prompt, model, system_prompt=None, temperature=0.7, max_tokens=None, cached_prefix=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise FakeAPIError(self.status, self.retry_after)
+        return f"{self.name}/{model}"
+
+class BackupProvider(FaultInjectingProvider):
+    name = 'backup'
+
+SCENARIOS = [
+    ('healthy', dict(failure_rate=0.0)),
+    ('30% 429, Retry-After 0.05s', dict(failure_rate=0.3, status=429, retry_after=0.05)),
+    ('30% 503', dict(failure_rate=0.3, status=503)),
+    ('flaky down (503)', dict(failure_rate=1.0, status=503)),
+    ('bad request (400)', dict(failure_rate=1.0, status=400)),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description='Exercise the LLM retry and failover engine with fake providers')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per scenario')
+    parser.add_argument('--latency', type=float, default=0.02, help='Fake provider latency in seconds')
+    parser.add_argument('--concurrency', type=int, default=5, help='Requests in flight')
+    args = parser.parse_args()
+
+    random.seed(0)
+    PROVIDERS['flaky'] = FaultInjectingProvider
+    PROVIDERS['backup'] = BackupProvider
+    os.environ.update({
+        'FLAKY_API_KEY': 'fake', 'BACKUP_API_KEY': 'fake',
+        'LLM_FAILOVER': 'backup:backup-model', 'LLM_RESPONSE_CACHE': '0'
+    })
+    FaultInjectingProvider.latency = args.latency
+
+    print(f"{'scenario':<28} {'ok':>4} {'flaky':>6} {'backup':>7} {'errors':>7} {'wall s':>7} "
+          f"{'wait s':>7} {'overhead s':>11} {'circuit':>10}")
+    for name, settings in SCENARIOS:
+        for key, value in {'failure_rate': 0.0, 'status': 503, 'retry_after': None, **settings}.items():
+            setattr(FaultInjectingProvider, key, value)
+        BackupProvider.failure_rate = 0.0
+        # Fresh breakers and counters per scenario, with short backoff so the run stays quick
+        llm_service._resilient_caller = ResilientCaller(RetryPolicy(max_attempts=3, base_delay=0.05, max_delay=0.5),
+                                                        failure_threshold=5, reset_timeout=30)
+        resilience_stats.reset()
+
+        requests = [{'prompt': f"request {index}", 'provider': 'flaky', 'model': 'flaky-model'}
+                    for index in range(args.requests)]
+        start = time.perf_counter()
+        results = asyncio.run(generate_many(requests, concurrency=args.concurrency, return_exceptions=True))
+        wall = time.perf_counter() - start
+
+        answered = Counter(result.split('/')[0] for result in results if isinstance(result, str))
+        errors = sum(isinstance(result, BaseException) for result in results)
+        totals = resilience_stats.totals()
+        wait = sum(provider['wait_seconds'] for provider in totals.values())
+        overhead = sum(provider['failed_seconds'] + provider['backoff_seconds'] for provider in totals.values())
+        circuit = llm_service._resilient_caller.breaker('flaky').state
+        print(f"{name:<28} {len(results) - errors:>4} {answered['flaky']:>6} {answered['backup']:>7} {errors:>7} "
+              f"{wall:>7.2f} {wait:>7.2f} {overhead:>11.2f} {circuit:>10}")
+
+if __name__ == "__main__":
+    main()
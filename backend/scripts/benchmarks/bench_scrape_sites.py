@@ -0,0 +1,102 @@
+"""
+Check that a slow or failing site is skipped while the other sites' jobs are still returned.
+
+Replaces jobspy's scrape_jobs with fake sites that sleep for a set time before answering,
+so nothing goes over the network. One site answers after the site timeout and one fails.
+Runs the search in json and ndjson mode and checks that:
+
+- the search returns shortly after the timeout instead of waiting for the slow site
+- the slow and the failing site contribute no jobs
+- the jobs of every site that answered in time are returned and merged, in site order
+
+Then reports the time against scraping the sites one after another.
+
+Usage: python benchmarks/bench_scrape_sites.py [--site-timeout S]
+"""
+import io
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from urllib.parse import urlparse
+
+import pandas as pd
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+import scrape_jobs
+
+class FakeSites:
+    """scrape_jobs stand-in: each site sleeps for its delay, then returns its own postings or raises"""
+    def __init__(self, delays, failing=()):
+        self.delays = delays
+        self.failing = set(failing)
+
+    def scrape_jobs(self, site_name, search_term, location, results_wanted, **kwargs):
+        site = site_name[0]
+        time.sleep(self.delays[site])
+        if site in self.failing:
+            raise ConnectionError(f"{site} refused the connection")
+        return pd.DataFrame({
+            'title': [f"{search_term} {site} {number}" for number in range(results_wanted)],
+            'company': [f"{site.title()} Company {number}" for number in range(results_wanted)],
+            'job_url': [f"https://{site}.example.com/jobs/{number}" for number in range(results_wanted)],
+            'description': [f"Posting {number} on {site} for {search_term} in {location}." for number in range(results_wanted)],
+        })
+
+def run(output_format, sites, site_timeout, results_wanted):
+    argv = ['Data Engineer', 'Toronto', str(results_wanted), '--sites', ','.join(sites), '--site-timeout',
+            str(site_timeout), '--format', output_format, '--no-cache', '--no-archive']
+    out = io.StringIO()
+    start = time.perf_counter()
+    scrape_jobs.run_search(scrape_jobs.parse_args(argv), out=out)
+    elapsed = time.perf_counter() - start
+    if output_format == 'json':
+        jobs = json.loads(out.getvalue())
+    else:
+        jobs = [json.loads(line) for line in out.getvalue().splitlines() if line]
+    return jobs, elapsed
+
+def check(output_format, fake, fast_sites, skipped_sites, site_timeout, results_wanted):
+    jobs, elapsed = run(output_format, fast_sites + skipped_sites, site_timeout, results_wanted)
+    sites = [urlparse(job['jobUrl']).hostname.split('.')[0] for job in jobs]
+    # json merges in the requested order; ndjson writes each site as it finishes, fastest first
+    expected = sorted(fast_sites, key=fake.delays.get) if output_format == 'ndjson' else fast_sites
+    failures = []
+    if elapsed > site_timeout + 1.0:
+        failures.append(f"took {elapsed:.2f}s with a {site_timeout}s site timeout")
+    if any(site in skipped_sites for site in sites):
+        failures.append(f"returned jobs from a skipped site: {sorted(set(sites) & set(skipped_sites))}")
+    if sites != [site for site in expected for _ in range(results_wanted)]:
+        failures.append(f"expected {results_wanted} jobs from each of {expected} in order, got {len(sites)}")
+    status = 'ok' if not failures else 'FAILED: ' + '; '.join(failures)
+    print(f"{output_format:<7} {len(jobs):>5} {elapsed:>8.2f}  {status}")
+    if failures:
+        raise SystemExit(f"Site timeout check failed in {output_format} mode")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Check per-site timeouts in concurrent scraping')
+    parser.add_argument('--site-timeout', type=float, default=1.0, help='Seconds to wait for each site')
+    parser.add_argument('--results', type=int, default=5, help='Postings each fake site returns')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    fast_sites = ['indeed', 'glassdoor', 'zip_recruiter']
+    skipped_sites = ['linkedin', 'google']
+    delays = {'indeed': 0.4, 'glassdoor': 0.1, 'zip_recruiter': 0.25,
+              'linkedin': args.site_timeout * 5, 'google': 0.05}
+    fake = FakeSites(delays, failing=['google'])
+    scrape_jobs.scrape_jobs = fake.scrape_jobs
+
+    print(f"{'format':<7} {'jobs':>5} {'time s':>8}  result")
+    elapsed = [check(output_format, fake, fast_sites, skipped_sites, args.site_timeout, args.results)
+               for output_format in ('json', 'ndjson')]
+    print(f"sequential scraping would take {sum(delays.values()):.2f}s, concurrent took {max(elapsed):.2f}s at most")
+
+if __name__ == "__main__":
+    main()
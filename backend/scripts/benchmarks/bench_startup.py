@@ -0,0 +1,72 @@
+"""
+Measure the import cost of each CLI script with -X importtime and fail on regressions.
+
+Each script is started with --help, which runs every top-level import and exits before
+doing any work, so the measured time is what every spawn of that script pays up front.
+The best of several runs is compared against a per-script budget; the heaviest imports
+are listed to show where the time goes.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--scale FACTOR]
+Exits with status 1 if any script is over budget.
+"""
+import os
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import budget in milliseconds per script. The LLM scripts only need one provider SDK,
+# loaded on first use, so anything close to these numbers means an SDK is imported eagerly.
+BUDGETS_MS = {
+    'resume_tailor.py': 500,
+    'cover_letter_generator.py': 500,
+    'application_pipeline.py': 500,
+    'scrape_jobs.py': 2000
+}
+
+def measure(script: str) -> Tuple[float, List[Tuple[float, str]]]:
+    """
+    Run a script under -X importtime.
+
+    Returns:
+        Tuple of (total import time in ms, [(cumulative ms, module)] for top-level imports)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(script_dir, script), '--help'],
+        cwd=script_dir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented below the module that triggered them
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return sum(ms for ms, _ in modules), sorted(modules, reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Check CLI startup import time against budgets')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per script; the fastest is kept')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget, for slower machines')
+    parser.add_argument('--top', type=int, default=5, help='Number of heaviest imports to list')
+    args = parser.parse_args()
+
+    over_budget: Dict[str, float] = {}
+    for script, budget in BUDGETS_MS.items():
+        total, modules = min((measure(script) for _ in range(args.runs)), key=lambda run: run[0])
+        budget *= args.scale
+        status = 'ok' if total <= budget else 'OVER BUDGET'
+        print(f"{script:<28} {total:>8.0f} ms  (budget {budget:.0f} ms)  {status}")
+        for ms, name in modules[:args.top]:
+            print(f"    {ms:>8.0f} ms  {name}")
+        if total > budget:
+            over_budget[script] = total
+
+    if over_budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Measure the overhead of per-call LLM telemetry and show the usage report it feeds.
+
+A fake provider that never touches the network answers at once and reports OpenAI-style
+usage, so each call costs only the library's own work. Calls are timed with no sinks and
+with every sink enabled (JSONL file, ring buffer and Prometheus), and the difference is
+the per-call cost of tracking. The records written to the temporary JSONL file, from a
+mix of generate and stream calls with task labels, are then summarised by
+llm_usage_report as the CLI would.
+
+Usage: python benchmarks/bench_telemetry.py [--calls N]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import argparse
+from types import SimpleNamespace
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+import llm_telemetry
+from llm_service import LLMProvider, PROVIDERS, generate_text, stream_text
+from llm_telemetry import create_telemetry, telemetry_labels, PrometheusSink
+from llm_usage_report import read_records, summarize, print_table
+
+class UsageReportingProvider(LLMProvider):
+    """Answers at once, reporting prompt, cached and completion tokens like the OpenAI SDK"""
+    name = 'fake'
+
+    def usage(self, prompt, max_tokens):
+        prompt_tokens = len(prompt) // 4
+        details = SimpleNamespace(cached_tokens=prompt_tokens // 2 if random.random() < 0.5 else 0)
+        return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=max_tokens or 100,
+                               prompt_tokens_details=details)
+
+    def generate(self, prompt, model, system_prompt=None, temperature=0.7, max_tokens=None, cached_prefix=None, **kwargs):
+        self.record_usage(model, self.usage(prompt, max_tokens))
+        return 'ok'
+
+    def generate_stream(self, prompt, model, system_prompt=None, temperature=0.7, max_tokens=None, **kwargs):
+        for word in ('streamed ', 'reply'):
+            yield word
+        self.record_usage(model, self.usage(prompt, max_tokens))
+
+def time_calls(calls: int) -> float:
+    """Seconds per generate_text call"""
+    start = time.perf_counter()
+    for index in range(calls):
+        generate_text(prompt=f"request {index} " + 'x' * 4000, provider='fake', model='gpt-4o-mini', max_tokens=300)
+    return (time.perf_counter() - start) / calls
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure LLM telemetry overhead and summarise the records')
+    parser.add_argument('--calls', type=int, default=2000, help='Calls per overhead measurement')
+    args = parser.parse_args()
+
+    random.seed(0)
+    PROVIDERS['fake'] = UsageReportingProvider
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_telemetry_'), 'llm_calls.jsonl')
+    os.environ.update({'FAKE_API_KEY': 'fake', 'LLM_RESPONSE_CACHE': '0', 'LLM_TELEMETRY_FILE': path})
+
+    time_calls(100)
+    llm_telemetry._telemetry = create_telemetry('')
+    untracked = time_calls(args.calls)
+    llm_telemetry._telemetry = create_telemetry('jsonl,memory,prometheus')
+    tracked = time_calls(args.calls)
+    print(f"{'sinks':<28} {'per call us':>12}")
+    print(f"{'none':<28} {untracked * 1e6:>12.1f}")
+    print(f"{'jsonl, memory, prometheus':<28} {tracked * 1e6:>12.1f}")
+    print(f"Telemetry overhead: {(tracked - untracked) * 1e6:.1f} us per call\n")
+
+    for task in ('resume', 'cover_letter'):
+        with telemetry_labels(task=task):
+            for index in range(20):
+                ''.join(stream_text(prompt=f"{task} {index} " + 'y' * 8000, provider='fake', model='gpt-4.1-mini',
+                                    max_tokens=800))
+    summary = summarize(read_records(path), ['provider', 'model'])
+    print_table(summary, 'provider/model')
+    print()
+    print_table(summarize(read_records(path), ['task']), 'task')
+    metrics = llm_telemetry.get_telemetry().sink(PrometheusSink).render()
+    print(f"\nPrometheus exposition: {len(metrics.splitlines())} lines, e.g.")
+    print('\n'.join(line for line in metrics.splitlines() if line.startswith('llm_requests_total')))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark spawning resume_tailor.py per request against POST /tailor on the worker service.
+
+Both paths talk to the stub OpenAI endpoint from bench_provider_registry, so the numbers
+measure process startup, imports and client setup rather than model latency. The worker
+runs as a separate process, exactly as the Node backend would use it.
+
+Usage: python benchmarks/bench_worker_service.py [requests] [concurrency]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import tempfile
+import threading
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(script_dir)
+
+from bench_provider_registry import StubHandler
+
+JOB_DATA = {'title': 'Backend Engineer', 'company': 'Acme', 'description': 'Build APIs in Python.'}
+RESUME = "\\documentclass{article}\n\\begin{document}\nJane Doe, Python developer.\n\\end{document}\n"
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def spawn_tailor(resume_path: str, output_dir: str, env) -> None:
+    subprocess.run([
+        sys.executable, os.path.join(script_dir, 'resume_tailor.py'),
+        '--job-data', json.dumps(JOB_DATA),
+        '--llm-provider', 'openai',
+        '--api-key', 'sk-bench',
+        '--primary-resume', resume_path,
+        '--output-dir', output_dir
+    ], env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def post_tailor(worker_url: str, resume_path: str, output_dir: str) -> None:
+    body = json.dumps({
+        'job_data': JOB_DATA,
+        'llm_provider': 'openai',
+        'api_key': 'sk-bench',
+        'primary_resume': resume_path,
+        'output_dir': output_dir
+    }).encode('utf-8')
+    request = urllib.request.Request(f"{worker_url}/tailor", data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+def wait_for_worker(worker_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{worker_url}/health") as response:
+                response.read()
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit("worker service did not start")
+
+def run(label: str, call, requests: int, concurrency: int) -> None:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: call(), range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {requests / elapsed:>8.1f} req/s {elapsed / requests * 1000:>9.1f} ms/req")
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    env = {**os.environ, 'OPENAI_BASE_URL': f"http://127.0.0.1:{server.server_address[1]}/v1"}
+
+    work_dir = tempfile.mkdtemp(prefix='bench_worker_')
+    resume_path = os.path.join(work_dir, 'resume.tex')
+    with open(resume_path, 'w') as f:
+        f.write(RESUME)
+    output_dir = os.path.join(work_dir, 'out')
+
+    port = free_port()
+    worker_url = f"http://127.0.0.1:{port}"
+    worker = subprocess.Popen(
+        [sys.executable, os.path.join(script_dir, 'worker_service.py'), '--port', str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    try:
+        wait_for_worker(worker_url)
+        # Warm up the worker's imports and client
+        post_tailor(worker_url, resume_path, output_dir)
+
+        print(f"requests: {requests}, concurrency: {concurrency}")
+        run('spawn per request', lambda: spawn_tailor(resume_path, output_dir, env), requests, concurrency)
+        run('worker service', lambda: post_tailor(worker_url, resume_path, output_dir), requests, concurrency)
+    finally:
+        worker.terminate()
+        worker.wait()
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
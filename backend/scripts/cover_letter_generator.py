@@ -1,8 +1,12 @@
 import json
-from typing import Dict, Any, Optional
+import logging
+from typing import Dict, Any, Optional, Callable
 import os
 from pathlib import Path
-from llm_service import generate_text
+from functools import partial
+from prompt_context import SYSTEM_PROMPT, get_context, read_resume
+from llm_service import generate_text, generate_text_streaming, print_delta_event
+from llm_telemetry import telemetry_labels
 from datetime import datetime
 
 class cover_letter_generator:
@@ -20,38 +24,19 @@ class cover_letter_generator:
         Returns:
             Content of the resume file as string
         """
-        with open(resume_path, 'r') as f:
-            return f.read()
+        return read_resume(resume_path)
 
-    def create_cover_letter_prompt(self, job_data: Dict[str, Any], resume_content: str) -> str:
+    def create_cover_letter_instructions(self, job_data: Dict[str, Any]) -> str:
         """
-        Create a comprehensive prompt for the LLM to generate a cover letter.
+        Create the task part of the cover letter prompt, which follows the resume and job details.
         
         Args:
             job_data: Dictionary containing job details
-            resume_content: Content of the resume
             
         Returns:
-            A detailed prompt for the LLM
+            Instructions for writing the cover letter
         """
-        # Extract relevant job information
-        job_title = job_data.get('title', '')
-        company = job_data.get('company', '')
-        location = job_data.get('location', {})
-        job_description = job_data.get('description', '')
-        requirements = job_data.get('requirements', '')
-        
-        prompt = f"""You are an expert career consultant and professional writer. Your task is to create a compelling cover letter for the position of {job_title} at {company}.
-
-Job Details:
-- Position: {job_title}
-- Company: {company}
-- Location: {location.get('city', '')}, {location.get('state', '')}, {location.get('country', '')}
-- Job Description: {job_description}
-- Requirements: {requirements}
-
-Applicant's Resume:
-{resume_content}
+        return f"""Task: write a compelling cover letter for the position of {job_data.get('title', '')} at {job_data.get('company', '')}, based on the resume above.
 
 Instructions:
 1. Create a professional, one-page cover letter in LaTeX format.
@@ -87,7 +72,39 @@ Instructions:
 
 Please provide the cover letter in LaTeX format, maintaining all the proper LaTeX commands and structure while creating a compelling and professional document."""
 
-        return prompt
+    def create_cover_letter_prompt(self, job_data: Dict[str, Any], resume_content: str) -> str:
+        """
+        Create a comprehensive prompt for the LLM to generate a cover letter.
+        
+        Args:
+            job_data: Dictionary containing job details
+            resume_content: Content of the resume
+            
+        Returns:
+            A detailed prompt for the LLM: the resume, the job details, then the instructions
+        """
+        context = get_context(resume_content, job_data)
+        return context.resume_prefix() + context.job_details() + self.create_cover_letter_instructions(job_data)
+
+    def create_generation_request(self, job_data: Dict[str, Any], resume_content: str) -> Dict[str, Any]:
+        """
+        Build the LLM request for a cover letter, with the resume first so providers can cache it.
+        
+        Args:
+            job_data: Dictionary containing job details
+            resume_content: Content of the resume
+            
+        Returns:
+            generate_text keyword arguments
+        """
+        context = get_context(resume_content, job_data)
+        return {
+            'cached_prefix': context.resume_prefix(),
+            'prompt': context.job_details() + self.create_cover_letter_instructions(job_data),
+            'system_prompt': SYSTEM_PROMPT,
+            'temperature': 0.7,
+            'max_tokens': 4000
+        }
 
     def generate_cover_letter(
         self,
@@ -96,6 +113,7 @@ Please provide the cover letter in LaTeX format, maintaining all the proper LaTe
         provider: str = "openai",
         model: str = "gpt-4-turbo-preview",
         api_key: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
         **kwargs
     ) -> str:
         """
@@ -107,6 +125,7 @@ Please provide the cover letter in LaTeX format, maintaining all the proper LaTe
             provider: LLM provider to use ('openai', 'anthropic', 'groq', 'google')
             model: Model name to use
             api_key: API key for the provider
+            on_delta: If given, the response is streamed and each text delta is passed to it
             **kwargs: Additional arguments to pass to the LLM service
             
         Returns:
@@ -115,23 +134,28 @@ Please provide the cover letter in LaTeX format, maintaining all the proper LaTe
         # Read the resume
         resume_content = self.read_resume(resume_path)
         
-        # Create the cover letter prompt
-        prompt = self.create_cover_letter_prompt(job_data, resume_content)
+        # Create the cover letter request
+        request = self.create_generation_request(job_data, resume_content)
         
         # Generate the cover letter using LLM
-        cover_letter = generate_text(
-            prompt=prompt,
-            provider=provider,
-            model=model,
-            api_key=api_key,
-            system_prompt="You are an expert professional writer and LaTeX specialist. Your task is to create compelling, tailored cover letters that highlight the applicant's qualifications while maintaining proper LaTeX formatting.",
-            temperature=0.7,
-            max_tokens=4000,
-            **kwargs
-        )
+        generate = generate_text if on_delta is None else partial(generate_text_streaming, on_delta)
+        with telemetry_labels(task='cover_letter'):
+            cover_letter = generate(
+                provider=provider,
+                model=model,
+                api_key=api_key,
+                **request,
+                **kwargs
+            )
         
         return cover_letter
 
+    def output_filename(self, job_data: Dict[str, Any], timestamp: str) -> str:
+        """Name of the saved cover letter, from the company, job title and a timestamp"""
+        company = job_data.get('company', 'unknown').lower().replace(' ', '_')
+        title = job_data.get('title', 'unknown').lower().replace(' ', '_')
+        return f"{company}_{title}_{timestamp}_cover_letter.tex"
+
     def save_cover_letter(
         self,
         cover_letter_content: str,
@@ -159,7 +183,9 @@ Please provide the cover letter in LaTeX format, maintaining all the proper LaTe
         llm_provider: str = 'openai',
         api_key: Optional[str] = None,
         resume_path: str = 'Resume_base.tex',
-        output_dir: str = 'outputs/cover_letters'
+        output_dir: str = 'outputs/cover_letters',
+        model: str = 'gpt-4-turbo-preview',
+        on_delta: Optional[Callable[[str], None]] = None
     ) -> str:
         """
         High-level function to generate and save a tailored cover letter.
@@ -170,51 +196,38 @@ Please provide the cover letter in LaTeX format, maintaining all the proper LaTe
             api_key: API key for the provider
             resume_path: Path to the resume
             output_dir: Directory to save the cover letter
+            model: Model name to use
+            on_delta: If given, the response is streamed and each text delta is passed to it
             
         Returns:
             Path to the saved cover letter
         """
-        try:
-            # Generate the cover letter
-            cover_letter = self.generate_cover_letter(
-                resume_path=resume_path,
-                job_data=job_data,
-                provider=llm_provider,
-                api_key=api_key
-            )
-            
-            # Create output filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            company = job_data.get('company', 'unknown').lower().replace(' ', '_')
-            title = job_data.get('title', 'unknown').lower().replace(' ', '_')
-            output_filename = f"{company}_{title}_{timestamp}_cover_letter.tex"
-            output_path = os.path.join(output_dir, output_filename)
-            
-            # Save the cover letter
-            self.save_cover_letter(cover_letter, output_path, job_data)
-            
-            # Return JSON response
-            response = {
-                'success': True,
-                'cover_letter_path': output_path,
-                'error': None
-            }
-            print(json.dumps(response))
-            return output_path
-            
-        except Exception as e:
-            error_response = {
-                'success': False,
-                'cover_letter_path': None,
-                'error': str(e)
-            }
-            print(json.dumps(error_response))
-            raise
+        # Generate the cover letter
+        cover_letter = self.generate_cover_letter(
+            resume_path=resume_path,
+            job_data=job_data,
+            provider=llm_provider,
+            model=model,
+            api_key=api_key,
+            on_delta=on_delta
+        )
+        
+        # Create output filename with timestamp
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = os.path.join(output_dir, self.output_filename(job_data, timestamp))
+        
+        # Save the cover letter
+        self.save_cover_letter(cover_letter, output_path, job_data)
+
+        return output_path
 
 if __name__ == '__main__':
     import argparse
     import sys
 
+    # Logs go to stderr so stdout stays machine-readable
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
     parser = argparse.ArgumentParser(description='Generate a tailored cover letter')
     parser.add_argument('--resume_path', type=str, required=True, help='Path to the resume file')
     parser.add_argument('--job_data', type=str, required=True, help='JSON string of job data')
@@ -222,6 +235,7 @@ if __name__ == '__main__':
     parser.add_argument('--model', type=str, default='gpt-4-turbo-preview', help='Model to use')
     parser.add_argument('--api_key', type=str, help='API key for the provider')
     parser.add_argument('--output_dir', type=str, required=True, help='Output directory')
+    parser.add_argument('--stream', action='store_true', help='Write text deltas to stdout as NDJSON events')
 
     args = parser.parse_args()
 
@@ -233,10 +247,19 @@ if __name__ == '__main__':
             llm_provider=args.provider,
             api_key=args.api_key,
             resume_path=args.resume_path,
-            output_dir=args.output_dir
+            output_dir=args.output_dir,
+            model=args.model,
+            on_delta=print_delta_event if args.stream else None
         )
+        print(json.dumps({
+            **({'event': 'done'} if args.stream else {}),
+            'success': True,
+            'cover_letter_path': output_path,
+            'error': None
+        }))
     except Exception as e:
         error_response = {
+            **({'event': 'error'} if args.stream else {}),
             'success': False,
             'cover_letter_path': None,
             'error': str(e)
@@ -0,0 +1,388 @@
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.compute as pc
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from job_dedup import normalize_url, normalize_text
+from paths import backend_path
+
+logger = logging.getLogger(__name__)
+
+# Fields of a processed job (scrape_jobs.row_to_dict), with location and salary flattened
+SCHEMA = pa.schema([
+    ('job_key', pa.string()),
+    ('archived_at', pa.float64()),
+    ('source', pa.string()),
+    ('title', pa.string()),
+    ('company', pa.string()),
+    ('companyUrl', pa.string()),
+    ('jobUrl', pa.string()),
+    ('location_country', pa.string()),
+    ('location_city', pa.string()),
+    ('location_state', pa.string()),
+    ('isRemote', pa.bool_()),
+    ('description', pa.string()),
+    ('jobType', pa.string()),
+    ('salary_interval', pa.string()),
+    ('salary_minAmount', pa.float64()),
+    ('salary_maxAmount', pa.float64()),
+    ('salary_currency', pa.string()),
+    ('datePosted', pa.string()),
+    ('companyIndustry', pa.string()),
+    ('companyLogo', pa.string()),
+    # Any other fields, e.g. the skills and job_level the generators are given, as JSON
+    ('extra', pa.string()),
+])
+NESTED_FIELDS = {'location': ('country', 'city', 'state'), 'salary': ('interval', 'minAmount', 'maxAmount', 'currency')}
+
+def job_key(job: Dict[str, Any]) -> str:
+    """Identity of a posting: its normalized jobUrl, or its company, title and description without one"""
+    url = normalize_url(job.get('jobUrl'))
+    if url:
+        return url
+    parts = [normalize_text(job.get('company')), normalize_text(job.get('title')), normalize_text(job.get('description'))]
+    return 'sha256:' + hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()[:32]
+
+def flatten_job(job: Dict[str, Any], source: str, archived_at: float) -> Dict[str, Any]:
+    """One archive row for a job dictionary"""
+    row = {'job_key': job_key(job), 'archived_at': archived_at, 'source': source}
+    extra = {}
+    for name, value in job.items():
+        if name in NESTED_FIELDS and (value is None or isinstance(value, dict)):
+            for field in NESTED_FIELDS[name]:
+                row[f"{name}_{field}"] = (value or {}).get(field)
+        elif name in SCHEMA.names and name not in ('job_key', 'archived_at', 'source', 'extra'):
+            row[name] = value
+        else:
+            extra[name] = value
+    row['extra'] = json.dumps(extra, default=str) if extra else None
+    return row
+
+def row_to_job(row: Dict[str, Any]) -> Dict[str, Any]:
+    """The job dictionary an archive row was made from, as flatten_job's inverse"""
+    flattened = {f"{name}_{field}" for name, fields in NESTED_FIELDS.items() for field in fields}
+    job = {name: value for name, value in row.items()
+           if name not in flattened and name not in ('job_key', 'archived_at', 'source', 'extra')}
+    for name, fields in NESTED_FIELDS.items():
+        values = {field: row.get(f"{name}_{field}") for field in fields}
+        job[name] = values if any(value is not None for value in values.values()) else None
+    if row.get('extra'):
+        job.update(json.loads(row['extra']))
+    return job
+
+def rows_to_table(rows: List[Dict[str, Any]]) -> pa.Table:
+    columns = {}
+    for field in SCHEMA:
+        values = [row.get(field.name) for row in rows]
+        if pa.types.is_string(field.type):
+            values = [None if value is None else str(value) for value in values]
+        elif pa.types.is_floating(field.type):
+            values = [float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None for value in values]
+        elif pa.types.is_boolean(field.type):
+            values = [value if isinstance(value, bool) else None for value in values]
+        columns[field.name] = pa.array(values, type=field.type)
+    return pa.table(columns, schema=SCHEMA)
+
+class JobArchive:
+    """
+    Append-only columnar archive of processed job postings, as Arrow IPC files in one directory.
+
+    Each append writes a new segment file, so writers never rewrite data and a reader never
+    sees a half-written file. Segments are memory-mapped on read and only the requested
+    columns are decoded, so scanning titles and companies does not touch the descriptions.
+    The same posting archived more than once (by jobUrl, or company, title and description
+    without one) reads back as its latest copy. compact() merges the segments, drops older
+    copies and postings past retention, and trims the oldest postings to a size budget.
+    Appends start it on a background thread once enough segments pile up, with the
+    archive's retention limits, so disk use stays bounded without running the CLI.
+    """
+    def __init__(self, directory: str = backend_path('data/archive/jobs'), compression: Optional[str] = 'zstd',
+                 auto_compact_segments: int = 64, max_age_days: Optional[float] = None,
+                 max_mb: Optional[float] = None):
+        """
+        Initialize the archive.
+
+        Args:
+            directory: Directory holding the archive's files
+            compression: Buffer compression for new files, 'zstd', 'lz4' or None
+            auto_compact_segments: Compact after an append once this many segments exist; 0 turns it off
+            max_age_days: Retention applied by automatic compaction, in days since archiving
+            max_mb: Size budget applied by automatic compaction, in megabytes
+        """
+        self.directory = directory
+        self.compression = compression
+        self.auto_compact_segments = auto_compact_segments
+        self.max_age_days = max_age_days
+        self.max_mb = max_mb
+        self._lock = threading.Lock()
+        self._compaction: Optional[threading.Thread] = None
+        self._compact_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, '*.arrow')))
+
+    def _write(self, table: pa.Table, prefix: str) -> str:
+        path = os.path.join(self.directory, f"{prefix}-{time.time_ns()}-{os.getpid()}.arrow")
+        partial = path + '.partial'
+        options = ipc.IpcWriteOptions(compression=self.compression)
+        with pa.OSFile(partial, 'wb') as sink:
+            with ipc.new_file(sink, SCHEMA, options=options) as writer:
+                writer.write_table(table, max_chunksize=10000)
+        os.replace(partial, path)
+        return path
+
+    def append(self, jobs: Iterable[Dict[str, Any]], source: str = 'scrape') -> int:
+        """
+        Archive job dictionaries as a new segment.
+
+        Args:
+            jobs: Jobs as produced by scrape_jobs.process_jobs, or the job_data given to the generators
+            source: Where the jobs came from, e.g. 'scrape' or 'tailor'
+
+        Returns:
+            Number of jobs written
+        """
+        now = time.time()
+        rows = [flatten_job(job, source, now) for job in jobs]
+        if not rows:
+            return 0
+        self._write(rows_to_table(rows), 'segment')
+        if self.auto_compact_segments and len(self.segments()) >= self.auto_compact_segments:
+            self.compact_in_background()
+        return len(rows)
+
+    def compact_in_background(self) -> Optional[threading.Thread]:
+        """
+        Start compaction with the archive's retention limits on a background thread.
+
+        The thread is not a daemon, so a short-lived script finishes compacting before it
+        exits rather than leaving the work for the next run.
+
+        Returns:
+            The compaction thread, or None if one is already running
+        """
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return None
+            self._compaction = threading.Thread(target=self._compact_logged, name='job-archive-compact')
+            self._compaction.start()
+            return self._compaction
+
+    def _compact_logged(self) -> None:
+        try:
+            self.compact(self.max_age_days, self.max_mb)
+        except Exception as e:
+            logger.warning(f"Background compaction of the job archive failed: {e}")
+
+    def read_segment(self, path: str, columns: Optional[List[str]] = None) -> pa.Table:
+        """Read one file memory-mapped, decoding only the given columns"""
+        with pa.memory_map(path, 'r') as source:
+            options = ipc.IpcReadOptions(included_fields=[SCHEMA.get_field_index(name) for name in columns]) if columns else None
+            return ipc.open_file(source, options=options).read_all()
+
+    def scan_table(self, columns: Optional[List[str]] = None, latest_only: bool = True,
+                   modified_after: Optional[float] = None) -> pa.Table:
+        """
+        Read the archive as an Arrow table.
+
+        Args:
+            columns: Columns to read, every column by default
+            latest_only: Keep only the latest copy of each posting
+            modified_after: Only read files written after this Unix time
+
+        Returns:
+            Table of the requested columns
+        """
+        needed = list(columns or SCHEMA.names)
+        if latest_only:
+            needed += [name for name in ('job_key', 'archived_at') if name not in needed]
+        needed = [name for name in SCHEMA.names if name in needed]
+        tables = []
+        for path in self.segments():
+            try:
+                if modified_after is not None and os.path.getmtime(path) <= modified_after:
+                    continue
+                tables.append(self.read_segment(path, needed))
+            except FileNotFoundError:
+                # Removed by a compaction that finished while we were listing
+                continue
+        if not tables:
+            return SCHEMA.empty_table().select(needed).select(columns or needed)
+        table = pa.concat_tables(tables)
+        if latest_only and table.num_rows:
+            table = self._latest(table)
+        return table.select(columns or SCHEMA.names)
+
+    def _latest(self, table: pa.Table) -> pa.Table:
+        # Sort newest first, then keep the first row of each key
+        table = table.take(pc.sort_indices(table, [('archived_at', 'descending')]))
+        keys = table.column('job_key').to_numpy(zero_copy_only=False)
+        first = pd.Index(keys).duplicated(keep='first')
+        return table.filter(pa.array(~first)) if first.any() else table
+
+    def scan(self, columns: Optional[List[str]] = None, latest_only: bool = True) -> pd.DataFrame:
+        """Read the archive as a DataFrame; see scan_table"""
+        return self.scan_table(columns, latest_only).to_pandas()
+
+    def recent_jobs(self, since: Optional[float] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Latest copies of the postings archived after a time, newest first.
+
+        Args:
+            since: Unix time to read from; every posting by default
+
+        Returns:
+            List of (archived_at, job dictionary) pairs
+        """
+        # A file holds nothing archived after it was written, so older files can be skipped
+        table = self.scan_table(modified_after=since)
+        if since is not None and table.num_rows:
+            table = table.filter(pc.greater(table.column('archived_at'), since))
+        return [(row['archived_at'], row_to_job(row)) for row in table.to_pylist()]
+
+    def compact(self, max_age_days: Optional[float] = None, max_mb: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Merge every segment into one file of the latest copies, within the retention limits.
+
+        Only the files present when compaction starts are replaced, so jobs appended meanwhile
+        are kept; a second compaction running at the same time waits for the first.
+
+        Args:
+            max_age_days: Drop postings archived longer ago than this
+            max_mb: Drop the oldest postings until the archive's data fits in this many megabytes
+
+        Returns:
+            Dict with the files and rows before and after, and the bytes on disk after
+        """
+        import fcntl
+        with self._compact_lock, open(os.path.join(self.directory, '.compact.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            paths = self.segments()
+            tables = [self.read_segment(path) for path in paths]
+            rows_before = sum(table.num_rows for table in tables)
+            table = self._latest(pa.concat_tables(tables)) if tables else SCHEMA.empty_table()
+            if max_age_days is not None and table.num_rows:
+                cutoff = time.time() - max_age_days * 86400
+                table = table.filter(pc.greater_equal(table.column('archived_at'), cutoff))
+            written = self._write(table, 'compacted') if table.num_rows else None
+            if max_mb is not None:
+                budget = max_mb * 1024 * 1024
+                while written is not None and os.path.getsize(written) > budget:
+                    # Rows are newest first, so cutting the tail drops the oldest postings
+                    keep = int(table.num_rows * budget / os.path.getsize(written) * 0.95)
+                    os.remove(written)
+                    table = table.slice(0, keep)
+                    written = self._write(table, 'compacted') if table.num_rows else None
+            for path in paths:
+                if path != written:
+                    os.remove(path)
+            result = {
+                'files_before': len(paths),
+                'rows_before': rows_before,
+                'files_after': len(self.segments()),
+                'rows_after': table.num_rows,
+                'bytes_after': sum(os.path.getsize(path) for path in self.segments())
+            }
+        logger.info(
+            f"Compacted job archive: {result['files_before']} files and {result['rows_before']} rows to "
+            f"{result['rows_after']} rows in {result['bytes_after'] / 1024:.0f} KB"
+        )
+        return result
+
+    def import_json_files(self, paths: List[str], source: str = 'import', remove: bool = False) -> int:
+        """Archive job_data_*.json files, one job per file, optionally deleting them once archived"""
+        jobs = []
+        imported = []
+        for path in paths:
+            try:
+                with open(path, 'r') as f:
+                    jobs.append(json.load(f))
+                imported.append(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping {path}: {e}")
+        count = self.append(jobs, source)
+        if remove:
+            for path in imported:
+                os.remove(path)
+        return count
+
+_archive: Optional[JobArchive] = None
+_archive_lock = threading.Lock()
+
+def retention_from_env(name: str, default: str) -> Optional[float]:
+    """Read a retention limit from the environment; empty or 0 means no limit"""
+    value = float(os.getenv(name, default) or 0)
+    return value or None
+
+def get_job_archive() -> JobArchive:
+    """Return the process-wide archive in JOB_ARCHIVE_DIR, created on first use"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = JobArchive(
+                backend_path(os.getenv('JOB_ARCHIVE_DIR', 'data/archive/jobs')),
+                max_age_days=retention_from_env('JOB_ARCHIVE_MAX_AGE_DAYS', '180'),
+                max_mb=retention_from_env('JOB_ARCHIVE_MAX_MB', '1024')
+            )
+        return _archive
+
+def job_archive_enabled() -> bool:
+    """Whether archiving is switched on through the JOB_ARCHIVE environment variable (off by default)"""
+    return os.getenv('JOB_ARCHIVE', '').lower() in ('1', 'true', 'yes', 'on')
+
+def archive_jobs(jobs: Iterable[Dict[str, Any]], source: str) -> None:
+    """Archive jobs if JOB_ARCHIVE is on, logging rather than raising on failure"""
+    if not job_archive_enabled():
+        return
+    try:
+        get_job_archive().append(jobs, source)
+    except Exception as e:
+        logger.warning(f"Could not archive jobs: {e}")
+
+
+if __name__ == '__main__':
+
+    # Logs go to stderr so stdout stays machine-readable
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    parser = argparse.ArgumentParser(description='Manage the columnar job archive')
+    parser.add_argument('--dir', type=str, default=backend_path(os.getenv('JOB_ARCHIVE_DIR', 'data/archive/jobs')),
+                        help='Archive directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help='Archive job_data_*.json files')
+    import_parser.add_argument('paths', nargs='+', help='JSON files holding one job each')
+    import_parser.add_argument('--remove', action='store_true', help='Delete the files once archived')
+    compact_parser = commands.add_parser('compact', help='Merge segments and apply retention')
+    compact_parser.add_argument('--max-age-days', type=float, default=retention_from_env('JOB_ARCHIVE_MAX_AGE_DAYS', '180'),
+                                help='Drop postings archived longer ago than this (default: JOB_ARCHIVE_MAX_AGE_DAYS)')
+    compact_parser.add_argument('--max-mb', type=float, default=retention_from_env('JOB_ARCHIVE_MAX_MB', '1024'),
+                                help='Drop the oldest postings beyond this size (default: JOB_ARCHIVE_MAX_MB)')
+    export_parser = commands.add_parser('export', help='Print the latest copy of each posting as JSON lines')
+    export_parser.add_argument('--columns', type=str, help='Comma-separated columns, all by default')
+
+    args = parser.parse_args()
+    archive = JobArchive(args.dir)
+
+    if args.command == 'import':
+        print(json.dumps({'imported': archive.import_json_files(args.paths, remove=args.remove)}))
+    elif args.command == 'compact':
+        print(json.dumps(archive.compact(args.max_age_days, args.max_mb)))
+    else:
+        columns = args.columns.split(',') if args.columns else None
+        for row in archive.scan_table(columns).to_pylist():
+            print(json.dumps(row, default=str))
@@ -0,0 +1,167 @@
+import re
+import logging
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {'ref', 'refid', 'trk', 'trackingid', 'from', 'src', 'source', 'vjs', 'tk', 'gclid', 'fbclid'}
+WORD_RE = re.compile(r'[a-z0-9]+')
+MAX_HASH = np.uint64((1 << 32) - 1)
+SHINGLE_BASE = np.uint64(1000003)
+# Largest prime below 2^32, so a * x + b fits in 64 bits for 32-bit a, b and x
+HASH_PRIME = np.uint64(4294967291)
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
+    """Normalize a job URL so the same posting always maps to the same string"""
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+    )
+    return urlunsplit(('', host, parts.path.rstrip('/'), urlencode(query), ''))
+
+def normalize_text(value: Optional[str]) -> str:
+    """Lowercase a field and keep only its words"""
+    if not value:
+        return ''
+    return ' '.join(WORD_RE.findall(str(value).lower()))
+
+class MinHasher:
+    """Computes MinHash signatures of word shingles with a fixed set of hash permutations"""
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(1, HASH_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, HASH_PRIME, num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Return the distinct 32-bit hashes of the word shingles of a text"""
+        words = WORD_RE.findall(text.lower())
+        if not words:
+            return np.empty(0, dtype=np.uint64)
+        word_hashes = np.fromiter(map(hash, words), dtype=np.int64, count=len(words)).astype(np.uint64)
+        size = min(self.shingle_size, len(words))
+        count = len(words) - size + 1
+        # Polynomial rolling hash over each window of words
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset in range(size):
+            hashes = (hashes * SHINGLE_BASE + word_hashes[offset:offset + count]) & MAX_HASH
+        return np.unique(hashes)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Return the MinHash signature of a text, or None if it has no words"""
+        shingles = self.shingles(text)
+        if shingles.size == 0:
+            return None
+        # Universal hashing (a * x + b) mod p, one row per permutation
+        permuted = (np.outer(self.a, shingles) + self.b[:, None]) % HASH_PRIME
+        return permuted.min(axis=1)
+
+class JobDedupIndex:
+    """
+    Incremental index that flags duplicate job postings, within a site or across sites.
+
+    A job is a duplicate when its normalized jobUrl was already seen, or when an earlier job
+    with the same normalized (company, title, city) has a near-identical description
+    (MinHash similarity at or above the threshold). Jobs with the same key also count as
+    duplicates when either has no description. One company's postings of a role in several
+    cities, or of several roles sharing a description, are all kept. Description candidates
+    come from LSH bands over the MinHash signatures of jobs with the same key, so each job
+    is compared against a handful of others rather than every job seen so far.
+    """
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.seen_urls = set()
+        self.keys = set()
+        self.undescribed_keys = set()
+        self.lsh_buckets: Dict[Tuple[Tuple[str, str, str], int, bytes], List[int]] = defaultdict(list)
+        self.keys_by_index: List[Tuple[str, str, str]] = []
+        self.signatures: List[Optional[np.ndarray]] = []
+        self.dropped_by_url = 0
+        self.dropped_near_duplicates = 0
+
+    def similarity(self, first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return np.count_nonzero(first == second) / first.size
+
+    def add(self, job: Dict[str, Any]) -> bool:
+        """
+        Add a processed job to the index.
+
+        Args:
+            job: Job dictionary as produced by scrape_jobs.process_jobs
+
+        Returns:
+            True if the job is new, False if it duplicates one already added
+        """
+        url = normalize_url(job.get('jobUrl'))
+        if url and url in self.seen_urls:
+            self.dropped_by_url += 1
+            return False
+
+        company = normalize_text(job.get('company'))
+        key = (company, normalize_text(job.get('title')), normalize_text((job.get('location') or {}).get('city')))
+        signature = self.hasher.signature(job.get('description') or '')
+        bands = [] if signature is None else [
+            # Bucketed by key too, so boilerplate shared across a company's postings stays cheap
+            (key, band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)
+        ]
+
+        if company:
+            if key in (self.keys if signature is None else self.undescribed_keys):
+                return self._drop_near_duplicate(url)
+            candidates = {index for band in bands for index in self.lsh_buckets.get(band, [])}
+            for index in candidates:
+                if (self.keys_by_index[index] == key
+                        and self.similarity(signature, self.signatures[index]) >= self.threshold):
+                    return self._drop_near_duplicate(url)
+
+        index = len(self.signatures)
+        self.signatures.append(signature)
+        self.keys_by_index.append(key)
+        if url:
+            self.seen_urls.add(url)
+        if company:
+            self.keys.add(key)
+            if signature is None:
+                self.undescribed_keys.add(key)
+        for band in bands:
+            self.lsh_buckets[band].append(index)
+        return True
+
+    def _drop_near_duplicate(self, url: Optional[str]) -> bool:
+        # Remember the URL too so a later exact repeat is caught cheaply
+        if url:
+            self.seen_urls.add(url)
+        self.dropped_near_duplicates += 1
+        return False
+
+    def filter(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the jobs that are not duplicates, keeping the first occurrence"""
+        return [job for job in jobs if self.add(job)]
+
+    @property
+    def dropped(self) -> int:
+        return self.dropped_by_url + self.dropped_near_duplicates
+
+    def log_stats(self) -> None:
+        logger.info(
+            f"Dropped {self.dropped} duplicate jobs "
+            f"({self.dropped_by_url} by URL, {self.dropped_near_duplicates} near-duplicates)"
+        )
@@ -0,0 +1,187 @@
+import os
+import re
+import math
+import logging
+from collections import Counter
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = 500
+WORD_RE = re.compile(r'[a-z][a-z0-9+#.]*[a-z0-9+#]|[a-z]')
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9])')
+# Markdown escapes (\-, \+, \&, \#, \[) and emphasis markers as scraped from job boards
+MARKDOWN_ESCAPE_RE = re.compile(r'\\([\\`*_{}\[\]()#+\-.!&$%|>~])')
+EMPHASIS_RE = re.compile(r'\*{1,3}|_{2,3}')
+LINK_RE = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+BULLET_RE = re.compile(r'^\s*(?:[*\-\u2022]|\d+[.)])\s+')
+LATEX_COMMAND_RE = re.compile(r'\\[a-zA-Z]+\*?|[{}$&%~^_]')
+NON_TEXT_RE = re.compile(r'[^\w\s.,;:!?()/&+#%$\'"\u2019-]')
+
+# Headings whose whole section is boilerplate rather than part of the role
+BOILERPLATE_HEADING_RE = re.compile(
+    r'\b(benefits?|perks|what we offer|we offer|why (join|work)|about (us|the company)|who we are|'
+    r'a little bit about us|our (culture|values|mission)|compensation|equal opportunit|eeo|diversity|'
+    r'what you need to know|how to apply|to be considered|accommodation)',
+    re.IGNORECASE
+)
+# Paragraphs that are boilerplate wherever they appear
+BOILERPLATE_TEXT_RE = re.compile(
+    r'(equal[\s-]opportunity|affirmative action|without regard to|regardless of (race|age|gender)|'
+    r'sexual orientation|gender identity|protected (veteran|status)|accommodations?\b|barrier[\s-]free|'
+    r'background check|criminal record|credit check|e-verify|will only contact|only .{0,30}candidates .{0,20}contacted|'
+    r'apply (now|today)|submit your (resume|application)|we can.t wait|don.t delay|'
+    r'dental|pension|rrsp|401\(?k|paid (time off|holidays)|vacation|tuition reimbursement|discount)',
+    re.IGNORECASE
+)
+
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does
+doing during each few for from further had has have having he her here hers him his how i if in into
+is it its itself just me more most my no nor not of off on once only or other our ours out over own
+same she should so some such than that the their theirs them then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself work working team role position company job including etc within across
+""".split())
+
+def description_token_budget() -> int:
+    """Token budget for job descriptions in prompts; 0 turns pruning off"""
+    return int(os.getenv('JOB_DESCRIPTION_TOKEN_BUDGET', str(DEFAULT_TOKEN_BUDGET)))
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about 4 characters per token for English text"""
+    return (len(text) + 3) // 4
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+
+def clean_markdown(text: str) -> str:
+    """Strip markdown markup and escapes, keeping one line per heading, paragraph or bullet"""
+    text = LINK_RE.sub(r'\1', text)
+    text = MARKDOWN_ESCAPE_RE.sub(r'\1', text)
+    lines = []
+    for line in text.splitlines():
+        line = EMPHASIS_RE.sub('', line)
+        line = NON_TEXT_RE.sub('', line)
+        line = ' '.join(line.split())
+        if line:
+            lines.append(line)
+    return '\n'.join(lines)
+
+def latex_to_text(source: str) -> str:
+    """Reduce LaTeX source to its words, for use as a relevance query"""
+    body_start = source.find('\\begin{document}')
+    return LATEX_COMMAND_RE.sub(' ', source[body_start:] if body_start != -1 else source)
+
+def is_heading(raw_line: str, line: str) -> bool:
+    stripped = raw_line.strip()
+    return (stripped.startswith('#')
+            or (stripped.startswith('**') and stripped.rstrip(':').endswith('**'))
+            or (len(line) <= 60 and line.endswith(':')))
+
+def split_units(description: str) -> List[Tuple[str, str]]:
+    """
+    Split a markdown job description into (heading, unit) pairs.
+
+    A unit is a bullet point or a sentence of a paragraph. Sections under boilerplate
+    headings and boilerplate paragraphs are dropped here.
+    """
+    units = []
+    heading = ''
+    skip_section = False
+    for raw_line in MARKDOWN_ESCAPE_RE.sub(r'\1', LINK_RE.sub(r'\1', description)).splitlines():
+        line = clean_markdown(raw_line)
+        if not line:
+            continue
+        if is_heading(raw_line, line):
+            heading = line.rstrip(':')
+            skip_section = bool(BOILERPLATE_HEADING_RE.search(heading))
+            continue
+        if skip_section or BOILERPLATE_TEXT_RE.search(line):
+            continue
+        if BULLET_RE.match(raw_line):
+            units.append((heading, BULLET_RE.sub('', line)))
+        else:
+            units.extend((heading, sentence) for sentence in SENTENCE_RE.split(line) if sentence.strip())
+    return units
+
+def bm25_scores(units: List[str], query: str, k1: float = 1.2, b: float = 0.75) -> List[float]:
+    """Score each unit against the query terms with BM25, using the units as the corpus"""
+    documents = [tokenize(unit) for unit in units]
+    query_terms = set(tokenize(query))
+    if not documents or not query_terms:
+        return [0.0] * len(units)
+    average_length = sum(len(document) for document in documents) / len(documents) or 1.0
+    document_frequency = Counter(term for document in documents for term in set(document))
+    scores = []
+    for document in documents:
+        counts = Counter(document)
+        score = 0.0
+        for term in query_terms & counts.keys():
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            frequency = counts[term]
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * len(document) / average_length))
+        scores.append(score)
+    return scores
+
+def prune_description(description: Optional[str], resume_text: str, token_budget: Optional[int] = None) -> str:
+    """
+    Reduce a scraped job description to the parts most relevant to a resume.
+
+    Markdown and escapes are stripped and boilerplate (benefits, company blurbs, EEO and
+    application instructions) is dropped. If the rest is still over the token budget, its
+    sentences and bullet points are ranked by BM25 against the resume and the best ones
+    are kept, in their original order and under their original headings.
+
+    Args:
+        description: Raw job description, usually markdown
+        resume_text: Resume text or LaTeX source the description is ranked against
+        token_budget: Maximum tokens to keep; defaults to JOB_DESCRIPTION_TOKEN_BUDGET,
+            and 0 returns the description unchanged
+
+    Returns:
+        The pruned description
+    """
+    if not description:
+        return ''
+    if token_budget is None:
+        token_budget = description_token_budget()
+    if token_budget <= 0:
+        return description
+
+    units = split_units(description)
+    if not units:
+        # Everything looked like boilerplate; fall back to the cleaned text
+        return clean_markdown(description)
+
+    selected = set(range(len(units)))
+    if estimate_tokens(' '.join(unit for _, unit in units)) > token_budget:
+        scores = bm25_scores([f"{heading} {unit}" for heading, unit in units], latex_to_text(resume_text))
+        selected = set()
+        headings = set()
+        used = 0
+        # Highest score first; earlier units win ties since descriptions lead with the role
+        for index in sorted(range(len(units)), key=lambda index: (-scores[index], index)):
+            heading, unit = units[index]
+            cost = estimate_tokens(unit) + 1
+            if heading not in headings:
+                cost += estimate_tokens(heading) + 1
+            if used + cost > token_budget:
+                continue
+            selected.add(index)
+            headings.add(heading)
+            used += cost
+
+    lines = []
+    current_heading = None
+    for index, (heading, unit) in enumerate(units):
+        if index not in selected:
+            continue
+        if heading != current_heading:
+            current_heading = heading
+            if heading:
+                lines.append(f"{heading}:")
+        lines.append(f"- {unit}")
+    pruned = '\n'.join(lines)
+    logger.debug(f"Pruned job description from {estimate_tokens(description)} to {estimate_tokens(pruned)} tokens")
+    return pruned
@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from job_dedup import normalize_url, normalize_text
+from job_description import MARKDOWN_ESCAPE_RE, tokenize, latex_to_text
+
+logger = logging.getLogger(__name__)
+
+class JobRankingIndex:
+    """
+    Incremental BM25 index over job postings, for ranking them against a resume.
+
+    Each posting is indexed on its title and description, with title terms counted
+    title_weight times so a match in the title outweighs one in the body. Postings are
+    kept per term in compact arrays that grow as jobs are added, so new scrapes are
+    indexed without rebuilding; ranking scores only the postings of the resume's terms,
+    with numpy, and never visits jobs that share no term with it.
+
+    With max_jobs or max_age_days set, the index is rebuilt from its newest postings once
+    it holds too many or its oldest has aged out, so a long-running process stays bounded.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_weight: int = 3,
+                 max_jobs: Optional[int] = None, max_age_days: Optional[float] = None):
+        """
+        Initialize the index.
+
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            title_weight: Times each title term is counted
+            max_jobs: Most postings kept; a rebuild keeps the newest 90% of them
+            max_age_days: Drop postings added longer ago than this
+        """
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.max_jobs = max_jobs
+        self.max_age_days = max_age_days
+        self.jobs: List[Dict[str, Any]] = []
+        self.added_at = array('d')
+        self.keys = set()
+        self.terms: Dict[str, int] = {}
+        self.postings: List[Tuple[array, array]] = []
+        self.lengths = array('i')
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    def job_key(self, job: Dict[str, Any]) -> Tuple[str, ...]:
+        """Identity of a posting: its normalized URL, or its company, title and opening words without one"""
+        url = normalize_url(job.get('jobUrl'))
+        if url:
+            return (url,)
+        return (normalize_text(job.get('company')), normalize_text(job.get('title')),
+                normalize_text(job.get('description'))[:200])
+
+    def job_terms(self, job: Dict[str, Any]) -> Counter:
+        counts = Counter(tokenize(MARKDOWN_ESCAPE_RE.sub(r'\1', job.get('description') or '')))
+        for term in tokenize(job.get('title') or ''):
+            counts[term] += self.title_weight
+        return counts
+
+    def add(self, job: Dict[str, Any], added_at: Optional[float] = None) -> bool:
+        """
+        Add a processed job to the index.
+
+        Args:
+            job: Job dictionary as produced by scrape_jobs.process_jobs
+            added_at: When the job was first seen, as a Unix time; now by default
+
+        Returns:
+            True if the job was added, False if it was already indexed
+        """
+        key = self.job_key(job)
+        counts = self.job_terms(job)
+        with self._lock:
+            if key in self.keys:
+                return False
+            self._append(job, key, counts, time.time() if added_at is None else added_at)
+            if self.max_jobs is not None and len(self.jobs) > self.max_jobs:
+                self._rebuild()
+        return True
+
+    def _append(self, job: Dict[str, Any], key: Tuple[str, ...], counts: Counter, added_at: float) -> None:
+        self.keys.add(key)
+        index = len(self.jobs)
+        self.jobs.append(job)
+        self.added_at.append(added_at)
+        for term, count in counts.items():
+            term_id = self.terms.get(term)
+            if term_id is None:
+                term_id = self.terms[term] = len(self.postings)
+                self.postings.append((array('i'), array('i')))
+            ids, frequencies = self.postings[term_id]
+            ids.append(index)
+            frequencies.append(count)
+        length = sum(counts.values())
+        self.lengths.append(length)
+        self.total_length += length
+
+    def _rebuild(self) -> None:
+        """Re-index the newest postings within max_jobs and max_age_days; the caller holds the lock"""
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days is not None else float('-inf')
+        keep = [index for index in sorted(range(len(self.jobs)), key=self.added_at.__getitem__, reverse=True)
+                if self.added_at[index] >= cutoff]
+        if self.max_jobs is not None and len(keep) > self.max_jobs:
+            keep = keep[:int(self.max_jobs * 0.9)]
+        kept = [(self.jobs[index], self.added_at[index]) for index in sorted(keep)]
+        dropped = len(self.jobs) - len(kept)
+        self.jobs, self.added_at, self.keys = [], array('d'), set()
+        self.terms, self.postings, self.lengths, self.total_length = {}, [], array('i'), 0
+        for job, added_at in kept:
+            self._append(job, self.job_key(job), self.job_terms(job), added_at)
+        logger.info(f"Rebuilt ranking index with {len(kept)} jobs, dropped {dropped}")
+
+    def expire(self) -> None:
+        """Rebuild the index if its oldest posting is past max_age_days"""
+        if self.max_age_days is None:
+            return
+        with self._lock:
+            if self.added_at and min(self.added_at) < time.time() - self.max_age_days * 86400:
+                self._rebuild()
+
+    def add_many(self, jobs: List[Dict[str, Any]]) -> int:
+        """Add jobs, e.g. a new scrape's results; returns how many were new"""
+        return sum(self.add(job) for job in jobs)
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def rank(self, query: str, limit: Optional[int] = 20, max_terms: int = 10) -> List[Dict[str, Any]]:
+        """
+        Rank the indexed jobs against a query such as a resume's text.
+
+        Args:
+            query: Text to rank against; each distinct term counts once, as in job_description.bm25_scores
+            limit: Number of jobs to return, or None for every job that matches a term
+            max_terms: Matched terms to list per job, highest scoring first
+
+        Returns:
+            List of {'job', 'score', 'matchedTerms'} dicts, best match first
+        """
+        query_terms = set(tokenize(query))
+        with self._lock:
+            count = len(self.jobs)
+            if not count or not query_terms:
+                return []
+            # Copies, since an array cannot grow while numpy holds a view of its buffer
+            lengths = np.frombuffer(self.lengths, dtype=np.int32, count=count).astype(np.float64)
+            average_length = self.total_length / count or 1.0
+            matched = [
+                (term, np.frombuffer(ids, dtype=np.int32).copy(), np.frombuffer(frequencies, dtype=np.int32).copy())
+                for term, ids, frequencies in (
+                    (term, *self.postings[self.terms[term]]) for term in query_terms if term in self.terms
+                )
+            ]
+            jobs = self.jobs[:count]
+            norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+
+        scores = np.zeros(count)
+        contributions = []
+        for term, ids, frequencies in matched:
+            idf = math.log(1 + (count - len(ids) + 0.5) / (len(ids) + 0.5))
+            contribution = idf * frequencies * (self.k1 + 1) / (frequencies + norms[ids])
+            scores[ids] += contribution
+            contributions.append((term, ids, contribution))
+
+        candidates = np.flatnonzero(scores)
+        if limit is not None and limit < candidates.size:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        # Per-term scores of only the returned jobs, to explain each match
+        terms: Dict[int, List[Tuple[float, str]]] = {int(index): [] for index in candidates}
+        returned = np.sort(candidates)
+        for term, ids, contribution in contributions:
+            hits = np.isin(ids, returned, assume_unique=True)
+            for index, value in zip(ids[hits].tolist(), contribution[hits].tolist()):
+                terms[index].append((value, term))
+        return [
+            {
+                'job': jobs[index],
+                'score': round(float(scores[index]), 4),
+                'matchedTerms': [term for _, term in sorted(terms[index], reverse=True)[:max_terms]]
+            }
+            for index in candidates.tolist()
+        ]
+
+    def rank_resume(self, resume_content: str, limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+        """Rank the indexed jobs against a LaTeX resume"""
+        return self.rank(latex_to_text(resume_content), limit)
+
+    def log_stats(self) -> None:
+        logger.info(f"Ranking index holds {len(self.jobs)} jobs and {len(self.terms)} terms")
+
+def read_jobs(path: str) -> List[Dict[str, Any]]:
+    """Read jobs saved from scrape_jobs.py, as a JSON list or one job per line"""
+    with open(path, 'r') as f:
+        content = f.read()
+    if content.lstrip().startswith('['):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+if __name__ == '__main__':
+
+    # Logs go to stderr so stdout stays machine-readable
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    parser = argparse.ArgumentParser(description='Rank scraped jobs by relevance to a resume')
+    parser.add_argument('--primary-resume', type=str, required=True, help='Path to the resume (.tex)')
+    parser.add_argument('--jobs', type=str, nargs='+', required=True,
+                        help='Job files written by scrape_jobs.py (json or ndjson format)')
+    parser.add_argument('--limit', type=int, default=20, help='Number of jobs to return')
+
+    args = parser.parse_args()
+
+    try:
+        with open(args.primary_resume, 'r') as f:
+            resume_content = f.read()
+        index = JobRankingIndex()
+        for path in args.jobs:
+            added = index.add_many(read_jobs(path))
+            logger.info(f"Indexed {added} new jobs from {path}")
+        index.log_stats()
+        results = index.rank_resume(resume_content, args.limit)
+    except Exception as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    print(json.dumps(results, default=str))
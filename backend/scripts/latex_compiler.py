@@ -1,9 +1,20 @@
 import os
+import re
+import time
+import hashlib
+import tempfile
+import threading
 import subprocess
 from pathlib import Path
 import logging
 import shutil
-from typing import Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Tuple, List, Dict, Any
+
+from latex_sanitizer import sanitize_latex, fitting_steps
+from pdf_cache import PdfCache, get_pdf_cache, pdf_cache_enabled, pdf_cache_key, place_file
 
 # Configure logging
 logging.basicConfig(
@@ -12,8 +23,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+BEGIN_DOCUMENT = '\\begin{document}'
+PDFLATEX_FLAGS = ('-interaction=nonstopmode',)
+PAGES_RE = re.compile(r'Output written on .*?\((\d+) pages?', re.DOTALL)
+# Compiles spent shortening a document that runs over its page limit, after the first one
+MAX_FIT_ATTEMPTS = int(os.getenv('LATEX_MAX_FIT_ATTEMPTS', '4'))
+
+def run_pdflatex(
+    tex_file: str,
+    output_directory: str,
+    format_name: Optional[str] = None,
+    format_dir: Optional[str] = None
+) -> subprocess.CompletedProcess:
+    """
+    Run pdflatex once on a file.
+    
+    Args:
+        tex_file: Path to the .tex file
+        output_directory: Directory for the PDF and auxiliary files
+        format_name: Optional precompiled format to load instead of the default one
+        format_dir: Directory holding the format file
+        
+    Returns:
+        The completed process. Raises CalledProcessError if pdflatex fails.
+    """
+    command = ['pdflatex', *PDFLATEX_FLAGS, '-output-directory', output_directory]
+    env = None
+    if format_name is not None:
+        command.append(f"-fmt={format_name}")
+        # The trailing separator keeps the default format search path after ours
+        env = dict(os.environ, TEXFORMATS=f"{os.path.abspath(format_dir)}{os.pathsep}")
+    command.append(tex_file)
+    return subprocess.run(command, check=True, capture_output=True, env=env)
+
+def count_pages(process: subprocess.CompletedProcess) -> Optional[int]:
+    """Read the page count from pdflatex's output, or None if it does not say"""
+    output = process.stdout.decode(errors='replace') if isinstance(process.stdout, bytes) else (process.stdout or '')
+    match = PAGES_RE.search(output)
+    return int(match.group(1)) if match else None
+
+def split_preamble(latex_content: str) -> Optional[Tuple[str, str]]:
+    """
+    Split a LaTeX document into its preamble and the rest, starting at \\begin{document}.
+    
+    Returns:
+        Tuple of (preamble, body), or None if the document has no \\begin{document}
+    """
+    index = latex_content.find(BEGIN_DOCUMENT)
+    if index == -1:
+        return None
+    return latex_content[:index], latex_content[index:]
+
 class LatexCompiler:
-    """A class to handle LaTeX compilation to PDF."""
+    """
+    A class to handle LaTeX compilation to PDF.
+    
+    Compiles go through the shared LatexCompileService for the temporary directory, so
+    they are repaired, fitted to a page limit when one is given, reuse its formats and
+    are served from the PDF cache when the same source was compiled before.
+    """
     
     def __init__(self, temp_dir: str = "temp"):
         """
@@ -30,7 +98,8 @@ class LatexCompiler:
         latex_content: str,
         output_dir: str,
         output_filename: str,
-        clean_temp: bool = True
+        clean_temp: bool = True,
+        max_pages: Optional[int] = None
     ) -> Optional[str]:
         """
         Compile LaTeX content to PDF.
@@ -39,73 +108,446 @@ class LatexCompiler:
             latex_content: LaTeX content as string
             output_dir: Directory to save the PDF
             output_filename: Name of the output file (without extension)
-            clean_temp: Whether to clean temporary files after compilation
+            clean_temp: Kept for compatibility; each compile's directory is always removed
+            max_pages: Page limit the document is shortened to, or None for no limit
             
         Returns:
             Path to the generated PDF if successful, None otherwise
         """
-        try:
-            # Create output directory if it doesn't exist
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Create temporary directory for this compilation
-            temp_compile_dir = os.path.join(self.temp_dir, output_filename)
-            os.makedirs(temp_compile_dir, exist_ok=True)
-            
-            # Write LaTeX content to temporary file
-            tex_file = os.path.join(temp_compile_dir, f"{output_filename}.tex")
-            with open(tex_file, 'w') as f:
-                f.write(latex_content)
-            
-            # Compile LaTeX to PDF
-            logger.info(f"Compiling LaTeX to PDF: {output_filename}")
-            subprocess.run(
-                ['pdflatex', '-interaction=nonstopmode', '-output-directory', temp_compile_dir, tex_file],
-                check=True,
-                capture_output=True
-            )
-            
-            # Move PDF to output directory
-            pdf_file = os.path.join(temp_compile_dir, f"{output_filename}.pdf")
-            output_pdf = os.path.join(output_dir, f"{output_filename}.pdf")
-            shutil.move(pdf_file, output_pdf)
-            
-            # Clean up temporary files if requested
-            if clean_temp:
-                shutil.rmtree(temp_compile_dir)
-            
-            logger.info(f"Successfully compiled PDF: {output_pdf}")
-            return output_pdf
-            
-        except subprocess.CalledProcessError as e:
-            logger.error(f"LaTeX compilation failed: {e.stderr.decode()}")
-            return None
-        except Exception as e:
-            logger.error(f"Error during LaTeX compilation: {str(e)}")
-            return None
+        return get_compile_service(self.temp_dir).compile_latex_to_pdf(
+            latex_content, output_dir, output_filename, max_pages=max_pages
+        )
 
 def compile_latex_to_pdf(
     latex_content: str,
     output_dir: str,
     output_filename: str,
-    clean_temp: bool = True
+    clean_temp: bool = True,
+    max_pages: Optional[int] = None
 ) -> Optional[str]:
     """
-    Convenience function to compile LaTeX to PDF.
+    Convenience function to compile LaTeX to PDF on the shared compile service for LATEX_TEMP_DIR.
     
     Args:
         latex_content: LaTeX content as string
         output_dir: Directory to save the PDF
         output_filename: Name of the output file (without extension)
-        clean_temp: Whether to clean temporary files after compilation
+        clean_temp: Kept for compatibility; each compile's directory is always removed
+        max_pages: Page limit the document is shortened to, or None for no limit
         
     Returns:
         Path to the generated PDF if successful, None otherwise
     """
-    compiler = LatexCompiler()
-    return compiler.compile_latex_to_pdf(
-        latex_content=latex_content,
-        output_dir=output_dir,
-        output_filename=output_filename,
-        clean_temp=clean_temp
+    return get_compile_service().compile_latex_to_pdf(
+        latex_content, output_dir, output_filename, max_pages=max_pages
     )
+
+class PreambleFormatCache:
+    """
+    Builds pdflatex format files from document preambles and keeps them on disk.
+    
+    A format is a memory dump of TeX after it has read the preamble, so documents that share
+    a preamble (every resume tailored from the same base template) skip loading the document
+    class, packages and fonts on each compile. Formats are named by a hash of the preamble.
+    
+    Building a format costs an extra pdflatex -ini run and several MB on disk, which only
+    pays off for a preamble that is compiled again. A format is therefore built when asked
+    for explicitly (LatexCompileService.prepare) or when a preamble is seen for the second
+    time; one-off preambles, as in model-written cover letters, compile without one. Once
+    the directory grows past max_bytes, the least recently used formats are removed.
+    """
+    
+    def __init__(self, format_dir: str, max_bytes: Optional[int] = None, max_tracked: int = 1024):
+        """
+        Initialize the PreambleFormatCache.
+        
+        Args:
+            format_dir: Directory where format files are built and kept
+            max_bytes: Size limit of the format files, defaults to LATEX_FORMAT_CACHE_MAX_MB (256)
+            max_tracked: Most preambles remembered as seen once, waiting for a second use
+        """
+        self.format_dir = format_dir
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('LATEX_FORMAT_CACHE_MAX_MB', '256')) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.max_tracked = max_tracked
+        os.makedirs(format_dir, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._failed = set()
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+    
+    def format_name(self, preamble: str) -> str:
+        return 'preamble_' + hashlib.sha256(preamble.encode('utf-8')).hexdigest()[:16]
+    
+    def _format_path(self, name: str) -> str:
+        return os.path.join(self.format_dir, f"{name}.fmt")
+    
+    def _existing(self, name: str) -> bool:
+        """Whether the format exists, refreshing its modification time for LRU eviction"""
+        try:
+            os.utime(self._format_path(name))
+            return True
+        except OSError:
+            return False
+    
+    def _seen_before(self, name: str) -> bool:
+        """Record a use of a preamble without a format; True from its second use on"""
+        with self._locks_guard:
+            if name in self._seen:
+                del self._seen[name]
+                return True
+            self._seen[name] = None
+            while len(self._seen) > self.max_tracked:
+                self._seen.popitem(last=False)
+            return False
+    
+    def get(self, preamble: str, build: bool = False) -> Optional[str]:
+        """
+        Return the format name for a preamble, building the format on its second use.
+        
+        Args:
+            preamble: Everything before \\begin{document}
+            build: Build the format now even if the preamble was not seen before
+            
+        Returns:
+            The format name, or None if there is no format (yet) or the preamble cannot be
+            dumped to one
+        """
+        name = self.format_name(preamble)
+        if self._existing(name):
+            return name
+        if name in self._failed or not (build or self._seen_before(name)):
+            return None
+        
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            # Another worker may have built it while we waited
+            if self._existing(name):
+                return name
+            if name in self._failed:
+                return None
+            if not self.build(name, preamble):
+                return None
+        self.evict(keep=name)
+        return name
+    
+    def build(self, name: str, preamble: str) -> bool:
+        """Dump a preamble to <format_dir>/<name>.fmt with pdflatex -ini"""
+        source = os.path.join(self.format_dir, f"{name}.tex")
+        with open(source, 'w') as f:
+            f.write(preamble)
+            f.write('\n\\dump\n')
+        
+        start = time.perf_counter()
+        try:
+            subprocess.run(
+                ['pdflatex', '-ini', '-interaction=nonstopmode', f"-jobname={name}", '&pdflatex', f"{name}.tex"],
+                check=True,
+                capture_output=True,
+                cwd=self.format_dir
+            )
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"Could not build LaTeX format {name}, compiling without it: {e.stdout.decode(errors='replace')[-500:]}")
+            self._failed.add(name)
+            return False
+        finally:
+            # Only the .fmt is needed to compile against the format
+            for extension in ('tex', 'log'):
+                try:
+                    os.remove(os.path.join(self.format_dir, f"{name}.{extension}"))
+                except FileNotFoundError:
+                    pass
+        
+        logger.info(f"Built LaTeX format {name} in {time.perf_counter() - start:.2f}s")
+        return True
+    
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Remove least recently used formats until the directory fits in max_bytes.
+        
+        A compile already running against a removed format keeps its open copy; one that
+        starts after the removal fails and compile_once compiles it again without a format.
+        
+        Args:
+            keep: Format that is never removed, e.g. the one just built
+        """
+        with self._locks_guard:
+            entries: List[Tuple[float, int, str]] = []
+            total = 0
+            for name in os.listdir(self.format_dir):
+                if not name.endswith('.fmt'):
+                    continue
+                path = os.path.join(self.format_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                total += stat.st_size
+                if name != f"{keep}.fmt":
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                logger.info(f"Removed LaTeX format {os.path.basename(path)} to stay under the format cache limit")
+
+@dataclass
+class CompileResult:
+    """Outcome of compiling one document, with the source the PDF was built from"""
+    pdf_path: Optional[str]
+    latex_content: str
+    pages: Optional[int] = None
+    attempts: int = 0
+    seconds: float = 0.0
+    fixes: List[str] = field(default_factory=list)
+    fitted: Optional[str] = None
+
+class LatexCompileService:
+    """
+    Compiles LaTeX documents on a pool of workers, reusing precompiled preamble formats.
+    
+    Each compile runs in its own temporary directory, so documents with the same output
+    name never share auxiliary files. A document whose preamble cannot use a format, or
+    whose compile with the format fails, is compiled again the normal way. Sources are
+    repaired with latex_sanitizer before compiling, and a source compiled before is
+    served from the PDF cache instead of being compiled again.
+    """
+    
+    def __init__(
+        self,
+        temp_dir: str = "temp",
+        format_dir: Optional[str] = None,
+        workers: Optional[int] = None,
+        pdf_cache: Optional[PdfCache] = None
+    ):
+        """
+        Initialize the LatexCompileService.
+        
+        Args:
+            temp_dir: Directory for the per-job compile directories
+            format_dir: Directory for format files, defaults to <temp_dir>/formats
+            workers: Number of documents compiled in parallel, defaults to the CPU count
+            pdf_cache: Cache of compiled PDFs, defaults to the process-wide one unless LATEX_PDF_CACHE=0
+        """
+        self.temp_dir = temp_dir
+        os.makedirs(temp_dir, exist_ok=True)
+        self.formats = PreambleFormatCache(format_dir or os.path.join(temp_dir, 'formats'))
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix='latex')
+        self.pdf_cache = pdf_cache if pdf_cache is not None else (get_pdf_cache() if pdf_cache_enabled() else None)
+    
+    def prepare(self, template_content: str) -> Optional[str]:
+        """
+        Build the format for a template's preamble ahead of the first compile.
+        
+        Args:
+            template_content: A LaTeX document, e.g. the base resume
+            
+        Returns:
+            The format name, or None if the template has no usable preamble
+        """
+        parts = split_preamble(template_content)
+        return self.formats.get(parts[0], build=True) if parts else None
+    
+    def compile_once(
+        self,
+        latex_content: str,
+        output_dir: str,
+        output_filename: str
+    ) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Compile LaTeX content to PDF in an isolated directory, as is, or take it from the PDF cache.
+        
+        Args:
+            latex_content: LaTeX content as string
+            output_dir: Directory to save the PDF
+            output_filename: Name of the output file (without extension)
+            
+        Returns:
+            Tuple of (path to the generated PDF or None on failure, page count if known)
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        output_pdf = os.path.join(output_dir, f"{output_filename}.pdf")
+        cache_key = None
+        if self.pdf_cache is not None:
+            cache_key = pdf_cache_key(latex_content, 'pdflatex', PDFLATEX_FLAGS)
+            entry = self.pdf_cache.get(cache_key, output_pdf)
+            if entry is not None:
+                logger.info(f"Reused cached PDF for {output_pdf} ({entry.get('pages') or '?'} pages)")
+                return output_pdf, entry.get('pages')
+        
+        compile_dir = tempfile.mkdtemp(prefix=f"{output_filename}_", dir=self.temp_dir)
+        tex_file = os.path.join(compile_dir, f"{output_filename}.tex")
+        pdf_file = os.path.join(compile_dir, f"{output_filename}.pdf")
+        start = time.perf_counter()
+        
+        try:
+            parts = split_preamble(latex_content)
+            format_name = self.formats.get(parts[0]) if parts else None
+            compiled = False
+            process = None
+            
+            if format_name is not None:
+                # The format already holds the preamble, so only the body is compiled
+                with open(tex_file, 'w') as f:
+                    f.write(parts[1])
+                try:
+                    process = run_pdflatex(tex_file, compile_dir, format_name, self.formats.format_dir)
+                    compiled = os.path.exists(pdf_file)
+                except subprocess.CalledProcessError:
+                    logger.warning(f"Compile with format {format_name} failed, retrying without it: {output_filename}")
+            
+            if not compiled:
+                with open(tex_file, 'w') as f:
+                    f.write(latex_content)
+                process = run_pdflatex(tex_file, compile_dir)
+            
+            place_file(pdf_file, output_pdf)
+            pages = count_pages(process)
+            seconds = time.perf_counter() - start
+            logger.info(
+                f"Compiled PDF {output_pdf} ({pages or '?'} pages) in {seconds:.2f}s "
+                f"({'with format ' + format_name if compiled else 'without format'})"
+            )
+            if cache_key is not None:
+                self.pdf_cache.put(cache_key, output_pdf, pages, seconds)
+            return output_pdf, pages
+        
+        except subprocess.CalledProcessError as e:
+            logger.error(f"LaTeX compilation failed: {e.stdout.decode(errors='replace')[-2000:]}")
+            return None, None
+        except Exception as e:
+            logger.error(f"Error during LaTeX compilation: {str(e)}")
+            return None, None
+        finally:
+            shutil.rmtree(compile_dir, ignore_errors=True)
+    
+    def compile_document(
+        self,
+        latex_content: str,
+        output_dir: str,
+        output_filename: str,
+        max_pages: Optional[int] = None,
+        priority_text: Optional[str] = None,
+        max_fit_attempts: int = MAX_FIT_ATTEMPTS
+    ) -> CompileResult:
+        """
+        Repair a document, compile it, and shorten it until it fits its page limit.
+        
+        The source is sanitized first, so the usual mistakes in model-written LaTeX do not
+        cost a failed compile. A document over max_pages is then compiled again with tighter
+        spacing and, if that is not enough, without its lowest-priority bullet points, rather
+        than sending it back to the model.
+        
+        Args:
+            latex_content: LaTeX content as string
+            output_dir: Directory to save the PDF
+            output_filename: Name of the output file (without extension)
+            max_pages: Page limit, or None for no limit
+            priority_text: Text bullet points are ranked against before dropping any, e.g. the job description
+            max_fit_attempts: Most compiles spent shortening the document after the first one
+            
+        Returns:
+            CompileResult with the PDF path and the source it was built from
+        """
+        start = time.perf_counter()
+        sanitized, fixes = sanitize_latex(latex_content)
+        if fixes:
+            logger.info(f"Repaired LaTeX for {output_filename} before compiling: {'; '.join(fixes)}")
+        result = CompileResult(pdf_path=None, latex_content=sanitized, fixes=fixes)
+        result.pdf_path, result.pages = self.compile_once(sanitized, output_dir, output_filename)
+        result.attempts = 1
+        first_seconds = time.perf_counter() - start
+        
+        if result.pdf_path and max_pages and result.pages and result.pages > max_pages:
+            logger.info(f"{output_filename} has {result.pages} pages, fitting it to {max_pages}")
+            for description, candidate in fitting_steps(sanitized, priority_text):
+                if result.attempts - 1 >= max_fit_attempts:
+                    break
+                pdf_path, pages = self.compile_once(candidate, output_dir, output_filename)
+                result.attempts += 1
+                if pdf_path is None:
+                    # A failed attempt leaves the last PDF that compiled in place
+                    continue
+                result.pdf_path, result.pages, result.latex_content, result.fitted = pdf_path, pages, candidate, description
+                if pages is None or pages <= max_pages:
+                    break
+            if result.pages and result.pages > max_pages:
+                logger.warning(f"Could not fit {output_filename} to {max_pages} pages in {result.attempts} compiles")
+        
+        result.seconds = time.perf_counter() - start
+        summary = f"{output_filename}: {result.pages or '?'} pages after {result.attempts} compiles in {result.seconds:.2f}s"
+        if result.fitted:
+            summary += f", {result.fitted}"
+        if fixes:
+            # Each repaired document would otherwise have failed once and been sent back for another try
+            summary += f", {len(fixes)} repairs saved a failed compile (~{first_seconds:.2f}s) and a model retry"
+        logger.info(summary)
+        return result
+    
+    def compile_latex_to_pdf(
+        self,
+        latex_content: str,
+        output_dir: str,
+        output_filename: str,
+        max_pages: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Repair and compile LaTeX content to PDF in an isolated directory.
+        
+        Args:
+            latex_content: LaTeX content as string
+            output_dir: Directory to save the PDF
+            output_filename: Name of the output file (without extension)
+            max_pages: Page limit the document is shortened to, or None for no limit
+            
+        Returns:
+            Path to the generated PDF if successful, None otherwise
+        """
+        return self.compile_document(latex_content, output_dir, output_filename, max_pages=max_pages).pdf_path
+    
+    def submit(self, latex_content: str, output_dir: str, output_filename: str) -> Future:
+        """Queue a compile on the worker pool and return its future"""
+        return self.executor.submit(self.compile_latex_to_pdf, latex_content, output_dir, output_filename)
+    
+    def submit_document(self, latex_content: str, output_dir: str, output_filename: str, **kwargs) -> Future:
+        """Queue compile_document on the worker pool and return its future, which resolves to a CompileResult"""
+        return self.executor.submit(self.compile_document, latex_content, output_dir, output_filename, **kwargs)
+    
+    def compile_many(self, jobs: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Compile several documents in parallel.
+        
+        Args:
+            jobs: Dicts with latex_content, output_dir and output_filename
+            
+        Returns:
+            PDF paths (or None for failures) in the same order as jobs
+        """
+        futures = [self.submit(**job) for job in jobs]
+        return [future.result() for future in futures]
+    
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+_compile_services: Dict[str, LatexCompileService] = {}
+_compile_services_lock = threading.Lock()
+
+def get_compile_service(temp_dir: Optional[str] = None) -> LatexCompileService:
+    """
+    Return the process-wide compile service for a temporary directory, created on first use.
+    
+    Args:
+        temp_dir: Directory for compiles, defaults to LATEX_TEMP_DIR or 'temp'
+    """
+    temp_dir = temp_dir or os.getenv('LATEX_TEMP_DIR', 'temp')
+    with _compile_services_lock:
+        service = _compile_services.get(temp_dir)
+        if service is None:
+            service = _compile_services[temp_dir] = LatexCompileService(temp_dir=temp_dir)
+        return service
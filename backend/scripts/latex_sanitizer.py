@@ -0,0 +1,345 @@
+import re
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from job_description import bm25_scores
+from resume_sections import COMMENT_RE, apply_patch, mask_comments, parse_resume
+
+logger = logging.getLogger(__name__)
+
+BEGIN_DOCUMENT = '\\begin{document}'
+END_DOCUMENT = '\\end{document}'
+FENCE_RE = re.compile(r'```[A-Za-z]*[ \t]*\n?(.*?)(?:```|\Z)', re.DOTALL)
+ENVIRONMENT_RE = re.compile(r'\\(begin|end)\s*\{([^}]*)\}')
+MARKDOWN_BOLD_RE = re.compile(r'(?<![\\*])\*\*(?=\S)([^*\n]+?)(?<=\S)\*\*(?!\*)')
+EMPTY_LIST_RE = re.compile(
+    r'\\begin\{(itemize|enumerate|description)\}(\[[^\]]*\])?\s*\\end\{\1\}'
+    r'|\\resumeItemListStart\s*\\resumeItemListEnd|\\resumeSubHeadingListStart\s*\\resumeSubHeadingListEnd'
+)
+# Environments where & separates cells and must stay unescaped
+ALIGNMENT_ENVIRONMENTS = {
+    'tabular', 'tabular*', 'tabularx', 'tabulary', 'longtable', 'array', 'align', 'align*', 'alignat',
+    'alignat*', 'eqnarray', 'eqnarray*', 'split', 'cases', 'matrix', 'pmatrix', 'bmatrix', 'vmatrix'
+}
+# Commands whose first argument is taken literally, such as URLs and file names
+LITERAL_ARGUMENT_COMMANDS = {'url', 'href', 'includegraphics', 'input', 'include', 'label', 'ref', 'eqref',
+                             'cite', 'hypersetup', 'usepackage', 'documentclass'}
+COMMAND_RE = re.compile(r'\\([A-Za-z]+)\*?')
+OPTIONAL_ARGUMENT_RE = re.compile(r'\s*(\[[^\]]*\])?\s*')
+# A dollar amount such as $120K, rather than math such as $10^5$ that closes before any space
+DOLLAR_AMOUNT_RE = re.compile(r'\$(?=\d)(?![^\s$]*\$)')
+MACRO_DEFINITION_RE = re.compile(r'\\(?:(?:re)?newcommand|providecommand|newenvironment|def)\b')
+
+def strip_code_fences(source: str) -> Tuple[str, List[str]]:
+    """Take the LaTeX out of a markdown code fence and drop any prose around the document"""
+    fixes = []
+    if '```' in source:
+        blocks = [match.group(1) for match in FENCE_RE.finditer(source)]
+        documents = [block for block in blocks if '\\documentclass' in block or BEGIN_DOCUMENT in block]
+        if documents:
+            source = max(documents, key=len)
+        else:
+            source = source.replace('```latex', '').replace('```tex', '').replace('```', '')
+        fixes.append('removed markdown code fences')
+    start = source.find('\\documentclass')
+    if start > 0 and mask_comments(source[:start]).strip():
+        source = source[start:]
+        fixes.append('removed text before \\documentclass')
+    end = source.rfind(END_DOCUMENT)
+    if end != -1 and source[end + len(END_DOCUMENT):].strip():
+        source = source[:end + len(END_DOCUMENT)] + '\n'
+        fixes.append('removed text after \\end{document}')
+    return source, fixes
+
+def escape_specials(body: str) -> Tuple[str, List[str]]:
+    """
+    Escape &, #, _, dollar amounts and percent signs after numbers where they are plain text.
+
+    & stays as is inside tabular-like environments, _ and # inside math, and all of them
+    in literal arguments such as \\href and \\url targets. A % after a digit is taken to be
+    a percentage rather than the start of a comment, a $ before a digit to be an amount
+    rather than the start of math, and #1 to be text unless the body defines macros.
+    """
+    out = []
+    counts = {'&': 0, '#': 0, '_': 0, '%': 0, '$': 0}
+    environments: List[str] = []
+    math = False
+    literal_depth = 0
+    depth = 0
+    index = 0
+    defines_macros = MACRO_DEFINITION_RE.search(body) is not None
+    while index < len(body):
+        char = body[index]
+        if char == '\\':
+            match = COMMAND_RE.match(body, index)
+            if match is None:
+                # Escaped character or control symbol, e.g. \% or \[
+                pair = body[index:index + 2]
+                if pair in ('\\[', '\\('):
+                    math = True
+                elif pair in ('\\]', '\\)'):
+                    math = False
+                out.append(pair)
+                index += 2
+                continue
+            name = match.group(1)
+            if name in ('begin', 'end'):
+                environment = ENVIRONMENT_RE.match(body, index)
+                if environment is not None:
+                    if environment.group(1) == 'begin':
+                        environments.append(environment.group(2).strip())
+                    elif environments and environments[-1] == environment.group(2).strip():
+                        environments.pop()
+                    out.append(environment.group(0))
+                    index = environment.end()
+                    continue
+            if name in LITERAL_ARGUMENT_COMMANDS and literal_depth == 0:
+                argument = body.find('{', match.end())
+                if argument != -1 and OPTIONAL_ARGUMENT_RE.fullmatch(body, match.end(), argument):
+                    out.append(body[index:argument + 1])
+                    literal_depth = depth + 1
+                    depth += 1
+                    index = argument + 1
+                    continue
+            out.append(match.group(0))
+            index = match.end()
+            continue
+        if char == '%':
+            if index > 0 and body[index - 1].isdigit() and literal_depth == 0:
+                out.append('\\%')
+                counts['%'] += 1
+                index += 1
+                continue
+            # A real comment runs to the end of the line
+            line_end = body.find('\n', index)
+            line_end = len(body) if line_end == -1 else line_end
+            out.append(body[index:line_end])
+            index = line_end
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            if literal_depth and depth == literal_depth:
+                literal_depth = 0
+            depth = max(0, depth - 1)
+        elif char == '$':
+            if not math and literal_depth == 0 and DOLLAR_AMOUNT_RE.match(body, index):
+                out.append('\\$')
+                counts['$'] += 1
+                index += 1
+                continue
+            math = not math
+        elif literal_depth == 0:
+            in_alignment = bool(environments) and environments[-1] in ALIGNMENT_ENVIRONMENTS
+            if char == '&' and not in_alignment:
+                out.append('\\&')
+                counts['&'] += 1
+                index += 1
+                continue
+            if char == '#' and not math and not (defines_macros and body[index + 1:index + 2].isdigit()):
+                out.append('\\#')
+                counts['#'] += 1
+                index += 1
+                continue
+            if char == '_' and not math:
+                out.append('\\_')
+                counts['_'] += 1
+                index += 1
+                continue
+        out.append(char)
+        index += 1
+    fixes = [f"escaped {count} unescaped {char}" for char, count in counts.items() if count]
+    return ''.join(out), fixes
+
+def balance_braces(body: str) -> Tuple[str, List[str]]:
+    """Drop closing braces that close nothing, and close groups left open at the end of their line"""
+    masked = mask_comments(body)
+    stray = []
+    opened = []
+    index = 0
+    while index < len(masked):
+        char = masked[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == '{':
+            opened.append(index)
+        elif char == '}':
+            if opened:
+                opened.pop()
+            else:
+                stray.append(index)
+        index += 1
+    if not stray and not opened:
+        return body, []
+
+    insertions = {}
+    for position in opened:
+        line_end = masked.find('\n', position)
+        line_end = len(masked) if line_end == -1 else line_end
+        # Before any comment on the line, so the brace is not commented out
+        comment = COMMENT_RE.search(body, position, line_end)
+        line_end = comment.start() if comment else line_end
+        insertions[line_end] = insertions.get(line_end, 0) + 1
+    removals = set(stray)
+    out = []
+    for index, char in enumerate(body):
+        if index in insertions:
+            out.append('}' * insertions.pop(index))
+        if index not in removals:
+            out.append(char)
+    for position in sorted(insertions):
+        out.append('}' * insertions[position])
+    fixes = []
+    if stray:
+        fixes.append(f"removed {len(stray)} unmatched closing braces")
+    if opened:
+        fixes.append(f"closed {len(opened)} unclosed braces")
+    return ''.join(out), fixes
+
+def balance_environments(body: str) -> Tuple[str, List[str]]:
+    """Drop \\end commands that close nothing, and close environments left open before \\end{document}"""
+    masked = mask_comments(body)
+    stack: List[str] = []
+    removals = []
+    insertions: List[Tuple[int, str]] = []
+    for match in ENVIRONMENT_RE.finditer(masked):
+        kind, name = match.group(1), match.group(2).strip()
+        if name == 'document':
+            continue
+        if kind == 'begin':
+            stack.append(name)
+        elif name in stack:
+            # Close anything opened inside it that was left open
+            while stack[-1] != name:
+                insertions.append((match.start(), f"\\end{{{stack.pop()}}}"))
+            stack.pop()
+        else:
+            removals.append((match.start(), match.end()))
+    end = masked.rfind(END_DOCUMENT)
+    end = len(body) if end == -1 else end
+    while stack:
+        insertions.append((end, f"\\end{{{stack.pop()}}}\n"))
+    if not removals and not insertions:
+        return body, []
+
+    edits = [(start, stop, '') for start, stop in removals] + [(position, position, text) for position, text in insertions]
+    # Splice from the end so earlier offsets stay valid; insertions at one spot keep their order
+    for start, stop, text in sorted(edits, key=lambda edit: (edit[0], edit[1]), reverse=True):
+        body = body[:start] + text + body[stop:]
+    fixes = []
+    if removals:
+        fixes.append(f"removed {len(removals)} unmatched \\end commands")
+    if insertions:
+        fixes.append(f"closed {len(insertions)} unclosed environments")
+    return body, fixes
+
+def sanitize_latex(source: str) -> Tuple[str, List[str]]:
+    """
+    Repair the mistakes in model-written LaTeX that make pdflatex fail, before compiling.
+
+    Removes markdown code fences and prose around the document, turns markdown **bold**
+    into \\textbf, escapes special characters used as plain text, balances braces and
+    environments, removes empty lists (an error in LaTeX) and adds a missing
+    \\end{document}. Only the document body is changed, so the preamble, and with it any
+    precompiled format, stays the same.
+
+    Args:
+        source: LaTeX source, e.g. a model's reply
+
+    Returns:
+        Tuple of (repaired source, descriptions of the fixes made)
+    """
+    source, fixes = strip_code_fences(source)
+    start = source.find(BEGIN_DOCUMENT)
+    if start == -1:
+        return source, fixes
+    preamble, body = source[:start + len(BEGIN_DOCUMENT)], source[start + len(BEGIN_DOCUMENT):]
+
+    if END_DOCUMENT not in body:
+        body = body.rstrip() + '\n' + END_DOCUMENT + '\n'
+        fixes.append('added missing \\end{document}')
+    body, count = MARKDOWN_BOLD_RE.subn(r'\\textbf{\1}', body)
+    if count:
+        fixes.append(f"converted {count} markdown bold spans")
+    for repair in (escape_specials, balance_braces, balance_environments):
+        body, repaired = repair(body)
+        fixes.extend(repaired)
+    body, count = EMPTY_LIST_RE.subn('', body)
+    if count:
+        fixes.append(f"removed {count} empty lists")
+    return preamble + body, fixes
+
+# Extra lines on the first page and line spread, for each step of tightening
+TIGHTEN_LEVELS = ((2, 0.97), (4, 0.94))
+
+def tighten_spacing(source: str, level: int) -> str:
+    """
+    Fit more on the first page: let it run a few lines longer and close up the line spacing.
+
+    The commands go right after \\begin{document}, so the preamble and its format are reused.
+    """
+    start = source.find(BEGIN_DOCUMENT)
+    if start == -1 or level < 1:
+        return source
+    lines, spread = TIGHTEN_LEVELS[min(level, len(TIGHTEN_LEVELS)) - 1]
+    position = start + len(BEGIN_DOCUMENT)
+    return f"{source[:position]}\n\\enlargethispage{{{lines}\\baselineskip}}\\linespread{{{spread}}}\\selectfont{source[position:]}"
+
+def drop_lowest_priority(source: str, count: int, priority_text: Optional[str] = None) -> Optional[str]:
+    """
+    Remove the bullet points that matter least, keeping at least one in each list.
+
+    Args:
+        source: LaTeX resume
+        count: Number of bullet points to remove
+        priority_text: Text to rank bullet points against, e.g. the job description; without
+            it, the last bullet points of the longest lists go first
+
+    Returns:
+        The shortened source, or None if nothing more can be removed
+    """
+    parsed = parse_resume(source)
+    scores = bm25_scores([span.text for span in parsed.spans], priority_text) if priority_text else [0.0] * len(parsed.spans)
+    remaining: Dict[int, int] = {}
+    for span in parsed.spans:
+        remaining[span.list_number] = remaining.get(span.list_number, 0) + 1
+    order = sorted(range(len(parsed.spans)), key=lambda index: (
+        scores[index], -remaining[parsed.spans[index].list_number], -index
+    ))
+    removed = []
+    for index in order:
+        span = parsed.spans[index]
+        if len(removed) == count:
+            break
+        if remaining[span.list_number] > 1:
+            remaining[span.list_number] -= 1
+            removed.append(span.id)
+    if not removed:
+        return None
+    return apply_patch(parsed, {'remove': removed})
+
+def fitting_steps(source: str, priority_text: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield ever shorter versions of a document that runs over its page limit, as (description, source).
+
+    Spacing is tightened first, then the lowest-priority bullet points are dropped: two,
+    then four, eight and so on up to every bullet point that can go, so a long overrun
+    takes few compiles.
+    """
+    for level in range(1, len(TIGHTEN_LEVELS) + 1):
+        yield f"tightened spacing (level {level})", tighten_spacing(source, level)
+    lists: Dict[int, int] = {}
+    for span in parse_resume(source).spans:
+        lists[span.list_number] = lists.get(span.list_number, 0) + 1
+    removable = sum(count - 1 for count in lists.values())
+    # The last step always drops every removable bullet point, even when that is just one
+    count = min(2, removable)
+    while count:
+        shortened = drop_lowest_priority(source, count, priority_text)
+        if shortened is None:
+            return
+        yield f"tightened spacing and dropped {count} bullet points", tighten_spacing(shortened, len(TIGHTEN_LEVELS))
+        if count == removable:
+            return
+        count = min(count * 2, removable)
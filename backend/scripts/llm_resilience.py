@@ -0,0 +1,426 @@
+import os
+import time
+import random
+import hashlib
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Rate limits, timeouts, overload and server errors are worth another try
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+# The request may succeed with another provider's key or model, but never with this one
+FAILOVER_STATUS = {401, 402, 403, 404}
+
+# Model used for a failover provider when LLM_FAILOVER names no model for it
+DEFAULT_MODELS = {
+    'openai': 'gpt-4o-mini',
+    'anthropic': 'claude-3-5-haiku-latest',
+    'groq': 'llama-3.3-70b-versatile',
+    'google': 'gemini-1.5-flash'
+}
+
+# Circuit breakers kept for user-supplied keys before the least recently used is dropped
+MAX_BREAKERS = 1024
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"{provider} circuit is open after repeated failures; retrying in {retry_in:.0f}s")
+        self.provider = provider
+        self.retry_in = retry_in
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status of an SDK error: status_code for OpenAI, Groq and Anthropic, code for Google"""
+    for attribute in ('status_code', 'code'):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+def is_retryable(error: BaseException) -> bool:
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Connection resets and timeouts carry no status
+    name = type(error).__name__
+    return isinstance(error, (ConnectionError, TimeoutError)) or 'Connection' in name or 'Timeout' in name
+
+def should_fail_over(error: BaseException) -> bool:
+    """Whether another provider in the failover list should get the request after this error"""
+    return isinstance(error, CircuitOpenError) or is_retryable(error) or error_status(error) in FAILOVER_STATUS
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, from the Retry-After family of headers"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring Retry-After"""
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        max_retry_after: float = 60.0
+    ):
+        """
+        Initialize the RetryPolicy.
+
+        Args:
+            max_attempts: Calls per provider, including the first one
+            base_delay: Backoff ceiling in seconds before the first retry, doubled for each retry
+            max_delay: Largest backoff ceiling in seconds
+            max_retry_after: Longest Retry-After to wait for; a longer one moves on to the
+                next provider instead
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    @classmethod
+    def from_env(cls) -> 'RetryPolicy':
+        return cls(
+            max_attempts=int(os.getenv('LLM_MAX_ATTEMPTS', '3')),
+            base_delay=float(os.getenv('LLM_RETRY_BASE_DELAY', '0.5')),
+            max_delay=float(os.getenv('LLM_RETRY_MAX_DELAY', '20')),
+            max_retry_after=float(os.getenv('LLM_RETRY_MAX_RETRY_AFTER', '60'))
+        )
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        Seconds to wait before retrying after a failed attempt.
+
+        Args:
+            attempt: Number of the failed attempt, starting at 1
+            error: The error it failed with
+
+        Returns:
+            The delay, or None if the request should move on to the next provider
+        """
+        if attempt >= self.max_attempts or not is_retryable(error):
+            return None
+        requested = retry_after(error)
+        if requested is not None:
+            return requested if requested <= self.max_retry_after else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after repeated failures.
+
+    After failure_threshold consecutive retryable failures the circuit opens and calls
+    fail immediately with CircuitOpenError. Once reset_timeout has passed, one trial call
+    is let through: success closes the circuit, failure opens it again.
+    """
+    def __init__(self, provider: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a trial call running
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return
+            waited = time.monotonic() - self.opened_at
+            if waited < self.reset_timeout or self.trial_running:
+                raise CircuitOpenError(self.provider, max(0.0, self.reset_timeout - waited))
+            self.trial_running = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"{self.provider} circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self, error: BaseException) -> None:
+        # A bad request says nothing about the provider's health
+        if not is_retryable(error):
+            with self._lock:
+                self.trial_running = False
+            return
+        with self._lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_running:
+                    logger.warning(f"{self.provider} circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+class ResilienceStats:
+    """
+    Time spent per provider, split into waiting on calls that succeeded and retry overhead:
+    calls that failed and backoff sleeps.
+    """
+    FIELDS = ('calls', 'failures', 'retries', 'failovers', 'wait_seconds', 'failed_seconds', 'backoff_seconds')
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, provider: str, **amounts: float) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(provider, dict.fromkeys(self.FIELDS, 0))
+            for field, amount in amounts.items():
+                totals[field] += amount
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {provider: dict(totals) for provider, totals in self._totals.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+    def log_stats(self) -> None:
+        for provider, totals in self.totals().items():
+            logger.info(
+                f"{provider}: {totals['calls']} calls, {totals['failures']} failed, {totals['retries']} retries, "
+                f"{totals['failovers']} failovers; {totals['wait_seconds']:.2f}s provider wait, "
+                f"{totals['failed_seconds'] + totals['backoff_seconds']:.2f}s retry overhead "
+                f"({totals['backoff_seconds']:.2f}s backoff)"
+            )
+
+resilience_stats = ResilienceStats()
+
+def parse_failover(value: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Parse a failover list such as "groq:llama-3.3-70b-versatile,openai,anthropic".
+
+    Returns:
+        (provider, model or None) pairs in order
+    """
+    entries = []
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        provider, _, model = entry.partition(':')
+        entries.append((provider.strip().lower(), model.strip() or None))
+    return entries
+
+def failover_plan(
+    provider: str,
+    model: str,
+    api_key: Optional[str],
+    failover: Optional[List[Tuple[str, Optional[str]]]] = None
+) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    Ordered (provider, model, api_key) targets for a request.
+
+    The requested provider comes first with the caller's model and key. It is followed by
+    the failover list, LLM_FAILOVER by default, skipping the requested provider. Failover
+    providers use their key from the environment, and the model named in the list or
+    their entry in DEFAULT_MODELS.
+
+    A request made with the caller's own key never fails over: an invalid or exhausted
+    user key would otherwise be billed to the operator's keys without anyone noticing.
+    """
+    plan = [(provider.lower(), model, api_key)]
+    if api_key is not None:
+        return plan
+    if failover is None:
+        failover = parse_failover(os.getenv('LLM_FAILOVER', ''))
+    for name, failover_model in failover:
+        if name == provider.lower() or name in (target[0] for target in plan):
+            continue
+        plan.append((name, failover_model or DEFAULT_MODELS.get(name, model), None))
+    return plan
+
+class ResilientCaller:
+    """
+    Runs a provider call with retries, per-key circuit breakers and failover.
+
+    Each target in a plan is tried up to the retry policy's attempt limit. Retryable
+    errors back off and try again; once a provider is out of attempts, has its circuit
+    open or fails in a way another provider might not, the next target in the plan gets
+    the request. Any other error is raised straight away, as is the last error once the
+    plan is exhausted.
+    """
+    def __init__(
+        self,
+        policy: Optional[RetryPolicy] = None,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        stats: Optional[ResilienceStats] = None
+    ):
+        """
+        Initialize the ResilientCaller.
+
+        Args:
+            policy: Retry policy; read from the environment by default
+            failure_threshold: Consecutive failures that open a circuit, default LLM_CIRCUIT_FAILURES or 5
+            reset_timeout: Seconds before an open circuit lets a trial call through,
+                default LLM_CIRCUIT_RESET_SECONDS or 30
+            stats: Where to record timings, the module's resilience_stats by default
+        """
+        self.policy = policy or RetryPolicy.from_env()
+        self.failure_threshold = failure_threshold or int(os.getenv('LLM_CIRCUIT_FAILURES', '5'))
+        self.reset_timeout = reset_timeout or float(os.getenv('LLM_CIRCUIT_RESET_SECONDS', '30'))
+        self.stats = stats or resilience_stats
+        self._breakers: "OrderedDict[Tuple[str, str], CircuitBreaker]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def breaker(self, provider: str, api_key: Optional[str] = None) -> CircuitBreaker:
+        """
+        Circuit breaker for a provider and key.
+
+        Each key gets its own breaker, as in the rate limiter, so one user's quota errors
+        do not open the circuit for everyone else using that provider. Requests on the
+        server's environment key (api_key None) share one breaker per provider.
+        """
+        key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16] if api_key else 'env'
+        key = (provider.lower(), key_hash)
+        with self._lock:
+            if key in self._breakers:
+                self._breakers.move_to_end(key)
+            else:
+                self._breakers[key] = CircuitBreaker(provider, self.failure_threshold, self.reset_timeout)
+                if len(self._breakers) > MAX_BREAKERS:
+                    self._breakers.popitem(last=False)
+            return self._breakers[key]
+
+    def after_failure(
+        self,
+        provider: str,
+        attempt: int,
+        error: BaseException,
+        elapsed: float,
+        api_key: Optional[str] = None
+    ) -> Optional[float]:
+        """Record a failed attempt and return the backoff before the next one, or None to move on"""
+        if not isinstance(error, CircuitOpenError):
+            self.breaker(provider, api_key).record_failure(error)
+            self.stats.add(provider, calls=1, failures=1, failed_seconds=elapsed)
+        if not should_fail_over(error):
+            raise error
+        if isinstance(error, CircuitOpenError):
+            logger.debug(str(error))
+            return None
+        delay = self.policy.delay(attempt, error)
+        if delay is None:
+            logger.warning(f"{provider} failed after {attempt} attempt(s): {error}")
+        else:
+            logger.warning(f"{provider} attempt {attempt} failed, retrying in {delay:.2f}s: {error}")
+            self.stats.add(provider, retries=1, backoff_seconds=delay)
+        return delay
+
+    def call(
+        self,
+        plan: List[Tuple[str, str, Optional[str]]],
+        function: Callable[[str, str, Optional[str]], T],
+        admit: Optional[Callable[[str, str, Optional[str]], Any]] = None
+    ) -> T:
+        """
+        Call function(provider, model, api_key) for the targets in plan until one succeeds.
+
+        admit, if given, is called the same way before each attempt, e.g. to wait for a
+        rate limiter; its time is not counted as provider wait.
+
+        Raises:
+            The last error once every target has failed, or the first error no retry or
+            failover can fix
+        """
+        last_error: Optional[BaseException] = None
+        for index, (provider, model, api_key) in enumerate(plan):
+            if index:
+                self.stats.add(provider, failovers=1)
+                logger.info(f"Failing over to {provider}/{model}")
+            attempt = 0
+            while True:
+                attempt += 1
+                start = time.perf_counter()
+                try:
+                    self.breaker(provider, api_key).before_call()
+                    if admit is not None:
+                        admit(provider, model, api_key)
+                        start = time.perf_counter()
+                    result = function(provider, model, api_key)
+                except Exception as e:
+                    last_error = e
+                    delay = self.after_failure(provider, attempt, e, time.perf_counter() - start, api_key)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+                self.breaker(provider, api_key).record_success()
+                self.stats.add(provider, calls=1, wait_seconds=time.perf_counter() - start)
+                return result
+        raise last_error
+
+    async def acall(
+        self,
+        plan: List[Tuple[str, str, Optional[str]]],
+        function: Callable[[str, str, Optional[str]], Awaitable[T]],
+        admit: Optional[Callable[[str, str, Optional[str]], Awaitable[Any]]] = None
+    ) -> T:
+        """Async version of call, for coroutine functions; backoff sleeps without blocking the loop"""
+        last_error: Optional[BaseException] = None
+        for index, (provider, model, api_key) in enumerate(plan):
+            if index:
+                self.stats.add(provider, failovers=1)
+                logger.info(f"Failing over to {provider}/{model}")
+            attempt = 0
+            while True:
+                attempt += 1
+                start = time.perf_counter()
+                try:
+                    self.breaker(provider, api_key).before_call()
+                    if admit is not None:
+                        await admit(provider, model, api_key)
+                        start = time.perf_counter()
+                    result = await function(provider, model, api_key)
+                except Exception as e:
+                    last_error = e
+                    delay = self.after_failure(provider, attempt, e, time.perf_counter() - start, api_key)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+                    continue
+                self.breaker(provider, api_key).record_success()
+                self.stats.add(provider, calls=1, wait_seconds=time.perf_counter() - start)
+                return result
+        raise last_error
@@ -1,19 +1,100 @@
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Union, Tuple, Iterator, Callable
+from collections import OrderedDict
 import os
-from dotenv import load_dotenv
-import openai
-from openai import OpenAI
-import anthropic
-from groq import Groq
-import google.generativeai as genai
+import sys
+import json
+import asyncio
+import hashlib
+import threading
+import weakref
+import logging
+import time
+from response_cache import ResponseCache, get_response_cache, response_cache_enabled, response_cache_key
+from llm_resilience import ResilientCaller, failover_plan
+from rate_limiter import RateLimiter, create_rate_limiter, estimate_request_tokens
+from llm_telemetry import CallTracker, current_call, track_call, iterate_tracked
+from paths import backend_path
 
-# Load environment variables from .env file
-load_dotenv()
+# Provider SDKs are imported on first use of their provider, so a process only pays for
+# the one it calls; importing all four takes seconds
+
+logger = logging.getLogger(__name__)
+
+# Retries and failover are handled by ResilientCaller, so SDK clients report errors at once
+SDK_MAX_RETRIES = 0
+
+_environment_loaded = False
+
+def load_environment() -> None:
+    """Load environment variables from the .env file, once per process"""
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
+
+class UsageStats:
+    """Token usage per provider and model, including prompt tokens served from provider caches"""
+    FIELDS = ('calls', 'prompt_tokens', 'completion_tokens', 'cached_tokens', 'cache_write_tokens')
+
+    def __init__(self):
+        self._totals: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cached_tokens: int = 0,
+        cache_write_tokens: int = 0
+    ) -> None:
+        """
+        Add one response's usage to the totals.
+
+        Args:
+            provider: Name of the provider
+            model: Name of the model
+            prompt_tokens: All input tokens, cached or not
+            completion_tokens: Output tokens
+            cached_tokens: Input tokens read from the provider's prompt cache
+            cache_write_tokens: Input tokens written to the provider's prompt cache
+        """
+        logger.info(
+            f"{provider}/{model} usage: {prompt_tokens} prompt tokens ({cached_tokens} cached, "
+            f"{cache_write_tokens} written to cache), {completion_tokens} completion tokens"
+        )
+        with self._lock:
+            totals = self._totals.setdefault((provider, model), dict.fromkeys(self.FIELDS, 0))
+            totals['calls'] += 1
+            totals['prompt_tokens'] += prompt_tokens
+            totals['completion_tokens'] += completion_tokens
+            totals['cached_tokens'] += cached_tokens
+            totals['cache_write_tokens'] += cache_write_tokens
+
+    def totals(self) -> Dict[Tuple[str, str], Dict[str, int]]:
+        with self._lock:
+            return {key: dict(totals) for key, totals in self._totals.items()}
+
+    def log_stats(self) -> None:
+        for (provider, model), totals in self.totals().items():
+            hit_rate = totals['cached_tokens'] / totals['prompt_tokens'] if totals['prompt_tokens'] else 0.0
+            logger.info(
+                f"{provider}/{model}: {totals['calls']} calls, {totals['prompt_tokens']} prompt tokens "
+                f"({hit_rate:.0%} cached), {totals['completion_tokens']} completion tokens"
+            )
+
+usage_stats = UsageStats()
 
 class LLMProvider:
     """Base class for LLM providers"""
+    name = 'llm'
+
     def __init__(self, api_key: str):
         self.api_key = api_key
+        # Async SDK clients hold connections bound to one event loop, so keep one per loop
+        self._async_clients = weakref.WeakKeyDictionary()
     
     def generate(self, 
                 prompt: str, 
@@ -21,13 +102,96 @@ class LLMProvider:
                 system_prompt: Optional[str] = None,
                 temperature: float = 0.7,
                 max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> str:
+        raise NotImplementedError
+
+    def generate_stream(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> Iterator[str]:
+        """Yield the response as text deltas. Providers without streaming yield it in one piece."""
+        yield self.generate(
+            prompt=prompt,
+            model=model,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            cached_prefix=cached_prefix,
+            **kwargs
+        )
+
+    async def agenerate(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
                 **kwargs) -> str:
+        """Async version of generate. Providers without an async SDK run generate in a thread."""
+        return await asyncio.to_thread(
+            self.generate,
+            prompt=prompt,
+            model=model,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            cached_prefix=cached_prefix,
+            **kwargs
+        )
+
+    def user_content(self, prompt: str, cached_prefix: Optional[str] = None) -> Any:
+        """
+        Content of the user message.
+
+        cached_prefix is the stable start of the prompt, such as the resume, and is sent
+        first so the provider's prompt cache can reuse it across requests.
+        """
+        return prompt if cached_prefix is None else cached_prefix + prompt
+
+    def usage_counts(self, usage: Any) -> Tuple[int, int, int, int]:
+        """(prompt, completion, cached prompt, cache write) tokens from an OpenAI-style usage object"""
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return usage.prompt_tokens, usage.completion_tokens, getattr(details, 'cached_tokens', None) or 0, 0
+
+    def record_usage(self, model: str, usage: Any) -> None:
+        if usage is None:
+            return
+        try:
+            counts = self.usage_counts(usage)
+        except (AttributeError, TypeError) as e:
+            logger.debug(f"Could not read {self.name} usage: {e}")
+            return
+        usage_stats.record(self.name, model, *counts)
+        tracker = current_call()
+        if tracker is not None:
+            tracker.set_usage(*counts)
+
+    def create_async_client(self):
         raise NotImplementedError
 
+    @property
+    def async_client(self):
+        """The async SDK client for the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self.create_async_client()
+            self._async_clients[loop] = client
+        return client
+
 class OpenAIProvider(LLMProvider):
+    name = 'openai'
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.client = OpenAI(api_key=api_key)
+        from openai import OpenAI
+        self.client = OpenAI(api_key=api_key, max_retries=SDK_MAX_RETRIES)
     
     def generate(self, 
                 prompt: str, 
@@ -35,37 +199,114 @@ class OpenAIProvider(LLMProvider):
                 system_prompt: Optional[str] = None,
                 temperature: float = 0.7,
                 max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
                 **kwargs) -> str:
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        messages.append({"role": "user", "content": self.user_content(prompt, cached_prefix)})
+        
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        self.record_usage(model, response.usage)
+        return response.choices[0].message.content.strip()
+
+    def generate_stream(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> Iterator[str]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": self.user_content(prompt, cached_prefix)})
         
         response = self.client.chat.completions.create(
             model=model,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
             **kwargs
         )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            # The final chunk carries the usage and no choices
+            if chunk.usage is not None:
+                self.record_usage(model, chunk.usage)
+
+    def create_async_client(self):
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=self.api_key, max_retries=SDK_MAX_RETRIES)
+
+    async def agenerate(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> str:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": self.user_content(prompt, cached_prefix)})
+        
+        response = await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        self.record_usage(model, response.usage)
         return response.choices[0].message.content.strip()
 
 class AnthropicProvider(LLMProvider):
+    name = 'anthropic'
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.client = anthropic.Anthropic(api_key=api_key)
+        import anthropic
+        self.client = anthropic.Anthropic(api_key=api_key, max_retries=SDK_MAX_RETRIES)
     
+    def user_content(self, prompt: str, cached_prefix: Optional[str] = None) -> Any:
+        if cached_prefix is None:
+            return prompt
+        # Mark the end of the prefix as a cache breakpoint; the system prompt before it is cached too
+        return [
+            {"type": "text", "text": cached_prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt}
+        ]
+
+    def usage_counts(self, usage: Any) -> Tuple[int, int, int, int]:
+        # input_tokens only counts the tokens after the last cache breakpoint
+        cached = usage.cache_read_input_tokens or 0
+        written = usage.cache_creation_input_tokens or 0
+        return usage.input_tokens + cached + written, usage.output_tokens, cached, written
+
     def generate(self, 
                 prompt: str, 
                 model: str, 
                 system_prompt: Optional[str] = None,
                 temperature: float = 0.7,
                 max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
                 **kwargs) -> str:
-        messages = []
+        messages = [{"role": "user", "content": self.user_content(prompt, cached_prefix)}]
         if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+            # The Messages API takes the system prompt as its own parameter, not as a message
+            kwargs['system'] = system_prompt
         
         response = self.client.messages.create(
             model=model,
@@ -74,12 +315,66 @@ class AnthropicProvider(LLMProvider):
             max_tokens=max_tokens,
             **kwargs
         )
+        self.record_usage(model, response.usage)
+        return response.content[0].text.strip()
+
+    def generate_stream(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> Iterator[str]:
+        messages = [{"role": "user", "content": self.user_content(prompt, cached_prefix)}]
+        if system_prompt:
+            # The Messages API takes the system prompt as its own parameter, not as a message
+            kwargs['system'] = system_prompt
+        
+        with self.client.messages.stream(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        ) as stream:
+            yield from stream.text_stream
+            self.record_usage(model, stream.get_final_message().usage)
+
+    def create_async_client(self):
+        import anthropic
+        return anthropic.AsyncAnthropic(api_key=self.api_key, max_retries=SDK_MAX_RETRIES)
+
+    async def agenerate(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> str:
+        messages = [{"role": "user", "content": self.user_content(prompt, cached_prefix)}]
+        if system_prompt:
+            # The Messages API takes the system prompt as its own parameter, not as a message
+            kwargs['system'] = system_prompt
+        
+        response = await self.async_client.messages.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        self.record_usage(model, response.usage)
         return response.content[0].text.strip()
 
 class GroqProvider(LLMProvider):
+    name = 'groq'
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.client = Groq(api_key=api_key)
+        from groq import Groq
+        self.client = Groq(api_key=api_key, max_retries=SDK_MAX_RETRIES)
     
     def generate(self, 
                 prompt: str, 
@@ -87,11 +382,12 @@ class GroqProvider(LLMProvider):
                 system_prompt: Optional[str] = None,
                 temperature: float = 0.7,
                 max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
                 **kwargs) -> str:
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        messages.append({"role": "user", "content": self.user_content(prompt, cached_prefix)})
         
         response = self.client.chat.completions.create(
             model=model,
@@ -100,36 +396,189 @@ class GroqProvider(LLMProvider):
             max_tokens=max_tokens,
             **kwargs
         )
+        self.record_usage(model, response.usage)
+        return response.choices[0].message.content.strip()
+
+    def generate_stream(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> Iterator[str]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": self.user_content(prompt, cached_prefix)})
+        
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            **kwargs
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            # Groq reports usage on the final chunk under x_groq
+            x_groq = getattr(chunk, 'x_groq', None)
+            if x_groq is not None and getattr(x_groq, 'usage', None) is not None:
+                self.record_usage(model, x_groq.usage)
+
+    def create_async_client(self):
+        from groq import AsyncGroq
+        return AsyncGroq(api_key=self.api_key, max_retries=SDK_MAX_RETRIES)
+
+    async def agenerate(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> str:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": self.user_content(prompt, cached_prefix)})
+        
+        response = await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        self.record_usage(model, response.usage)
         return response.choices[0].message.content.strip()
 
 class GoogleProvider(LLMProvider):
+    name = 'google'
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        genai.configure(api_key=api_key)
+        import google.generativeai as genai
+        import google.ai.generativelanguage as glm
         self.client = genai
+        # genai.configure sets one key for the whole process, so concurrent calls with
+        # different keys could run under each other's; each provider has its own client instead
+        self.generative_client = glm.GenerativeServiceClient(client_options={'api_key': api_key})
+
+    def create_async_client(self):
+        import google.ai.generativelanguage as glm
+        return glm.GenerativeServiceAsyncClient(client_options={'api_key': self.api_key})
+
+    def generative_model(self, model: str, use_async: bool = False) -> Any:
+        """A GenerativeModel bound to this provider's key rather than the SDK's default client"""
+        generative_model = self.client.GenerativeModel(model)
+        if use_async:
+            generative_model._async_client = self.async_client
+        else:
+            generative_model._client = self.generative_client
+        return generative_model
     
+    def usage_counts(self, usage: Any) -> Tuple[int, int, int, int]:
+        return (usage.prompt_token_count, usage.candidates_token_count,
+                usage.cached_content_token_count or 0, 0)
+
     def generate(self, 
                 prompt: str, 
                 model: str, 
                 system_prompt: Optional[str] = None,
                 temperature: float = 0.7,
                 max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
                 **kwargs) -> str:
-        model = self.client.GenerativeModel(model)
+        generative_model = self.generative_model(model)
         
+        prompt = self.user_content(prompt, cached_prefix)
         if system_prompt:
             prompt = f"{system_prompt}\n\n{prompt}"
         
-        response = model.generate_content(
+        response = generative_model.generate_content(
             prompt,
-            generation_config=genai.types.GenerationConfig(
+            generation_config=self.client.types.GenerationConfig(
                 temperature=temperature,
                 max_output_tokens=max_tokens,
                 **kwargs
             )
         )
+        self.record_usage(model, response.usage_metadata)
         return response.text.strip()
 
+    def generate_stream(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> Iterator[str]:
+        generative_model = self.generative_model(model)
+        
+        prompt = self.user_content(prompt, cached_prefix)
+        if system_prompt:
+            prompt = f"{system_prompt}\n\n{prompt}"
+        
+        response = generative_model.generate_content(
+            prompt,
+            generation_config=self.client.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+                **kwargs
+            ),
+            stream=True
+        )
+        for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+        self.record_usage(model, response.usage_metadata)
+
+    async def agenerate(self, 
+                prompt: str, 
+                model: str, 
+                system_prompt: Optional[str] = None,
+                temperature: float = 0.7,
+                max_tokens: Optional[int] = None,
+                cached_prefix: Optional[str] = None,
+                **kwargs) -> str:
+        generative_model = self.generative_model(model, use_async=True)
+        
+        prompt = self.user_content(prompt, cached_prefix)
+        if system_prompt:
+            prompt = f"{system_prompt}\n\n{prompt}"
+        
+        response = await generative_model.generate_content_async(
+            prompt,
+            generation_config=self.client.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+                **kwargs
+            )
+        )
+        self.record_usage(model, response.usage_metadata)
+        return response.text.strip()
+
+# Provider classes by name; tests and tools can register extra ones
+PROVIDERS = {
+    'openai': OpenAIProvider,
+    'anthropic': AnthropicProvider,
+    'groq': GroqProvider,
+    'google': GoogleProvider
+}
+
+def resolve_api_key(provider_name: str, api_key: Optional[str] = None) -> str:
+    """Return the given API key, or the provider's key from the environment."""
+    load_environment()
+    if api_key is None:
+        api_key = os.getenv(f"{provider_name.upper()}_API_KEY")
+        if api_key is None:
+            raise ValueError(f"API key not provided and {provider_name.upper()}_API_KEY not found in environment variables")
+    return api_key
+
 def get_provider(provider_name: str, api_key: Optional[str] = None) -> LLMProvider:
     """
     Factory function to get the appropriate LLM provider.
@@ -144,22 +593,191 @@ def get_provider(provider_name: str, api_key: Optional[str] = None) -> LLMProvid
     Raises:
         ValueError: If provider_name is not supported or api_key is missing.
     """
-    if api_key is None:
-        api_key = os.getenv(f"{provider_name.upper()}_API_KEY")
-        if api_key is None:
-            raise ValueError(f"API key not provided and {provider_name.upper()}_API_KEY not found in environment variables")
-    
-    providers = {
-        'openai': OpenAIProvider,
-        'anthropic': AnthropicProvider,
-        'groq': GroqProvider,
-        'google': GoogleProvider
-    }
+    api_key = resolve_api_key(provider_name, api_key)
     
-    if provider_name.lower() not in providers:
+    if provider_name.lower() not in PROVIDERS:
         raise ValueError(f"Unsupported provider: {provider_name}")
     
-    return providers[provider_name.lower()](api_key)
+    return PROVIDERS[provider_name.lower()](api_key)
+
+class ProviderRegistry:
+    """
+    Process-wide cache of provider instances keyed by (provider, API key hash).
+
+    Reusing a provider keeps its SDK client, and with it the HTTP connection pool, alive
+    between calls. The least recently used provider is dropped once max_size is reached,
+    which bounds the number of clients held for per-user keys. Without an explicit
+    max_size, LLM_PROVIDER_CACHE_SIZE is read when the first provider is created.
+    """
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self._providers: "OrderedDict[Tuple[str, str], LLMProvider]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, provider_name: str, api_key: Optional[str] = None) -> LLMProvider:
+        """
+        Return a cached provider, creating it with get_provider on first use.
+
+        Args:
+            provider_name: Name of the provider ('openai', 'anthropic', 'groq', 'google')
+            api_key: API key for the provider. If None, will try to get from environment variables.
+
+        Returns:
+            A shared instance of the requested LLM provider.
+        """
+        api_key = resolve_api_key(provider_name, api_key)
+        key = (provider_name.lower(), hashlib.sha256(api_key.encode('utf-8')).hexdigest())
+        with self._lock:
+            provider = self._providers.get(key)
+            if provider is not None:
+                self._providers.move_to_end(key)
+                return provider
+
+            provider = get_provider(provider_name, api_key)
+            if self.max_size is None:
+                self.max_size = int(os.getenv('LLM_PROVIDER_CACHE_SIZE', '32'))
+            self._providers[key] = provider
+            # Evicted clients are closed by the SDK once the last in-flight call releases them
+            while len(self._providers) > self.max_size:
+                self._providers.popitem(last=False)
+            return provider
+
+    def clear(self) -> None:
+        with self._lock:
+            self._providers.clear()
+
+provider_registry = ProviderRegistry()
+
+_resilient_caller: Optional[ResilientCaller] = None
+_resilient_caller_lock = threading.Lock()
+
+def get_resilient_caller() -> ResilientCaller:
+    """Return the process-wide ResilientCaller, configured from the environment"""
+    global _resilient_caller
+    load_environment()
+    with _resilient_caller_lock:
+        if _resilient_caller is None:
+            _resilient_caller = ResilientCaller()
+        return _resilient_caller
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Return the process-wide rate limiter.
+
+    Limits come from <PROVIDER>_RPM and <PROVIDER>_TPM. LLM_RATE_LIMIT_BACKEND picks where
+    the buckets live: 'memory' (default) for this process, 'file' to share them with
+    every script on the machine, or 'redis' to share them through REDIS_URL.
+    """
+    global _rate_limiter
+    load_environment()
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = create_rate_limiter(
+                backend=os.getenv('LLM_RATE_LIMIT_BACKEND', 'memory'),
+                directory=backend_path(os.getenv('LLM_RATE_LIMIT_DIR', 'data/cache/rate_limits'))
+            )
+        return _rate_limiter
+
+def rate_limit_admission(
+    prompt: str,
+    system_prompt: Optional[str],
+    max_tokens: Optional[int],
+    cached_prefix: Optional[str] = None
+) -> Tuple[Callable[[str, str, Optional[str]], float], Callable[[str, str, Optional[str]], Any]]:
+    """
+    Build the sync and async admit hooks that queue a request on the rate limiter.
+
+    Returns:
+        Tuple of (admit, async admit) for ResilientCaller.call and acall
+    """
+    tokens = estimate_request_tokens(len(prompt) + len(system_prompt or '') + len(cached_prefix or ''), max_tokens)
+    limiter = get_rate_limiter()
+
+    def admit(target: str, target_model: str, target_key: Optional[str]) -> float:
+        return limiter.acquire(target, resolve_api_key(target, target_key), tokens)
+
+    async def aadmit(target: str, target_model: str, target_key: Optional[str]) -> float:
+        return await limiter.aacquire(target, resolve_api_key(target, target_key), tokens)
+
+    return admit, aadmit
+
+def request_plan(provider: str, model: str, api_key: Optional[str]) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    Providers to try for a request: the requested one, then the LLM_FAILOVER list.
+
+    Failover providers that are unknown or have no API key in the environment are left
+    out, so a partly configured list never hides the requested provider's own error.
+    """
+    load_environment()
+    plan = failover_plan(provider, model, api_key)
+    usable = plan[:1]
+    for name, failover_model, failover_key in plan[1:]:
+        if name not in PROVIDERS:
+            logger.warning(f"Ignoring unknown failover provider {name}")
+        elif os.getenv(f"{name.upper()}_API_KEY"):
+            usable.append((name, failover_model, failover_key))
+    return usable
+
+def lookup_cached_response(
+    use_cache: Optional[bool],
+    refresh_cache: bool,
+    provider: str,
+    model: str,
+    system_prompt: Optional[str],
+    prompt: str,
+    temperature: float,
+    max_tokens: Optional[int],
+    **kwargs
+) -> Tuple[Optional[ResponseCache], Optional[str], Optional[str]]:
+    """
+    Look up a generation in the response cache.
+
+    Returns:
+        Tuple of (cache, key, cached text). cache and key are None when caching is off;
+        the cached text is None on a miss or when refresh_cache is set.
+    """
+    load_environment()
+    if use_cache is None:
+        use_cache = response_cache_enabled()
+    if not use_cache:
+        return None, None, None
+
+    cache = get_response_cache()
+    key = response_cache_key(provider, model, system_prompt, prompt, temperature, max_tokens, **kwargs)
+    if refresh_cache:
+        return cache, key, None
+
+    start = time.perf_counter()
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"Response cache hit for {provider}/{model} in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return cache, key, cached
+
+def store_cached_response(
+    cache: ResponseCache,
+    key: str,
+    text: str,
+    requested: Tuple[str, str],
+    answered: Tuple[str, str],
+    system_prompt: Optional[str],
+    prompt: str,
+    temperature: float,
+    max_tokens: Optional[int],
+    **kwargs
+) -> None:
+    """
+    Store a generation in the response cache under the provider and model that wrote it.
+
+    A reply from a failover provider goes under that provider's key rather than the
+    requested one, so the requested provider's answer is still fetched once it recovers.
+    """
+    provider, model = answered
+    if answered != requested:
+        key = response_cache_key(provider, model, system_prompt, prompt, temperature, max_tokens, **kwargs)
+    cache.set(key, text, {'provider': provider, 'model': model})
 
 def generate_text(
     prompt: str,
@@ -169,11 +787,81 @@ def generate_text(
     system_prompt: Optional[str] = None,
     temperature: float = 0.7,
     max_tokens: Optional[int] = None,
+    use_cache: Optional[bool] = None,
+    refresh_cache: bool = False,
     **kwargs
 ) -> str:
     """
     Generate text using the specified LLM provider.
     
+    Rate limits, server errors and timeouts are retried with backoff, and once the
+    provider is out of attempts or its circuit breaker is open, the providers in
+    LLM_FAILOVER are tried in order (see llm_resilience).
+    
+    Args:
+        prompt: The user's prompt
+        provider: Name of the provider ('openai', 'anthropic', 'groq', 'google')
+        model: Name of the model to use
+        api_key: API key for the provider
+        system_prompt: Optional system prompt to guide the model's behavior
+        temperature: Controls randomness in the output (0.0 to 1.0)
+        max_tokens: Maximum number of tokens to generate
+        use_cache: Serve and store the response in the local response cache. Defaults to
+            the LLM_RESPONSE_CACHE environment variable.
+        refresh_cache: Skip the cached response and overwrite it with a fresh one
+        **kwargs: Additional provider-specific parameters
+    
+    Returns:
+        Generated text from the LLM
+    """
+    cache, key, cached = lookup_cached_response(
+        use_cache, refresh_cache, provider, model, system_prompt, prompt, temperature, max_tokens, **kwargs
+    )
+    if cached is not None:
+        return cached
+
+    answered = (provider, model)
+
+    def call(target: str, target_model: str, target_key: Optional[str]) -> str:
+        nonlocal answered
+        provider_instance = provider_registry.get(target, target_key)
+        with track_call(target, target_model, 'generate', provider_instance.api_key):
+            text = provider_instance.generate(
+                prompt=prompt,
+                model=target_model,
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **kwargs
+            )
+        answered = (target, target_model)
+        return text
+
+    admit, _ = rate_limit_admission(prompt, system_prompt, max_tokens, kwargs.get('cached_prefix'))
+    text = get_resilient_caller().call(request_plan(provider, model, api_key), call, admit)
+    if cache is not None:
+        store_cached_response(cache, key, text, (provider, model), answered, system_prompt, prompt,
+                              temperature, max_tokens, **kwargs)
+    return text
+
+def stream_text(
+    prompt: str,
+    provider: str = "openai",
+    model: str = "gpt-4-turbo-preview",
+    api_key: Optional[str] = None,
+    system_prompt: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    use_cache: Optional[bool] = None,
+    refresh_cache: bool = False,
+    **kwargs
+) -> Iterator[str]:
+    """
+    Generate text like generate_text, yielding it as text deltas while the model writes.
+    
+    A cached response is yielded in one piece. The complete text is stored in the cache
+    once the stream finishes, and the time to the first delta is logged.
+    
     Args:
         prompt: The user's prompt
         provider: Name of the provider ('openai', 'anthropic', 'groq', 'google')
@@ -182,17 +870,167 @@ def generate_text(
         system_prompt: Optional system prompt to guide the model's behavior
         temperature: Controls randomness in the output (0.0 to 1.0)
         max_tokens: Maximum number of tokens to generate
+        use_cache: Serve and store the response in the local response cache. Defaults to
+            the LLM_RESPONSE_CACHE environment variable.
+        refresh_cache: Skip the cached response and overwrite it with a fresh one
+        **kwargs: Additional provider-specific parameters
+    
+    Yields:
+        Chunks of generated text
+    """
+    cache, key, cached = lookup_cached_response(
+        use_cache, refresh_cache, provider, model, system_prompt, prompt, temperature, max_tokens, **kwargs
+    )
+    if cached is not None:
+        yield cached
+        return
+
+    answered = (provider, model)
+
+    def open_stream(target: str, target_model: str, target_key: Optional[str]) -> Tuple[Optional[str], Iterator[str]]:
+        nonlocal answered
+        provider_instance = provider_registry.get(target, target_key)
+        stream = iterate_tracked(iter(provider_instance.generate_stream(
+            prompt=prompt,
+            model=target_model,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )), CallTracker(target, target_model, 'stream', provider_instance.api_key))
+        first = next(stream, None)
+        answered = (target, target_model)
+        return first, stream
+
+    start = time.perf_counter()
+    # Only the wait for the first delta is retried; once text is out, an error ends the stream
+    admit, _ = rate_limit_admission(prompt, system_prompt, max_tokens, kwargs.get('cached_prefix'))
+    first, stream = get_resilient_caller().call(request_plan(provider, model, api_key), open_stream, admit)
+    logger.info(f"First token from {provider}/{model} after {(time.perf_counter() - start) * 1000:.0f}ms")
+    chunks = []
+    if first is not None:
+        chunks.append(first)
+        yield first
+    for chunk in stream:
+        chunks.append(chunk)
+        yield chunk
+
+    logger.info(f"Stream from {provider}/{model} finished after {(time.perf_counter() - start) * 1000:.0f}ms")
+    if cache is not None:
+        store_cached_response(cache, key, ''.join(chunks).strip(), (provider, model), answered, system_prompt,
+                              prompt, temperature, max_tokens, **kwargs)
+
+def generate_text_streaming(on_delta: Callable[[str], None], **kwargs) -> str:
+    """
+    Run stream_text, passing each delta to on_delta, and return the full stripped text.
+    
+    Args:
+        on_delta: Called with each chunk of text as it arrives
+        **kwargs: Arguments for stream_text
+    
+    Returns:
+        Generated text from the LLM, as generate_text would return it
+    """
+    chunks = []
+    for chunk in stream_text(**kwargs):
+        chunks.append(chunk)
+        on_delta(chunk)
+    return ''.join(chunks).strip()
+
+def print_delta_event(text: str) -> None:
+    """Write a streamed text delta to stdout as an NDJSON event, for the CLI scripts."""
+    sys.stdout.write(json.dumps({'event': 'delta', 'text': text}) + '\n')
+    sys.stdout.flush()
+
+async def generate_text_async(
+    prompt: str,
+    provider: str = "openai",
+    model: str = "gpt-4-turbo-preview",
+    api_key: Optional[str] = None,
+    system_prompt: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    use_cache: Optional[bool] = None,
+    refresh_cache: bool = False,
+    **kwargs
+) -> str:
+    """
+    Async version of generate_text, using each provider's async SDK client.
+    
+    Args:
+        prompt: The user's prompt
+        provider: Name of the provider ('openai', 'anthropic', 'groq', 'google')
+        model: Name of the model to use
+        api_key: API key for the provider
+        system_prompt: Optional system prompt to guide the model's behavior
+        temperature: Controls randomness in the output (0.0 to 1.0)
+        max_tokens: Maximum number of tokens to generate
+        use_cache: Serve and store the response in the local response cache. Defaults to
+            the LLM_RESPONSE_CACHE environment variable.
+        refresh_cache: Skip the cached response and overwrite it with a fresh one
         **kwargs: Additional provider-specific parameters
     
     Returns:
         Generated text from the LLM
     """
-    provider_instance = get_provider(provider, api_key)
-    return provider_instance.generate(
-        prompt=prompt,
-        model=model,
-        system_prompt=system_prompt,
-        temperature=temperature,
-        max_tokens=max_tokens,
-        **kwargs
-    ) 
\ No newline at end of file
+    cache, key, cached = lookup_cached_response(
+        use_cache, refresh_cache, provider, model, system_prompt, prompt, temperature, max_tokens, **kwargs
+    )
+    if cached is not None:
+        return cached
+
+    answered = (provider, model)
+
+    async def call(target: str, target_model: str, target_key: Optional[str]) -> str:
+        nonlocal answered
+        provider_instance = provider_registry.get(target, target_key)
+        with track_call(target, target_model, 'agenerate', provider_instance.api_key):
+            text = await provider_instance.agenerate(
+                prompt=prompt,
+                model=target_model,
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **kwargs
+            )
+        answered = (target, target_model)
+        return text
+
+    _, admit = rate_limit_admission(prompt, system_prompt, max_tokens, kwargs.get('cached_prefix'))
+    text = await get_resilient_caller().acall(request_plan(provider, model, api_key), call, admit)
+    if cache is not None:
+        store_cached_response(cache, key, text, (provider, model), answered, system_prompt, prompt,
+                              temperature, max_tokens, **kwargs)
+    return text
+
+async def generate_many(
+    requests: List[Dict[str, Any]],
+    concurrency: Union[int, Dict[str, int]] = 4,
+    return_exceptions: bool = False
+) -> List[Union[str, BaseException]]:
+    """
+    Run a batch of generations concurrently, limiting in-flight calls per provider.
+    
+    Args:
+        requests: Keyword arguments for generate_text_async, one dict per generation
+        concurrency: Maximum concurrent calls per provider, either one limit for every
+            provider or a dict of limits by provider name (missing providers get 4)
+        return_exceptions: If True, a failed generation returns its exception in place
+            of the text instead of raising
+    
+    Returns:
+        Generated texts in the same order as requests
+    """
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def semaphore_for(provider: str) -> asyncio.Semaphore:
+        if provider not in semaphores:
+            limit = concurrency.get(provider, 4) if isinstance(concurrency, dict) else concurrency
+            semaphores[provider] = asyncio.Semaphore(limit)
+        return semaphores[provider]
+
+    async def run(request: Dict[str, Any]) -> str:
+        async with semaphore_for(request.get('provider', 'openai').lower()):
+            return await generate_text_async(**request)
+
+    return await asyncio.gather(*(run(request) for request in requests), return_exceptions=return_exceptions)
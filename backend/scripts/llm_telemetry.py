@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+from paths import backend_path
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens as (input, cached input, output), matched by the longest model
+# name prefix. Anthropic cache writes cost 1.25x input. LLM_PRICES_FILE can add or
+# override entries with a JSON object of the same shape.
+PRICES: Dict[str, Tuple[float, float, float]] = {
+    'gpt-4-turbo': (10.0, 10.0, 30.0),
+    'gpt-4o-mini': (0.15, 0.075, 0.6),
+    'gpt-4o': (2.5, 1.25, 10.0),
+    'gpt-4.1-nano': (0.1, 0.025, 0.4),
+    'gpt-4.1-mini': (0.4, 0.1, 1.6),
+    'gpt-4.1': (2.0, 0.5, 8.0),
+    'gpt-3.5-turbo': (0.5, 0.5, 1.5),
+    'claude-3-5-haiku': (0.8, 0.08, 4.0),
+    'claude-3-5-sonnet': (3.0, 0.3, 15.0),
+    'claude-3-7-sonnet': (3.0, 0.3, 15.0),
+    'claude-3-opus': (15.0, 1.5, 75.0),
+    'claude-3-haiku': (0.25, 0.03, 1.25),
+    'llama-3.3-70b-versatile': (0.59, 0.59, 0.79),
+    'llama-3.1-8b-instant': (0.05, 0.05, 0.08),
+    'gemini-1.5-flash': (0.075, 0.01875, 0.3),
+    'gemini-1.5-pro': (1.25, 0.3125, 5.0),
+    'gemini-2.0-flash': (0.1, 0.025, 0.4),
+}
+CACHE_WRITE_MULTIPLIER = 1.25
+
+_prices_loaded = False
+
+def model_prices(model: str) -> Optional[Tuple[float, float, float]]:
+    """Prices for a model, or None if it is not in the price table"""
+    global _prices_loaded
+    if not _prices_loaded:
+        path = os.getenv('LLM_PRICES_FILE')
+        if path:
+            try:
+                with open(path, 'r') as f:
+                    PRICES.update({name: tuple(prices) for name, prices in json.load(f).items()})
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Could not load LLM prices from {path}: {e}")
+        _prices_loaded = True
+    matches = [name for name in PRICES if model.startswith(name)]
+    return PRICES[max(matches, key=len)] if matches else None
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0,
+                  cache_write_tokens: int = 0) -> Optional[float]:
+    """Estimated USD cost of one call; prompt_tokens includes the cached and cache write tokens"""
+    prices = model_prices(model)
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    uncached = max(0, prompt_tokens - cached_tokens - cache_write_tokens)
+    return (uncached * input_price + cached_tokens * cached_price
+            + cache_write_tokens * input_price * CACHE_WRITE_MULTIPLIER
+            + completion_tokens * output_price) / 1_000_000
+
+@dataclass
+class UsageRecord:
+    """One provider call: who made it, how long it took, what it used and what it cost"""
+    timestamp: float
+    provider: str
+    model: str
+    operation: str
+    wall_seconds: float
+    ttft_seconds: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    cache_write_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    api_key_hash: Optional[str] = None
+    error: Optional[str] = None
+    labels: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+class JsonlSink:
+    """Appends each record as one JSON line, for the report CLI and offline analysis"""
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+
+    def emit(self, record: UsageRecord) -> None:
+        line = json.dumps(record.to_dict()) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+class RingBufferSink:
+    """Keeps the most recent records in memory"""
+    def __init__(self, size: int = 1000):
+        self.records = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def emit(self, record: UsageRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def snapshot(self) -> List[UsageRecord]:
+        with self._lock:
+            return list(self.records)
+
+class PrometheusSink:
+    """Aggregates records into counters and histograms rendered in the Prometheus text format"""
+    BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, name: str, labels: Dict[str, str], amount: float) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def _observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        # Per bucket counts, then the count and sum of all observations
+        key = (name, tuple(sorted(labels.items())))
+        values = self._histograms.setdefault(key, [0.0] * (len(self.BUCKETS) + 2))
+        for index, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                values[index] += 1
+        values[-2] += 1
+        values[-1] += value
+
+    def emit(self, record: UsageRecord) -> None:
+        labels = {'provider': record.provider, 'model': record.model}
+        with self._lock:
+            self._add('llm_requests_total', {**labels, 'status': 'error' if record.error else 'ok'}, 1)
+            for kind in ('prompt', 'completion', 'cached', 'cache_write'):
+                count = getattr(record, f"{kind}_tokens")
+                if count:
+                    self._add('llm_tokens_total', {**labels, 'kind': kind}, count)
+            if record.cost_usd:
+                self._add('llm_cost_usd_total', labels, record.cost_usd)
+            self._observe('llm_request_duration_seconds', labels, record.wall_seconds)
+            if record.ttft_seconds is not None:
+                self._observe('llm_time_to_first_token_seconds', labels, record.ttft_seconds)
+
+    def render(self) -> str:
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}' if pairs else ''
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{label_text(labels)} {value:g}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), values in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.BUCKETS, values):
+                        lines.append(f"{name}_bucket{label_text(labels, [('le', f'{bound:g}')])} {count:g}")
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {values[-2]:g}")
+                    lines.append(f"{name}_count{label_text(labels)} {values[-2]:g}")
+                    lines.append(f"{name}_sum{label_text(labels)} {values[-1]:g}")
+        return '\n'.join(lines) + '\n'
+
+class Telemetry:
+    """Fans usage records out to the configured sinks; a failing sink never fails the call"""
+    def __init__(self, sinks: Optional[List[Any]] = None):
+        self.sinks = list(sinks or [])
+
+    def emit(self, record: UsageRecord) -> None:
+        for sink in self.sinks:
+            try:
+                sink.emit(record)
+            except Exception as e:
+                logger.warning(f"Telemetry sink {type(sink).__name__} failed: {e}")
+
+    def sink(self, sink_type: type) -> Optional[Any]:
+        """The first sink of a type, e.g. to render PrometheusSink metrics"""
+        return next((sink for sink in self.sinks if isinstance(sink, sink_type)), None)
+
+def create_telemetry(sinks: Optional[str] = None) -> Telemetry:
+    """
+    Create the telemetry sinks named in a comma-separated list.
+
+    Args:
+        sinks: Any of 'jsonl' (LLM_TELEMETRY_FILE), 'memory' (ring buffer of
+            LLM_TELEMETRY_BUFFER_SIZE records) and 'prometheus'; defaults to the
+            LLM_TELEMETRY_SINKS environment variable, or 'memory'
+
+    Returns:
+        A Telemetry instance
+    """
+    names = [name.strip().lower() for name in (sinks if sinks is not None else os.getenv('LLM_TELEMETRY_SINKS', 'memory')).split(',')]
+    created = []
+    for name in names:
+        if name == 'jsonl':
+            created.append(JsonlSink(backend_path(os.getenv('LLM_TELEMETRY_FILE', 'data/telemetry/llm_calls.jsonl'))))
+        elif name == 'memory':
+            created.append(RingBufferSink(int(os.getenv('LLM_TELEMETRY_BUFFER_SIZE', '1000'))))
+        elif name == 'prometheus':
+            created.append(PrometheusSink())
+        elif name:
+            logger.warning(f"Unknown telemetry sink {name}")
+    return Telemetry(created)
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+def get_telemetry() -> Telemetry:
+    """Return the process-wide telemetry, configured from the environment on first use"""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = create_telemetry()
+        return _telemetry
+
+_current_call: ContextVar[Optional['CallTracker']] = ContextVar('llm_current_call', default=None)
+_labels: ContextVar[Dict[str, str]] = ContextVar('llm_telemetry_labels', default={})
+
+@contextmanager
+def telemetry_labels(**labels: str) -> Iterator[None]:
+    """Attach labels such as user or task to every call made inside the block"""
+    token = _labels.set({**_labels.get(), **{name: str(value) for name, value in labels.items() if value is not None}})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+class CallTracker:
+    """Collects timing and usage for one provider call and emits its record when finished"""
+    def __init__(self, provider: str, model: str, operation: str, api_key: Optional[str] = None):
+        self.provider = provider
+        self.model = model
+        self.operation = operation
+        self.api_key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12] if api_key else None
+        self.labels = dict(_labels.get())
+        self.start = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.counts: Optional[Tuple[int, int, int, int]] = None
+        self.finished = False
+
+    def first_token(self) -> None:
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.start
+
+    def set_usage(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0,
+                  cache_write_tokens: int = 0) -> None:
+        self.counts = (prompt_tokens, completion_tokens, cached_tokens, cache_write_tokens)
+
+    def finish(self, error: Optional[BaseException] = None) -> Optional[UsageRecord]:
+        if self.finished:
+            return None
+        self.finished = True
+        record = UsageRecord(
+            timestamp=time.time(),
+            provider=self.provider,
+            model=self.model,
+            operation=self.operation,
+            wall_seconds=round(time.perf_counter() - self.start, 4),
+            ttft_seconds=round(self.ttft, 4) if self.ttft is not None else None,
+            api_key_hash=self.api_key_hash,
+            error=f"{type(error).__name__}: {error}" if error is not None else None,
+            labels=self.labels
+        )
+        if self.counts is not None:
+            record.prompt_tokens, record.completion_tokens, record.cached_tokens, record.cache_write_tokens = self.counts
+            record.cost_usd = estimate_cost(self.model, *self.counts)
+        get_telemetry().emit(record)
+        return record
+
+def current_call() -> Optional[CallTracker]:
+    """The call being tracked in this context, for providers to attach their usage to"""
+    return _current_call.get()
+
+@contextmanager
+def track_call(provider: str, model: str, operation: str, api_key: Optional[str] = None) -> Iterator[CallTracker]:
+    """Track a provider call made inside the block and emit its record when it ends"""
+    tracker = CallTracker(provider, model, operation, api_key)
+    token = _current_call.set(tracker)
+    try:
+        yield tracker
+    except BaseException as e:
+        tracker.finish(e)
+        raise
+    finally:
+        _current_call.reset(token)
+    tracker.finish()
+
+def iterate_tracked(stream: Iterator[str], tracker: CallTracker) -> Iterator[str]:
+    """
+    Yield a provider stream with tracker as the current call while each chunk is produced,
+    so usage reported at the end of the stream lands on the right record. The first
+    chunk sets the time to first token, and the record is emitted when the stream ends.
+    """
+    try:
+        while True:
+            token = _current_call.set(tracker)
+            try:
+                chunk = next(stream, None)
+            finally:
+                _current_call.reset(token)
+            if chunk is None:
+                break
+            tracker.first_token()
+            yield chunk
+    except BaseException as e:
+        # Includes GeneratorExit, so a stream the caller abandons is still recorded
+        tracker.finish(e)
+        raise
+    tracker.finish()
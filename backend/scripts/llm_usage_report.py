@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+from typing import Dict, Any, List, Iterable
+
+from paths import backend_path
+
+logger = logging.getLogger(__name__)
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """Read usage records from a telemetry JSONL file, skipping lines that do not parse"""
+    records = []
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping malformed line {number} of {path}")
+    return records
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of values, or 0.0 if there are none"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+def group_key(record: Dict[str, Any], fields: Iterable[str]) -> str:
+    """Key for a record from top-level fields or, failing that, its labels"""
+    parts = []
+    for field in fields:
+        value = record.get(field)
+        if value is None:
+            value = record.get('labels', {}).get(field)
+        parts.append(str(value) if value is not None else '-')
+    return '/'.join(parts)
+
+def summarize(records: List[Dict[str, Any]], fields: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate usage records into one row per group.
+
+    Args:
+        records: Usage records as written by the telemetry JSONL sink
+        fields: Record fields or label names to group by, e.g. ['provider', 'model']
+
+    Returns:
+        Dict mapping each group to its calls, errors, latency percentiles, token totals and cost
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        groups.setdefault(group_key(record, fields), []).append(record)
+
+    summary = {}
+    for key, group in sorted(groups.items()):
+        wall = [record['wall_seconds'] for record in group]
+        ttft = [record['ttft_seconds'] for record in group if record.get('ttft_seconds') is not None]
+        summary[key] = {
+            'calls': len(group),
+            'errors': sum(1 for record in group if record.get('error')),
+            'p50_seconds': round(percentile(wall, 0.5), 3),
+            'p95_seconds': round(percentile(wall, 0.95), 3),
+            'p50_ttft_seconds': round(percentile(ttft, 0.5), 3) if ttft else None,
+            'p95_ttft_seconds': round(percentile(ttft, 0.95), 3) if ttft else None,
+            'prompt_tokens': sum(record.get('prompt_tokens') or 0 for record in group),
+            'cached_tokens': sum(record.get('cached_tokens') or 0 for record in group),
+            'completion_tokens': sum(record.get('completion_tokens') or 0 for record in group),
+            'cost_usd': round(sum(record.get('cost_usd') or 0 for record in group), 6),
+            'unpriced_calls': sum(1 for record in group
+                                  if record.get('cost_usd') is None and record.get('prompt_tokens') is not None)
+        }
+    return summary
+
+def print_table(summary: Dict[str, Dict[str, Any]], title: str) -> None:
+    def optional(value):
+        return f"{value:.2f}" if value is not None else '-'
+
+    width = max([len(title)] + [len(key) for key in summary])
+    print(f"{title:<{width}} {'calls':>6} {'errors':>6} {'p50 s':>7} {'p95 s':>7} {'p50 ttft':>9} {'p95 ttft':>9} "
+          f"{'prompt':>10} {'cached':>10} {'output':>9} {'cost $':>10}")
+    for key, row in summary.items():
+        print(f"{key:<{width}} {row['calls']:>6} {row['errors']:>6} {row['p50_seconds']:>7.2f} {row['p95_seconds']:>7.2f} "
+              f"{optional(row['p50_ttft_seconds']):>9} {optional(row['p95_ttft_seconds']):>9} "
+              f"{row['prompt_tokens']:>10} {row['cached_tokens']:>10} {row['completion_tokens']:>9} "
+              f"{row['cost_usd']:>10.4f}")
+    total_cost = sum(row['cost_usd'] for row in summary.values())
+    unpriced = sum(row['unpriced_calls'] for row in summary.values())
+    print(f"Total cost ${total_cost:.4f}" + (f" ({unpriced} calls with models missing from the price table)" if unpriced else ''))
+
+
+if __name__ == '__main__':
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    parser = argparse.ArgumentParser(description='Summarise LLM call latency, token usage and cost from telemetry')
+    parser.add_argument('--file', type=str, default=backend_path(os.getenv('LLM_TELEMETRY_FILE', 'data/telemetry/llm_calls.jsonl')),
+                        help='Telemetry JSONL file written by the jsonl sink')
+    parser.add_argument('--by', type=str, default='provider,model',
+                        help='Comma-separated record fields or labels to group by, e.g. api_key_hash or task')
+    parser.add_argument('--since', type=float, help='Only include calls from the last N hours')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    args = parser.parse_args()
+
+    try:
+        records = read_records(args.file)
+    except OSError as e:
+        print(f"Could not read {args.file}: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.since is not None:
+        cutoff = time.time() - args.since * 3600
+        records = [record for record in records if record.get('timestamp', 0) >= cutoff]
+
+    fields = [field.strip() for field in args.by.split(',') if field.strip()]
+    summary = summarize(records, fields)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_table(summary, '/'.join(fields))
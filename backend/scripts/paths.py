@@ -0,0 +1,14 @@
+import os
+
+# The backend directory, where the Node server runs the scripts from and where data/ lives
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def backend_path(path: str) -> str:
+    """
+    Resolve a relative path against the backend directory rather than the working directory.
+
+    Data paths such as data/cache/pdfs (and the .env values that override them) then land
+    in backend/data whether a script is run from backend/, backend/scripts or elsewhere.
+    Absolute paths are returned unchanged.
+    """
+    return os.path.join(BACKEND_DIR, os.path.expanduser(path))
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from paths import backend_path
+
+logger = logging.getLogger(__name__)
+
+# Share of max_bytes an eviction leaves the cache at
+EVICT_TO = 0.9
+
+@lru_cache(maxsize=None)
+def engine_version(engine: str = 'pdflatex') -> str:
+    """First line of the engine's --version output, so an upgraded TeX never reuses old PDFs"""
+    try:
+        output = subprocess.run([engine, '--version'], check=True, capture_output=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        return 'unavailable'
+    return output.decode(errors='replace').splitlines()[0].strip() if output else 'unknown'
+
+def normalize_source(latex_content: str) -> str:
+    """
+    Normalize LaTeX source in ways that cannot change the PDF.
+
+    Line endings become \\n, and trailing spaces on each line and blank lines at the end are
+    dropped, since TeX ignores them when it reads a line.
+    """
+    lines = [line.rstrip(' \t') for line in latex_content.replace('\r\n', '\n').replace('\r', '\n').split('\n')]
+    return '\n'.join(lines).rstrip('\n') + '\n'
+
+def pdf_cache_key(latex_content: str, engine: str = 'pdflatex', flags: Tuple[str, ...] = ()) -> str:
+    """Hash the normalized source, the engine version and its flags into a cache key"""
+    payload = [normalize_source(latex_content), engine, engine_version(engine), list(flags)]
+    return hashlib.sha256(json.dumps(payload).encode('utf-8')).hexdigest()
+
+def place_file(source: str, destination: str, link: bool = False) -> None:
+    """
+    Put a file at destination in one atomic rename, so readers never see a partial PDF and
+    two writers of the same name never interleave.
+
+    Args:
+        source: File to place
+        destination: Final path
+        link: Hardlink source, falling back to a copy, instead of moving it
+    """
+    directory = os.path.dirname(destination) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.pdf.tmp')
+    os.close(fd)
+    try:
+        if link:
+            os.remove(temp_path)
+            try:
+                os.link(source, temp_path)
+            except OSError:
+                # Another filesystem, or one without hardlinks
+                shutil.copyfile(source, temp_path)
+        else:
+            shutil.move(source, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class PdfCache:
+    """
+    Content-addressed cache of compiled PDFs.
+
+    Entries live under <cache_dir>/<key[:2]>/<key>.pdf, with the page count and compile
+    time in a <key>.json file beside them. Cached PDFs are handed out as hardlinks (or
+    copies across filesystems), which is safe because every writer of an output PDF
+    replaces it with a rename rather than writing into it. A hit refreshes the entry's
+    modification time. Writes keep a running total of the PDFs' size and, once it passes
+    max_bytes, evict the least recently used entries.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._total_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str, extension: str = 'pdf') -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{extension}")
+
+    def get(self, key: str, destination: str) -> Optional[Dict[str, Any]]:
+        """
+        Place the cached PDF for a key at destination.
+
+        Returns:
+            The entry's metadata (pages, seconds), or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(self._path(key, 'json'), 'r') as f:
+                entry = json.load(f)
+            place_file(path, destination, link=True)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += entry.get('seconds') or 0.0
+        return entry
+
+    def put(self, key: str, pdf_path: str, pages: Optional[int] = None, seconds: Optional[float] = None) -> None:
+        """Store a copy of a freshly compiled PDF, leaving the original where it is"""
+        path = self._path(key)
+        try:
+            size = os.path.getsize(pdf_path)
+            replaced = self._file_size(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            place_file(pdf_path, path, link=True)
+            # Metadata last, so an entry is only visible once its PDF is in place
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'pages': pages, 'seconds': seconds, 'created_at': time.time()}, f)
+            os.replace(temp_path, self._path(key, 'json'))
+        except OSError as e:
+            logger.warning(f"PDF cache write failed: {e}")
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                # The first write scans the directory, which already holds the new PDF
+                self._total_bytes = self._scan()[1]
+            else:
+                self._total_bytes += size - replaced
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def _file_size(self, path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _scan(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """(mtime, size, path) of every cached PDF, and their total size in bytes"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return entries, total
+
+    def evict(self) -> None:
+        """Remove least recently used entries once the cache is past max_bytes, down to 90% of it"""
+        with self._lock:
+            entries, total = self._scan()
+            if total > self.max_bytes:
+                target = int(self.max_bytes * EVICT_TO)
+                for _, size, path in sorted(entries):
+                    # Metadata first, so a concurrent get never finds metadata without its PDF
+                    for entry_path in (path[:-len('.pdf')] + '.json', path):
+                        try:
+                            os.remove(entry_path)
+                        except FileNotFoundError:
+                            pass
+                    total -= size
+                    if total <= target:
+                        break
+            self._total_bytes = total
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'saved_seconds': round(self.saved_seconds, 3)}
+
+    def log_stats(self) -> None:
+        totals = self.totals()
+        logger.info(f"PDF cache: {totals['hits']} hits, {totals['misses']} misses, "
+                    f"~{totals['saved_seconds']:.1f}s of compiling saved")
+
+_pdf_cache: Optional[PdfCache] = None
+_pdf_cache_lock = threading.Lock()
+
+def pdf_cache_enabled() -> bool:
+    """Whether caching is switched on through the LATEX_PDF_CACHE environment variable (on by default)"""
+    return os.getenv('LATEX_PDF_CACHE', '1').lower() in ('1', 'true', 'yes', 'on')
+
+def get_pdf_cache() -> PdfCache:
+    """Return the process-wide PDF cache, configured from the environment"""
+    global _pdf_cache
+    with _pdf_cache_lock:
+        if _pdf_cache is None:
+            cache_dir = backend_path(os.getenv('LATEX_PDF_CACHE_DIR', 'data/cache/pdfs'))
+            max_mb = float(os.getenv('LATEX_PDF_CACHE_MAX_MB', '256'))
+            _pdf_cache = PdfCache(cache_dir, int(max_mb * 1024 * 1024))
+        return _pdf_cache
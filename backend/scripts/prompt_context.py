@@ -0,0 +1,135 @@
+import os
+import json
+import hashlib
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+from job_description import prune_description, description_token_budget
+from resume_sections import ParsedResume, parse_resume, format_bullets
+
+# One system prompt for every document we generate. Providers cache prompts by prefix, and
+# the system prompt comes first, so sharing it lets tailoring and cover letter requests
+# for the same resume reuse each other's cached resume prefix.
+SYSTEM_PROMPT = (
+    "You are an expert career consultant, resume writer and LaTeX specialist. You tailor "
+    "application documents to specific job positions, keeping every claim truthful and the "
+    "LaTeX valid."
+)
+
+@lru_cache(maxsize=16)
+def parse_resume_cached(resume_content: str) -> ParsedResume:
+    """Parse a resume once however many jobs it is tailored for"""
+    return parse_resume(resume_content)
+
+@lru_cache(maxsize=256)
+def prune_cached(text: str, resume_content: str, token_budget: int) -> str:
+    """Prune a job text once per resume, whichever document it is used for"""
+    return prune_description(text, resume_content, token_budget)
+
+class PromptContext:
+    """
+    A resume and a job, prepared once and shared by every prompt built for them.
+
+    Prompts are laid out as resume block, then job details, then task instructions. The
+    resume block is the same for every job and every task, so it is passed to the LLM
+    service as cached_prefix and served from the provider's prompt cache after the first
+    request.
+    """
+    def __init__(self, resume_content: str, job_data: Dict[str, Any]):
+        self.resume_content = resume_content
+        self.job_data = job_data
+
+    @property
+    def parsed_resume(self) -> ParsedResume:
+        return parse_resume_cached(self.resume_content)
+
+    def pruned(self, field: str) -> str:
+        """A job text field pruned against the resume"""
+        return prune_cached(self.job_data.get(field) or '', self.resume_content, description_token_budget())
+
+    def resume_prefix(self) -> str:
+        """The full resume, for prompts that need the whole document"""
+        return f"Applicant's resume (LaTeX):\n{self.resume_content}\n\n"
+
+    def bullets_prefix(self) -> str:
+        """The resume's numbered bullet points, for patch prompts"""
+        return f"Resume bullet points (LaTeX), numbered and grouped by section:\n{format_bullets(self.parsed_resume)}\n\n"
+
+    def job_details(self) -> str:
+        job_data = self.job_data
+        location = job_data.get('location') or {}
+        location_text = ', '.join(part for part in (location.get('city'), location.get('state'), location.get('country')) if part)
+        lines = [
+            "Job Details:",
+            f"- Position: {job_data.get('title', '')}",
+            f"- Company: {job_data.get('company', '')}",
+        ]
+        if location_text:
+            lines.append(f"- Location: {location_text}")
+        lines += [
+            f"- Required Experience: {job_data.get('experience_range', '')}",
+            f"- Job Level: {job_data.get('job_level', '')}",
+            f"- Required Skills: {job_data.get('skills', '')}",
+            f"- Job Description: {self.pruned('description')}",
+        ]
+        # The backend often fills requirements with the description itself; send it once
+        requirements = job_data.get('requirements')
+        if requirements and requirements != job_data.get('description'):
+            lines.append(f"- Requirements: {self.pruned('requirements')}")
+        return '\n'.join(lines) + '\n\n'
+
+_resumes: "OrderedDict[str, Tuple[Tuple[int, int], str]]" = OrderedDict()
+_contexts: "OrderedDict[Tuple[str, str], PromptContext]" = OrderedDict()
+_contexts_lock = threading.Lock()
+MAX_CONTEXTS = 64
+# Worker requests each pass a new temporary resume path, so keep only the latest reads
+MAX_RESUMES = 64
+
+def read_resume(resume_path: str) -> str:
+    """
+    Read a resume file, reusing the last read while the file is unchanged.
+
+    The least recently read path is dropped once MAX_RESUMES are held.
+    """
+    path = os.path.abspath(resume_path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _contexts_lock:
+        cached = _resumes.get(path)
+        if cached is not None and cached[0] == version:
+            _resumes.move_to_end(path)
+            return cached[1]
+    with open(path, 'r') as f:
+        content = f.read()
+    with _contexts_lock:
+        _resumes[path] = (version, content)
+        _resumes.move_to_end(path)
+        while len(_resumes) > MAX_RESUMES:
+            _resumes.popitem(last=False)
+    return content
+
+def get_context(resume_content: str, job_data: Dict[str, Any]) -> PromptContext:
+    """
+    Return the shared context for a resume and job, creating it on first use.
+
+    Contexts are keyed by content, so a tailored resume and a cover letter for the same
+    job, in the same process, share one context; parsed resumes and pruned descriptions
+    are also cached by content underneath. The least recently used context is dropped
+    once MAX_CONTEXTS are held.
+    """
+    key = (
+        hashlib.sha256(resume_content.encode('utf-8')).hexdigest(),
+        hashlib.sha256(json.dumps(job_data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    )
+    with _contexts_lock:
+        context = _contexts.get(key)
+        if context is not None:
+            _contexts.move_to_end(key)
+            return context
+        context = PromptContext(resume_content, job_data)
+        _contexts[key] = context
+        while len(_contexts) > MAX_CONTEXTS:
+            _contexts.popitem(last=False)
+        return context
@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from paths import backend_path
+
+logger = logging.getLogger(__name__)
+
+# Output tokens assumed for a request without max_tokens
+DEFAULT_COMPLETION_TOKENS = 1024
+
+# Seconds of a per-minute limit that may be spent in one burst. Providers enforce their
+# limits over windows shorter than a minute, so a full minute's burst would still get 429s.
+DEFAULT_BURST_SECONDS = 10.0
+
+class RateLimits:
+    """Per-minute limits for one provider; None means unlimited"""
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        burst_seconds: float = DEFAULT_BURST_SECONDS
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+
+    def capacity(self, limit: float) -> float:
+        """Bucket size for a per-minute limit"""
+        return limit * self.burst_seconds / 60
+
+    @property
+    def unlimited(self) -> bool:
+        return not self.requests_per_minute and not self.tokens_per_minute
+
+    @classmethod
+    def from_env(cls, provider: str) -> 'RateLimits':
+        """Read <PROVIDER>_RPM and <PROVIDER>_TPM, e.g. GROQ_RPM=30 and GROQ_TPM=6000"""
+        requests = os.getenv(f"{provider.upper()}_RPM")
+        tokens = os.getenv(f"{provider.upper()}_TPM")
+        return cls(
+            float(requests) if requests else None,
+            float(tokens) if tokens else None,
+            float(os.getenv('LLM_RATE_LIMIT_BURST_SECONDS', str(DEFAULT_BURST_SECONDS)))
+        )
+
+def estimate_request_tokens(text_chars: int, max_tokens: Optional[int]) -> int:
+    """Tokens a request counts against a TPM limit: the prompt at ~4 characters per token plus max_tokens"""
+    return (text_chars + 3) // 4 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+def reserve(
+    state: Optional[Dict[str, float]],
+    limits: RateLimits,
+    now: float,
+    requests: float,
+    tokens: float
+) -> Tuple[Dict[str, float], float]:
+    """
+    Take a request and its tokens from a pair of token buckets, queueing behind earlier reservations.
+
+    Each bucket holds burst_seconds of its limit and refills continuously. The cost is
+    always deducted, so a bucket can go negative; the caller then waits until the refill
+    has covered the debt. This keeps callers in reservation order without polling.
+
+    Args:
+        state: Bucket levels and last update time, or None for full buckets
+        limits: The limits the buckets refill at
+        now: Current time in seconds
+        requests: Requests to take, normally 1
+        tokens: Estimated tokens to take
+
+    Returns:
+        Tuple of (new state, seconds to wait before sending)
+    """
+    state = dict(state or {'updated': now})
+    elapsed = max(0.0, now - state['updated'])
+    wait = 0.0
+    for field, limit, cost in (('requests', limits.requests_per_minute, requests), ('tokens', limits.tokens_per_minute, tokens)):
+        if not limit:
+            continue
+        rate = limit / 60
+        capacity = limits.capacity(limit)
+        level = min(capacity, state.get(field, capacity) + elapsed * rate) - cost
+        state[field] = level
+        if level < 0:
+            wait = max(wait, -level / rate)
+    state['updated'] = now
+    return state, wait
+
+class MemoryBucketBackend:
+    """Buckets shared by the threads and event loops of one process"""
+    def __init__(self):
+        self._states: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, limits: RateLimits, requests: float, tokens: float) -> float:
+        with self._lock:
+            self._states[key], wait = reserve(self._states.get(key), limits, time.monotonic(), requests, tokens)
+        return wait
+
+class FileBucketBackend:
+    """
+    Buckets shared by every process on the machine, one small JSON file per key under an
+    exclusive file lock, so separately spawned scripts respect one limit together.
+    """
+    def __init__(self, directory: str):
+        import fcntl
+        self._fcntl = fcntl
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def reserve(self, key: str, limits: RateLimits, requests: float, tokens: float) -> float:
+        path = os.path.join(self.directory, f"{key}.json")
+        with open(path, 'a+') as f:
+            self._fcntl.flock(f, self._fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                state = json.loads(content) if content else None
+                # Wall-clock time, since monotonic clocks are not comparable across processes
+                state, wait = reserve(state, limits, time.time(), requests, tokens)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                self._fcntl.flock(f, self._fcntl.LOCK_UN)
+        return wait
+
+# Same arithmetic as reserve(), run atomically on the server with the server's clock
+RESERVE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local limits = {tonumber(ARGV[1]), tonumber(ARGV[2])}
+local costs = {tonumber(ARGV[3]), tonumber(ARGV[4])}
+local burst_seconds = tonumber(ARGV[5])
+local fields = {'requests', 'tokens'}
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated')
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local wait = 0
+for i = 1, 2 do
+    local limit = limits[i]
+    if limit > 0 then
+        local rate = limit / 60
+        local capacity = limit * burst_seconds / 60
+        local level = math.min(capacity, (tonumber(state[i]) or capacity) + elapsed * rate) - costs[i]
+        redis.call('HSET', KEYS[1], fields[i], tostring(level))
+        if level < 0 then
+            wait = math.max(wait, -level / rate)
+        end
+    end
+end
+redis.call('HSET', KEYS[1], 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+class RedisBucketBackend:
+    """Buckets shared by every process using the same Redis server"""
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(RESERVE_SCRIPT)
+
+    def reserve(self, key: str, limits: RateLimits, requests: float, tokens: float) -> float:
+        wait = self.script(
+            keys=[f"llm_rate_limit:{key}"],
+            args=[limits.requests_per_minute or 0, limits.tokens_per_minute or 0, requests, tokens, limits.burst_seconds]
+        )
+        return float(wait)
+
+class RateLimitStats:
+    """Requests admitted per provider and the time they spent queued for the rate limit"""
+    FIELDS = ('requests', 'queued', 'wait_seconds', 'max_wait_seconds')
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, wait: float) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(provider, dict.fromkeys(self.FIELDS, 0))
+            totals['requests'] += 1
+            if wait > 0:
+                totals['queued'] += 1
+                totals['wait_seconds'] += wait
+                totals['max_wait_seconds'] = max(totals['max_wait_seconds'], wait)
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {provider: dict(totals) for provider, totals in self._totals.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+    def log_stats(self) -> None:
+        for provider, totals in self.totals().items():
+            logger.info(
+                f"{provider} rate limit: {totals['requests']} requests, {totals['queued']} queued for "
+                f"{totals['wait_seconds']:.2f}s in total (longest {totals['max_wait_seconds']:.2f}s)"
+            )
+
+rate_limit_stats = RateLimitStats()
+
+class RateLimiter:
+    """
+    Client-side token buckets per (provider, API key), counting requests and tokens.
+
+    A caller over the limit is not failed: it reserves its place and sleeps until the
+    buckets have refilled enough, and the time spent waiting is recorded in
+    rate_limit_stats. Providers without limits are admitted without touching the backend.
+    If the backend fails (e.g. Redis is down), requests fall back to this process's own
+    buckets rather than erroring.
+    """
+    def __init__(self, backend=None, limits: Optional[Dict[str, RateLimits]] = None, stats: Optional[RateLimitStats] = None):
+        """
+        Initialize the RateLimiter.
+
+        Args:
+            backend: Bucket backend, in-process buckets by default
+            limits: Limits by provider name; providers not listed read <PROVIDER>_RPM and
+                <PROVIDER>_TPM from the environment
+            stats: Where to record queue waits, the module's rate_limit_stats by default
+        """
+        self.fallback = MemoryBucketBackend()
+        self.backend = backend or self.fallback
+        self.limits = dict(limits or {})
+        self.stats = stats or rate_limit_stats
+
+    def limits_for(self, provider: str) -> RateLimits:
+        provider = provider.lower()
+        if provider not in self.limits:
+            self.limits[provider] = RateLimits.from_env(provider)
+        return self.limits[provider]
+
+    def reserve(self, provider: str, api_key: str, tokens: int) -> float:
+        """Reserve one request and its tokens, returning the seconds to wait before sending it"""
+        limits = self.limits_for(provider)
+        if limits.unlimited:
+            self.stats.record(provider, 0.0)
+            return 0.0
+        key = f"{provider.lower()}_{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}"
+        try:
+            wait = self.backend.reserve(key, limits, 1, tokens)
+        except Exception as e:
+            logger.warning(f"Rate limit backend failed, limiting in this process only: {e}")
+            wait = self.fallback.reserve(key, limits, 1, tokens)
+        self.stats.record(provider, wait)
+        if wait > 0:
+            logger.info(f"{provider} rate limit reached, request queued for {wait:.2f}s")
+        return wait
+
+    def acquire(self, provider: str, api_key: str, tokens: int) -> float:
+        """Block until a request of this many tokens may be sent; returns the time waited"""
+        wait = self.reserve(provider, api_key, tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, provider: str, api_key: str, tokens: int) -> float:
+        """Async version of acquire, waiting without blocking the event loop"""
+        wait = self.reserve(provider, api_key, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+def create_rate_limiter(backend: str = 'memory', directory: str = backend_path('data/cache/rate_limits'),
+                        redis_url: Optional[str] = None) -> RateLimiter:
+    """
+    Create a rate limiter.
+
+    Args:
+        backend: 'memory' for this process only, 'file' for every process on this machine,
+            or 'redis' for every process using the server; 'file' and 'redis' fall back to
+            'memory' if unavailable
+        directory: Directory for the 'file' backend's bucket files
+        redis_url: Redis URL, defaults to the REDIS_URL environment variable
+
+    Returns:
+        A RateLimiter instance
+    """
+    if backend == 'redis':
+        try:
+            return RateLimiter(RedisBucketBackend(redis_url or os.getenv('REDIS_URL', 'redis://localhost:6379/0')))
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, limiting in this process only: {e}")
+    elif backend == 'file':
+        try:
+            return RateLimiter(FileBucketBackend(directory))
+        except Exception as e:
+            logger.warning(f"File rate limiter unavailable, limiting in this process only: {e}")
+    return RateLimiter()
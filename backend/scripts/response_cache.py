@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from paths import backend_path
+
+logger = logging.getLogger(__name__)
+
+# Share of max_bytes an eviction leaves the cache at
+EVICT_TO = 0.9
+
+def response_cache_key(
+    provider: str,
+    model: str,
+    system_prompt: Optional[str],
+    prompt: str,
+    temperature: float,
+    max_tokens: Optional[int],
+    **kwargs
+) -> str:
+    """Hash everything that determines a completion into a cache key"""
+    payload = [provider.lower(), model, system_prompt, prompt, temperature, max_tokens, sorted(kwargs.items())]
+    return hashlib.sha256(json.dumps(payload, default=str).encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    Content-addressed cache of LLM responses, one small JSON file per entry.
+
+    Entries live under <cache_dir>/<key[:2]>/<key>.json. A hit refreshes the file's
+    modification time, and writes evict the least recently used files once the
+    directory grows past max_bytes. The directory's size is walked once, on the first
+    write, and then kept as a running total; only eviction walks it again, which also
+    picks up entries written by other processes. Eviction goes down to 90% of max_bytes,
+    so a full cache is not walked again on the very next write.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._total_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry.get('text')
+
+    def set(self, key: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {'text': text, 'created_at': time.time(), **(metadata or {})}
+        # Write then rename so a concurrent reader never sees a partial file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        size = os.path.getsize(temp_path)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan()[1]
+            self._total_bytes += size - self._file_size(path)
+            os.replace(temp_path, path)
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def invalidate(self, key: str) -> None:
+        path = self._path(key)
+        with self._lock:
+            size = self._file_size(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                return
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _file_size(self, path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _scan(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """(mtime, size, path) of every entry, and their total size in bytes"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return entries, total
+
+    def evict(self) -> None:
+        """Remove least recently used entries once the cache is past max_bytes, down to 90% of it"""
+        with self._lock:
+            entries, total = self._scan()
+            if total > self.max_bytes:
+                target = int(self.max_bytes * EVICT_TO)
+                for _, size, path in sorted(entries):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    if total <= target:
+                        break
+            self._total_bytes = total
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def response_cache_enabled() -> bool:
+    """Whether caching is switched on through the LLM_RESPONSE_CACHE environment variable"""
+    return os.getenv('LLM_RESPONSE_CACHE', '').lower() in ('1', 'true', 'yes', 'on')
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, configured from the environment"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            cache_dir = backend_path(os.getenv('LLM_RESPONSE_CACHE_DIR', 'data/cache/llm_responses'))
+            max_mb = float(os.getenv('LLM_RESPONSE_CACHE_MAX_MB', '512'))
+            _response_cache = ResponseCache(cache_dir, int(max_mb * 1024 * 1024))
+        return _response_cache
@@ -0,0 +1,328 @@
+import re
+import json
+import bisect
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Commands whose single argument is a bullet point the model may rewrite
+ITEM_COMMANDS = ('resumeItem', 'resumeSubItem')
+SECTION_RE = re.compile(r'\\section\*?\s*\{')
+ITEM_COMMAND_RE = re.compile(r'\\(' + '|'.join(ITEM_COMMANDS) + r')\s*\{')
+BARE_ITEM_RE = re.compile(r'\\item\b(\s*\[[^\]]*\])?')
+# A bare \item runs until the next \item or environment boundary
+ITEM_END_RE = re.compile(r'\\item\b|\\(begin|end)\s*\{|\\resumeItemListEnd\b|\\resumeSubHeadingListEnd\b')
+COMMENT_RE = re.compile(r'(?<!\\)%.*')
+LIST_START_RE = re.compile(r'\\begin\s*\{(itemize|enumerate|description)\}|\\resumeItemListStart\b|\\resumeSubHeadingListStart\b')
+LIST_END_RE = re.compile(r'\\end\s*\{(itemize|enumerate|description)\}|\\resumeItemListEnd\b|\\resumeSubHeadingListEnd\b')
+# Replacement text must not change the document structure around it
+FORBIDDEN_IN_EDIT_RE = re.compile(r'\\(section|subsection|begin|end|item|documentclass)\b')
+# A backslash in a JSON string, with what it escapes: an escaped backslash, a \u escape, or a
+# one-letter escape not followed by another letter; anything else (\textbf, \%) is LaTeX
+JSON_ESCAPE_RE = re.compile(r'\\(\\|u[0-9a-fA-F]{4}|["/]|[bfnrt](?![A-Za-z])|)')
+CONTROL_CHAR_RE = re.compile(r'[\x00-\x1f]')
+
+class PatchError(ValueError):
+    """The model's reply is not a usable patch, so the whole document should be tailored instead"""
+
+@dataclass
+class ResumeSpan:
+    """One editable piece of text in a resume, with its position in the source"""
+    id: str
+    section: str
+    start: int
+    end: int
+    # Range removed when the model drops the entry, including its command and line break
+    remove_start: int
+    remove_end: int
+    text: str
+    # Spans with the same list number share one itemize-style list
+    list_number: int = 0
+
+@dataclass
+class ParsedResume:
+    source: str
+    spans: List[ResumeSpan] = field(default_factory=list)
+
+    @property
+    def editable_chars(self) -> int:
+        return sum(len(span.text) for span in self.spans)
+
+def mask_comments(source: str) -> str:
+    """Blank out LaTeX comments, keeping every offset in place"""
+    return COMMENT_RE.sub(lambda match: ' ' * len(match.group(0)), source)
+
+def find_closing_brace(source: str, open_index: int) -> int:
+    """
+    Return the index of the brace closing the one at open_index.
+
+    Raises:
+        ValueError: If the group is never closed
+    """
+    depth = 0
+    index = open_index
+    while index < len(source):
+        char = source[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+        index += 1
+    raise ValueError(f"Unbalanced brace at offset {open_index}")
+
+def braces_balanced(text: str) -> bool:
+    depth = 0
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth < 0:
+                return False
+        index += 1
+    return depth == 0
+
+def line_bounds(source: str, start: int, end: int) -> Tuple[int, int]:
+    """Widen [start, end) to whole lines when nothing else shares them"""
+    line_start = source.rfind('\n', 0, start) + 1
+    line_end = source.find('\n', end)
+    line_end = len(source) if line_end == -1 else line_end + 1
+    if source[line_start:start].strip() or source[end:line_end].strip():
+        return start, end
+    return line_start, line_end
+
+def parse_resume(source: str) -> ParsedResume:
+    """
+    Find the editable bullet points of a LaTeX resume.
+
+    Only the document body is scanned. Each \\resumeItem-style argument and each bare
+    \\item's text becomes a span, labelled with the \\section it falls under; headings,
+    dates and everything in the preamble stay out of reach of the model.
+
+    Args:
+        source: LaTeX source of the resume
+
+    Returns:
+        The parsed resume; it has no spans if the layout is not recognised
+    """
+    parsed = ParsedResume(source=source)
+    body_start = source.find('\\begin{document}')
+    if body_start == -1:
+        return parsed
+    masked = mask_comments(source)
+
+    sections = []
+    for match in SECTION_RE.finditer(masked, body_start):
+        try:
+            close = find_closing_brace(masked, match.end() - 1)
+        except ValueError:
+            continue
+        sections.append((match.start(), source[match.end():close].strip()))
+
+    # Lists are numbered in order of their start; a span belongs to the innermost list open
+    # where it starts, so the items after a nested list still count with their own list
+    boundaries = sorted(
+        [(match.start(), True) for match in LIST_START_RE.finditer(masked, body_start)]
+        + [(match.start(), False) for match in LIST_END_RE.finditer(masked, body_start)]
+    )
+    list_offsets = []
+    list_numbers = []
+    open_lists = [0]
+    started = 0
+    for offset, is_start in boundaries:
+        if is_start:
+            started += 1
+            open_lists.append(started)
+        elif len(open_lists) > 1:
+            open_lists.pop()
+        list_offsets.append(offset)
+        list_numbers.append(open_lists[-1])
+
+    def list_at(offset: int) -> int:
+        index = bisect.bisect(list_offsets, offset)
+        return list_numbers[index - 1] if index else 0
+
+    def section_at(offset: int) -> str:
+        title = ''
+        for start, name in sections:
+            if start > offset:
+                break
+            title = name
+        return title
+
+    candidates = []
+    for match in ITEM_COMMAND_RE.finditer(masked, body_start):
+        try:
+            close = find_closing_brace(masked, match.end() - 1)
+        except ValueError:
+            continue
+        candidates.append((match.start(), match.end(), close, close + 1))
+    for match in BARE_ITEM_RE.finditer(masked, body_start):
+        # \item inside an \resumeItem definition or argument is already covered
+        if any(start <= match.start() < remove_end for start, _, _, remove_end in candidates):
+            continue
+        end_match = ITEM_END_RE.search(masked, match.end())
+        end = end_match.start() if end_match else len(masked)
+        text = source[match.end():end]
+        # Trim surrounding whitespace so the span covers only the words
+        start = match.end() + len(text) - len(text.lstrip())
+        end = start + len(text.strip())
+        if start >= end or not braces_balanced(source[start:end]):
+            continue
+        candidates.append((match.start(), start, end, end))
+
+    for remove_start, start, end, remove_end in sorted(candidates):
+        text = source[start:end]
+        if not text.strip():
+            continue
+        remove_start, remove_end = line_bounds(source, remove_start, remove_end)
+        parsed.spans.append(ResumeSpan(
+            id=str(len(parsed.spans) + 1),
+            section=section_at(start),
+            start=start,
+            end=end,
+            remove_start=remove_start,
+            remove_end=remove_end,
+            text=text,
+            list_number=list_at(start)
+        ))
+    return parsed
+
+def format_bullets(parsed: ParsedResume) -> str:
+    """List the editable bullet points by number, grouped under their section titles"""
+    bullets = []
+    section = None
+    for span in parsed.spans:
+        if span.section != section:
+            section = span.section
+            bullets.append(f"## {section or 'Header'}")
+        bullets.append(f"[{span.id}] {span.text}")
+    return '\n'.join(bullets)
+
+def create_patch_instructions(job_data: Dict[str, Any]) -> str:
+    """
+    Create the task part of a patch prompt, which follows the bullet points and job details.
+
+    Args:
+        job_data: Dictionary containing job details
+
+    Returns:
+        Instructions asking for a compact JSON patch of the bullet points
+    """
+    return f"""Task: tailor the resume bullet points above for the position of {job_data.get('title', '')} at {job_data.get('company', '')}.
+
+Instructions:
+1. Rewrite the bullet points that can better highlight skills and achievements relevant to this job.
+2. Keep every claim realistic and based on the original bullet point; use action verbs and quantifiable results.
+3. Keep the LaTeX inline formatting valid: balanced braces, escaped special characters (\\%, \\&, \\$, \\#, \\_).
+   Inside the JSON strings write every backslash twice, as JSON requires: "Cut costs by 20\\\\%", "\\\\textbf{{Go}}".
+4. You may remove bullet points that are completely irrelevant, so the resume fits on one page.
+5. Leave unchanged bullet points out of the reply.
+
+Reply with only a JSON object of this form, with no other text:
+{{"edits": {{"<number>": "<new bullet text>"}}, "remove": ["<number>"]}}"""
+
+def patch_max_tokens(parsed: ParsedResume) -> int:
+    """Output token budget for a patch that rewrites every bullet point, at most 4000"""
+    # About 3 characters per token for LaTeX text, plus the JSON keys and quotes
+    return min(4000, max(512, parsed.editable_chars // 3 + 8 * len(parsed.spans) + 64))
+
+def escape_latex_backslashes(text: str) -> str:
+    """
+    Double the backslashes in JSON text that start LaTeX rather than a JSON escape.
+
+    Models often write \\% or \\textbf in JSON strings as they would in LaTeX. The first is
+    invalid JSON and the second decodes to a tab followed by "extbf", so each lone backslash
+    that is not a JSON escape, or that starts a command such as \\textbf or \\newline, is
+    doubled. Backslashes the model already doubled are left as they are.
+    """
+    return JSON_ESCAPE_RE.sub(lambda match: match.group(0) if match.group(1) else '\\\\', text)
+
+def parse_patch(text: str) -> Dict[str, Any]:
+    """
+    Parse the model's JSON patch, tolerating code fences or text around it.
+
+    Raises:
+        PatchError: If the reply does not contain a JSON patch, or its bullet texts hold
+            control characters, which come from LaTeX commands decoded as JSON escapes
+    """
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end < start:
+        raise PatchError("Model reply does not contain a JSON patch")
+    try:
+        patch = json.loads(escape_latex_backslashes(text[start:end + 1]))
+    except ValueError as e:
+        raise PatchError(f"Model reply is not valid JSON: {e}") from e
+    if not isinstance(patch, dict):
+        raise PatchError("Model reply is not a JSON object")
+    edits = patch.get('edits') or {}
+    if not isinstance(edits, dict) or not isinstance(patch.get('remove') or [], list):
+        raise PatchError("Patch edits must be an object and remove a list")
+    for span_id, edit in edits.items():
+        if not isinstance(edit, str) or CONTROL_CHAR_RE.search(edit):
+            raise PatchError(f"Edit of bullet point {span_id} is not plain LaTeX text")
+    return patch
+
+def apply_patch(parsed: ParsedResume, patch: Dict[str, Any]) -> str:
+    """
+    Splice a patch into the original resume source.
+
+    Edits that reference unknown bullet points, unbalance braces or add structural
+    commands are skipped with a warning, so a bad edit never breaks the document.
+
+    Args:
+        parsed: The parsed base resume
+        patch: Patch as returned by parse_patch
+
+    Returns:
+        The tailored LaTeX source
+    """
+    spans = {span.id: span for span in parsed.spans}
+    remaining = {}
+    for span in parsed.spans:
+        remaining[span.list_number] = remaining.get(span.list_number, 0) + 1
+    replacements = []
+    for span_id in dict.fromkeys(str(span_id) for span_id in patch.get('remove') or []):
+        span = spans.get(span_id)
+        if span is None:
+            logger.warning(f"Patch removes unknown bullet point {span_id}")
+            continue
+        # An empty list is a LaTeX error, so keep the last item of each list
+        if remaining[span.list_number] == 1:
+            logger.warning(f"Keeping bullet point {span_id}, the last one in its list")
+            continue
+        remaining[span.list_number] -= 1
+        replacements.append((span.remove_start, span.remove_end, ''))
+    removed = {start for start, _, _ in replacements}
+
+    for span_id, text in (patch.get('edits') or {}).items():
+        span = spans.get(str(span_id))
+        if span is None:
+            logger.warning(f"Patch edits unknown bullet point {span_id}")
+            continue
+        if span.remove_start in removed:
+            continue
+        text = str(text).strip()
+        if not text or not braces_balanced(text) or FORBIDDEN_IN_EDIT_RE.search(text):
+            logger.warning(f"Skipping invalid edit of bullet point {span_id}")
+            continue
+        replacements.append((span.start, span.end, text))
+
+    source = parsed.source
+    # Splice from the end so earlier offsets stay valid
+    for start, end, text in sorted(replacements, reverse=True):
+        source = source[:start] + text + source[end:]
+    return source
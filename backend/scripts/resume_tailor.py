@@ -1,16 +1,27 @@
 import os
 import sys
-from typing import Dict, Any, Optional
-from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Iterable, List, Tuple
 import json
+import time
+import asyncio
+import logging
 from datetime import datetime
 import argparse
+from functools import partial
 
 # Add the scripts directory to the Python path
 script_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(script_dir)
 
-from llm_service import generate_text
+from llm_resilience import resilience_stats
+from rate_limiter import rate_limit_stats
+from llm_telemetry import telemetry_labels
+from llm_service import generate_text, generate_text_async, generate_text_streaming, print_delta_event, usage_stats
+from prompt_context import SYSTEM_PROMPT, get_context, read_resume
+from resume_sections import PatchError, create_patch_instructions, patch_max_tokens, parse_patch, apply_patch
+
+logger = logging.getLogger(__name__)
+
 
 class resume_tailor:
     def __init__(self):
@@ -29,40 +40,19 @@ class resume_tailor:
         Returns:
             Content of the resume file as string
         """
-        with open(resume_path, 'r') as f:
-            return f.read()
+        return read_resume(resume_path)
 
-    def create_tailoring_prompt(self, job_data: Dict[str, Any], resume_content: str) -> str:
+    def create_tailoring_instructions(self, job_data: Dict[str, Any]) -> str:
         """
-        Create a comprehensive prompt for the LLM to tailor the resume.
+        Create the task part of the tailoring prompt, which follows the resume and job details.
         
         Args:
             job_data: Dictionary containing job details
-            resume_content: Content of the base resume
             
         Returns:
-            A detailed prompt for the LLM
-        """
-        # Extract relevant job information
-        job_title = job_data.get('title', '')
-        company = job_data.get('company', '')
-        job_description = job_data.get('description', '')
-        required_skills = job_data.get('skills', '')
-        experience_range = job_data.get('experience_range', '')
-        job_level = job_data.get('job_level', '')
-        
-        prompt = f"""You are an expert resume writer and career consultant. Your task is to tailor the following resume for the position of {job_title} at {company}.
-
-Job Details:
-- Position: {job_title}
-- Company: {company}
-- Required Experience: {experience_range}
-- Job Level: {job_level}
-- Required Skills: {required_skills}
-- Job Description: {job_description}
-
-Base Resume:
-{resume_content}
+            Instructions for tailoring the whole resume
+        """
+        return f"""Task: tailor the resume above for the position of {job_data.get('title', '')} at {job_data.get('company', '')}.
 
 Instructions:
 1. Analyze the job requirements and the base resume carefully.
@@ -79,7 +69,63 @@ Instructions:
 
 Please provide the tailored resume in LaTeX format, maintaining all the original LaTeX commands and structure while updating the content to better match the job requirements."""
 
-        return prompt
+    def create_tailoring_prompt(self, job_data: Dict[str, Any], resume_content: str) -> str:
+        """
+        Create a comprehensive prompt for the LLM to tailor the resume.
+        
+        Args:
+            job_data: Dictionary containing job details
+            resume_content: Content of the base resume
+            
+        Returns:
+            A detailed prompt for the LLM: the resume, the job details, then the instructions
+        """
+        context = get_context(resume_content, job_data)
+        return context.resume_prefix() + context.job_details() + self.create_tailoring_instructions(job_data)
+
+    def create_generation_request(
+        self,
+        job_data: Dict[str, Any],
+        resume_content: str,
+        incremental: bool = True
+    ) -> Tuple[Dict[str, Any], Callable[[str], str]]:
+        """
+        Build the LLM request for a job and the function that turns the reply into the resume.
+
+        When incremental is set and the resume has recognisable bullet points, only those are
+        sent and the model replies with a small JSON patch that is spliced into the original
+        source, so the preamble, headings and untouched bullets never go through the model.
+        Otherwise the whole resume is sent and returned. Either way the resume part leads the
+        prompt as cached_prefix, so providers can serve it from their prompt cache. A reply
+        that is not a usable patch makes the function raise PatchError; callers then tailor
+        the whole document with the request built for incremental=False.
+
+        Args:
+            job_data: Dictionary containing job details
+            resume_content: Content of the base resume
+            incremental: Tailor only the bullet points when possible
+
+        Returns:
+            Tuple of (generate_text keyword arguments, function from reply to tailored LaTeX)
+        """
+        context = get_context(resume_content, job_data)
+        parsed = context.parsed_resume if incremental else None
+        if parsed is None or not parsed.spans:
+            request = {
+                'cached_prefix': context.resume_prefix(),
+                'prompt': context.job_details() + self.create_tailoring_instructions(job_data),
+                'system_prompt': SYSTEM_PROMPT,
+                'max_tokens': 4000
+            }
+            return request, lambda text: text
+
+        request = {
+            'cached_prefix': context.bullets_prefix(),
+            'prompt': context.job_details() + create_patch_instructions(job_data),
+            'system_prompt': SYSTEM_PROMPT,
+            'max_tokens': patch_max_tokens(parsed)
+        }
+        return request, lambda text: apply_patch(parsed, parse_patch(text))
 
     def tailor_resume(
         self,
@@ -88,6 +134,8 @@ Please provide the tailored resume in LaTeX format, maintaining all the original
         provider: str = "openai",
         model: str = "gpt-4-turbo-preview",
         api_key: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+        incremental: bool = True,
         **kwargs
     ) -> str:
         """
@@ -99,6 +147,10 @@ Please provide the tailored resume in LaTeX format, maintaining all the original
             provider: LLM provider to use ('openai', 'anthropic', 'groq', 'google')
             model: Model name to use
             api_key: API key for the provider
+            on_delta: If given, the response is streamed and each text delta is passed to it.
+                Streaming always tailors the whole document, so the deltas are LaTeX.
+            incremental: Send only the resume's bullet points and splice the model's patch
+                back into the source, when the resume layout is recognised
             **kwargs: Additional arguments to pass to the LLM service
             
         Returns:
@@ -107,22 +159,38 @@ Please provide the tailored resume in LaTeX format, maintaining all the original
         # Read the base resume
         resume_content = self.read_resume_base(resume_path)
         
-        # Create the tailoring prompt
-        prompt = self.create_tailoring_prompt(job_data, resume_content)
+        # Create the tailoring request
+        request, finish = self.create_generation_request(
+            job_data, resume_content, incremental=incremental and on_delta is None
+        )
         
         # Generate the tailored resume using LLM
-        tailored_resume = generate_text(
-            prompt=prompt,
-            provider=provider,
-            model=model,
-            api_key=api_key,
-            system_prompt="You are an expert resume writer and LaTeX specialist. Your task is to tailor resumes for specific job positions while maintaining the original LaTeX formatting and structure.",
-            temperature=0.7,
-            max_tokens=4000,
-            **kwargs
-        )
+        generate = generate_text if on_delta is None else partial(generate_text_streaming, on_delta)
+        with telemetry_labels(task='resume'):
+            reply = generate(
+                provider=provider,
+                model=model,
+                api_key=api_key,
+                temperature=0.7,
+                **request,
+                **kwargs
+            )
         
-        return tailored_resume
+        try:
+            return finish(reply)
+        except PatchError as e:
+            logger.warning(f"Could not apply the model's patch, tailoring the whole resume instead: {e}")
+        request, finish = self.create_generation_request(job_data, resume_content, incremental=False)
+        with telemetry_labels(task='resume'):
+            reply = generate_text(
+                provider=provider,
+                model=model,
+                api_key=api_key,
+                temperature=0.7,
+                **request,
+                **kwargs
+            )
+        return finish(reply)
 
     def save_tailored_resume(
         self,
@@ -151,7 +219,9 @@ Please provide the tailored resume in LaTeX format, maintaining all the original
         llm_provider: str,
         api_key: Optional[str],
         primary_resume_path: str,
-        output_dir: str
+        output_dir: str,
+        on_delta: Optional[Callable[[str], None]] = None,
+        incremental: bool = True
     ) -> str:
         """
         Generate a tailored resume based on job data and primary resume.
@@ -162,45 +232,189 @@ Please provide the tailored resume in LaTeX format, maintaining all the original
             api_key: API key for the LLM provider
             primary_resume_path: Path to the primary resume file
             output_dir: Directory to save the generated resume
+            on_delta: If given, the response is streamed and each text delta is passed to it
+            incremental: Tailor only the bullet points, as in tailor_resume
             
         Returns:
             Path to the generated resume file
         """
-        try:
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Generate filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"tailored_resume_{timestamp}.tex"
-            output_path = os.path.join(output_dir, filename)
-
-            # Generate the tailored resume using the LLM
-            tailored_content = self.tailor_resume(
-                resume_path=primary_resume_path,
-                job_data=job_data,
-                provider=llm_provider,
-                api_key=api_key
-            )
-        
-            # Save the tailored resume
-            self.save_tailored_resume(tailored_content, output_path, job_data)
-        
-            return output_path
+        os.makedirs(output_dir, exist_ok=True)
 
-        except Exception as e:
-            print(json.dumps({'error': str(e)}))
-            raise
+        # Generate filename with timestamp
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"tailored_resume_{timestamp}.tex"
+        output_path = os.path.join(output_dir, filename)
+
+        # Generate the tailored resume using the LLM
+        tailored_content = self.tailor_resume(
+            resume_path=primary_resume_path,
+            job_data=job_data,
+            provider=llm_provider,
+            api_key=api_key,
+            on_delta=on_delta,
+            incremental=incremental
+        )
+
+        # Save the tailored resume
+        self.save_tailored_resume(tailored_content, output_path, job_data)
+
+        return output_path
+
+    async def tailor_batch(
+        self,
+        job_lines: Iterable[str],
+        llm_provider: str,
+        api_key: Optional[str],
+        primary_resume_path: str,
+        output_dir: str,
+        model: str = "gpt-4-turbo-preview",
+        concurrency: int = 4,
+        requests_per_minute: Optional[float] = None,
+        incremental: bool = True,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Tailor the primary resume for every job in a stream of JSON lines.
+
+        The base resume is read and parsed once and leads every prompt, so providers serve
+        it from their prompt cache after the first job. Jobs are started as their lines are read, with at most
+        `concurrency` LLM calls in flight and, if requests_per_minute is set, starts spaced
+        to stay under that rate. Each resume is saved as soon as it is generated, and a
+        failed or malformed job only produces an error result for that job.
+
+        Args:
+            job_lines: Lines of JSON job data, e.g. an open JSONL file or sys.stdin
+            llm_provider: Name of the LLM provider to use
+            api_key: API key for the LLM provider
+            primary_resume_path: Path to the primary resume file
+            output_dir: Directory to save the generated resumes
+            model: Model name to use
+            concurrency: Maximum number of LLM calls in flight
+            requests_per_minute: Optional limit on how often LLM calls are started
+            incremental: Tailor only the bullet points, as in tailor_resume
+            on_result: Called with each job's result as soon as it finishes
+
+        Returns:
+            One result per job in completion order, each with the job's 'index' (its line
+            number among non-empty lines) and either 'output_path' or 'error'
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        resume_content = self.read_resume_base(primary_resume_path)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        semaphore = asyncio.Semaphore(concurrency)
+        start_lock = asyncio.Lock()
+        min_interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        next_start = time.monotonic()
+        results = []
+
+        async def wait_for_start_slot() -> None:
+            nonlocal next_start
+            async with start_lock:
+                delay = next_start - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_start = max(next_start, time.monotonic()) + min_interval
+
+        async def run(index: int, line: str) -> None:
+            result: Dict[str, Any] = {'index': index}
+            try:
+                job_data = json.loads(line)
+                if job_data.get('id') is not None:
+                    result['job_id'] = job_data['id']
+                request, finish = self.create_generation_request(job_data, resume_content, incremental)
+                tailored_content = None
+                while tailored_content is None:
+                    async with semaphore:
+                        await wait_for_start_slot()
+                        with telemetry_labels(task='resume', job_id=job_data.get('id')):
+                            reply = await generate_text_async(
+                                provider=llm_provider,
+                                model=model,
+                                api_key=api_key,
+                                temperature=0.7,
+                                **request
+                            )
+                    try:
+                        tailored_content = finish(reply)
+                    except PatchError as e:
+                        # The full-document request returns the reply as is, so this retries once
+                        logger.warning(f"Could not apply the patch for job {index}, tailoring the whole resume instead: {e}")
+                        request, finish = self.create_generation_request(job_data, resume_content, incremental=False)
+                output_path = os.path.join(output_dir, f"tailored_resume_{timestamp}_{index}.tex")
+                self.save_tailored_resume(tailored_content, output_path, job_data)
+                result['output_path'] = output_path
+            except Exception as e:
+                logger.error(f"Tailoring job {index} failed: {e}")
+                result['error'] = str(e)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+        # Read lines off the event loop so a slow stdin producer does not block running jobs
+        lines = iter(job_lines)
+        tasks = []
+        index = 0
+        while True:
+            line = await asyncio.to_thread(next, lines, None)
+            if line is None:
+                break
+            if not line.strip():
+                continue
+            tasks.append(asyncio.create_task(run(index, line)))
+            index += 1
+        await asyncio.gather(*tasks)
+        return results
 
 if __name__ == '__main__':
+
+    # Logs go to stderr so stdout stays machine-readable
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
     parser = argparse.ArgumentParser(description='Generate a tailored resume')
-    parser.add_argument('--job-data', type=str, required=True, help='JSON string of job data')
+    jobs = parser.add_mutually_exclusive_group(required=True)
+    jobs.add_argument('--job-data', type=str, help='JSON string of job data')
+    jobs.add_argument('--jobs-file', type=str, help="JSONL file of jobs to tailor in one batch, or '-' for stdin")
     parser.add_argument('--llm-provider', type=str, required=True, help='LLM provider to use')
     parser.add_argument('--api-key', type=str, help='API key for the LLM provider')
     parser.add_argument('--primary-resume', type=str, required=True, help='Path to primary resume')
     parser.add_argument('--output-dir', type=str, required=True, help='Output directory')
+    parser.add_argument('--stream', action='store_true', help='Write text deltas to stdout as NDJSON events')
+    parser.add_argument('--full-document', action='store_true',
+                        help='Send the whole resume to the model instead of only its bullet points')
+    parser.add_argument('--concurrency', type=int, default=4, help='Batch mode: maximum LLM calls in flight')
+    parser.add_argument('--requests-per-minute', type=float, help='Batch mode: maximum LLM calls started per minute')
 
     args = parser.parse_args()
 
+    if args.jobs_file:
+        # Batch mode writes one NDJSON result line per job as each one finishes
+        def print_result(result: Dict[str, Any]) -> None:
+            print(json.dumps(result), flush=True)
+
+        try:
+            jobs_file = sys.stdin if args.jobs_file == '-' else open(args.jobs_file, 'r')
+            with jobs_file:
+                results = asyncio.run(resume_tailor().tailor_batch(
+                    job_lines=jobs_file,
+                    llm_provider=args.llm_provider,
+                    api_key=args.api_key,
+                    primary_resume_path=args.primary_resume,
+                    output_dir=args.output_dir,
+                    concurrency=args.concurrency,
+                    requests_per_minute=args.requests_per_minute,
+                    incremental=not args.full_document,
+                    on_result=print_result
+                ))
+        except Exception as e:
+            print(json.dumps({'error': str(e)}))
+            sys.exit(1)
+        usage_stats.log_stats()
+        resilience_stats.log_stats()
+        rate_limit_stats.log_stats()
+        # Only fail the run when no job succeeded
+        if results and all('error' in result for result in results):
+            sys.exit(1)
+        sys.exit(0)
+
     try:
         job_data = json.loads(args.job_data)
         tailor = resume_tailor()
@@ -209,9 +423,14 @@ if __name__ == '__main__':
             llm_provider=args.llm_provider,
             api_key=args.api_key,
             primary_resume_path=args.primary_resume,
-            output_dir=args.output_dir
+            output_dir=args.output_dir,
+            on_delta=print_delta_event if args.stream else None,
+            incremental=not args.full_document
         )
-        print(json.dumps({'output_path': output_path}))
+        if args.stream:
+            print(json.dumps({'event': 'done', 'output_path': output_path}))
+        else:
+            print(json.dumps({'output_path': output_path}))
     except Exception as e:
-        print(json.dumps({'error': str(e)}))
+        print(json.dumps({**({'event': 'error'} if args.stream else {}), 'error': str(e)}))
         sys.exit(1) 
\ No newline at end of file
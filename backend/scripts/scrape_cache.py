@@ -0,0 +1,235 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from paths import backend_path
+
+logger = logging.getLogger(__name__)
+
+class CachedScrape:
+    """A cached scrape result for one site and search"""
+    def __init__(self, jobs_df: pd.DataFrame, exhausted: bool, fetched_at: float):
+        self.jobs_df = jobs_df
+        # True when the site returned fewer jobs than asked for, so asking for more is pointless
+        self.exhausted = exhausted
+        self.fetched_at = fetched_at
+
+# Schema metadata key holding a cached scrape's own fields
+METADATA_KEY = b'scrape_cache'
+
+def encode_entry(jobs_df: pd.DataFrame, exhausted: bool, fetched_at: float) -> bytes:
+    """
+    Serialize a cached scrape as an Arrow IPC stream, with its fields in the schema metadata.
+
+    Arrow rather than pickle, so whoever can write to a shared backend such as Redis cannot
+    run code in the processes that read it.
+    """
+    table = pa.Table.from_pandas(jobs_df, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}),
+                METADATA_KEY: json.dumps({'exhausted': exhausted, 'fetched_at': fetched_at}).encode('utf-8')}
+    table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def decode_entry(value: bytes) -> CachedScrape:
+    """Read a cached scrape written by encode_entry; raises on anything malformed"""
+    table = ipc.open_stream(pa.py_buffer(value)).read_all()
+    fields = json.loads(table.schema.metadata[METADATA_KEY])
+    return CachedScrape(table.to_pandas(), bool(fields['exhausted']), float(fields['fetched_at']))
+
+def make_key(site: str, search_term: str, location: str, hours_old: int) -> str:
+    """Build a cache key from the normalized search parameters"""
+    parts = [site.lower(), ' '.join(search_term.lower().split()), ' '.join(location.lower().split()), str(hours_old)]
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+class SQLiteCacheBackend:
+    """Stores cached scrapes in a local SQLite file with LRU eviction by total size"""
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS scrape_cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, '
+                'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call so the per-site worker threads never share one
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str, ttl: float) -> Optional[bytes]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, created_at FROM scrape_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > ttl:
+                conn.execute('DELETE FROM scrape_cache WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE scrape_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO scrape_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (key, value, len(value), now, now)
+            )
+            conn.execute('DELETE FROM scrape_cache WHERE created_at < ?', (now - ttl,))
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM scrape_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute('SELECT key, size FROM scrape_cache ORDER BY accessed_at').fetchall():
+            conn.execute('DELETE FROM scrape_cache WHERE key = ?', (key,))
+            total -= size
+            logger.info(f"Evicted scrape cache entry {key[:12]} ({size} bytes)")
+            if total <= self.max_bytes:
+                break
+
+class RedisCacheBackend:
+    """
+    Stores cached scrapes in Redis. Entries expire with the TTL; size bounding is left to
+    the server's maxmemory policy (e.g. allkeys-lru).
+    """
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_connect_timeout=5)
+        # from_url connects lazily, so check the server now and let create_cache fall back
+        self.client.ping()
+
+    def get(self, key: str, ttl: float) -> Optional[bytes]:
+        return self.client.get(f"scrape_cache:{key}")
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(f"scrape_cache:{key}", value, ex=max(1, int(ttl)))
+
+class ScrapeCache:
+    """Result cache in front of jobspy's scrape_jobs, keyed by site and search parameters"""
+    def __init__(self, backend, ttl: float = 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.top_ups = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, site: str, search_term: str, location: str, hours_old: int) -> Optional[CachedScrape]:
+        try:
+            value = self.backend.get(make_key(site, search_term, location, hours_old), self.ttl)
+            # A truncated, corrupt or foreign entry is a miss, like a failed read
+            return decode_entry(value) if value is not None else None
+        except Exception as e:
+            logger.warning(f"Scrape cache read failed, scraping without it: {e}")
+            return None
+
+    def put(self, site: str, search_term: str, location: str, hours_old: int,
+            jobs_df: pd.DataFrame, exhausted: bool) -> None:
+        try:
+            value = encode_entry(jobs_df, exhausted, time.time())
+            self.backend.set(make_key(site, search_term, location, hours_old), value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Scrape cache write failed: {e}")
+
+    def record(self, outcome: str) -> None:
+        """Count a lookup outcome: 'hit', 'top_up' or 'miss'"""
+        with self._lock:
+            if outcome == 'hit':
+                self.hits += 1
+            elif outcome == 'top_up':
+                self.top_ups += 1
+            else:
+                self.misses += 1
+
+    def log_stats(self) -> None:
+        logger.info(f"Scrape cache: {self.hits} hits, {self.top_ups} top-ups, {self.misses} misses")
+
+    def fetch(self, scrape, site: str, results_wanted: int, search_term: str, location: str,
+              hours_old: int, **scrape_kwargs) -> Tuple[pd.DataFrame, str]:
+        """
+        Return up to results_wanted jobs for a site, scraping only what the cache cannot serve.
+
+        A cached result with fewer jobs than wanted is topped up by scraping the rest with
+        jobspy's offset, and the combined result replaces the cache entry.
+
+        Args:
+            scrape: The scrape_jobs function to call on a miss
+            site: Site name
+            results_wanted: Number of jobs wanted from this site
+            search_term: Job search term
+            location: Job location
+            hours_old: Age window of the postings
+            **scrape_kwargs: Other arguments passed to scrape
+
+        Returns:
+            Tuple of (jobs DataFrame, outcome) where outcome is 'hit', 'top_up' or 'miss'
+        """
+        cached = self.get(site, search_term, location, hours_old)
+        if cached is not None and (len(cached.jobs_df) >= results_wanted or cached.exhausted):
+            self.record('hit')
+            return cached.jobs_df.head(results_wanted).reset_index(drop=True), 'hit'
+
+        offset = len(cached.jobs_df) if cached is not None else 0
+        needed = results_wanted - offset
+        fresh_df = scrape(
+            site_name=[site],
+            search_term=search_term,
+            location=location,
+            hours_old=hours_old,
+            results_wanted=needed,
+            offset=offset,
+            **scrape_kwargs
+        )
+
+        if cached is not None and not cached.jobs_df.empty:
+            frames = [cached.jobs_df] + ([fresh_df] if not fresh_df.empty else [])
+            jobs_df = pd.concat(frames, ignore_index=True)
+            outcome = 'top_up'
+        else:
+            jobs_df = fresh_df
+            outcome = 'miss'
+
+        self.record(outcome)
+        self.put(site, search_term, location, hours_old, jobs_df, exhausted=len(fresh_df) < needed)
+        return jobs_df.head(results_wanted).reset_index(drop=True), outcome
+
+def create_cache(backend: str = 'sqlite', ttl: float = 3600, path: str = backend_path('data/cache/scrape_cache.sqlite3'),
+                 max_mb: float = 256, redis_url: Optional[str] = None) -> ScrapeCache:
+    """
+    Create a scrape cache.
+
+    Args:
+        backend: 'sqlite' for a local file, or 'redis' (falls back to sqlite if unavailable)
+        ttl: Seconds a cached result stays valid
+        path: SQLite file path
+        max_mb: Maximum total size of the SQLite cache before LRU eviction
+        redis_url: Redis URL, defaults to the REDIS_URL environment variable
+
+    Returns:
+        A ScrapeCache instance
+    """
+    if backend == 'redis':
+        try:
+            cache_backend = RedisCacheBackend(redis_url or os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+            return ScrapeCache(cache_backend, ttl)
+        except Exception as e:
+            logger.warning(f"Redis scrape cache unavailable, using SQLite instead: {e}")
+
+    return ScrapeCache(SQLiteCacheBackend(path, int(max_mb * 1024 * 1024)), ttl)
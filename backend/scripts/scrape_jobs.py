@@ -1,10 +1,19 @@
 import sys
 import json
 import logging
+import argparse
+import queue
+import threading
+import time
 import pandas as pd
 from jobspy import scrape_jobs
 from datetime import datetime, date
 import numpy as np
+from scrape_cache import create_cache
+from job_dedup import JobDedupIndex
+from scrape_watermark import ScrapeWatermarks, MAX_HOURS_OLD
+from job_archive import archive_jobs
+from paths import backend_path
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -46,8 +55,99 @@ def row_to_dict(row):
         'companyLogo': clean_value(row.get('company_logo'))
     }
 
-def process_jobs(jobs_df):
-    """Process the jobs DataFrame and return a list of job dictionaries"""
+def is_plain_numeric(dtype):
+    """Whether a column dtype boxes to plain Python bool/int/float values"""
+    return isinstance(dtype, np.dtype) and dtype.kind in 'biuf'
+
+def clean_column(series):
+    """Clean a whole DataFrame column for JSON serialization, same rules as clean_value"""
+    # Box to Python objects the same way iterrows() does on a mixed-dtype frame
+    values = series.to_numpy(dtype=object, copy=True)
+    missing = pd.isna(values)
+    present = values[~missing]
+    missing[~missing] = (present == 'nan') | (present == 'NaN')
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        convert = lambda value: value.isoformat()
+    elif is_plain_numeric(series.dtype) or pd.api.types.infer_dtype(values[~missing], skipna=False) in ('string', 'empty'):
+        # Nothing to convert, only the missing markers need replacing
+        values[missing] = None
+        return values.tolist()
+    else:
+        # Dates, numpy scalars or mixed content: apply the per-value rules
+        convert = clean_value
+
+    return [None if is_missing else convert(value) for value, is_missing in zip(values, missing)]
+
+def get_column(jobs_df, column):
+    """Return the cleaned values of a column, or all None if the column is missing"""
+    if column not in jobs_df.columns:
+        return [None] * len(jobs_df)
+    return clean_column(jobs_df[column])
+
+def columns_to_dicts(jobs_df):
+    """Convert the whole DataFrame column by column, producing the same records as row_to_dict"""
+    columns = (
+        'title', 'company', 'company_url', 'job_url',
+        'location_country', 'location_city', 'location_state',
+        'is_remote', 'description', 'job_type',
+        'salary_interval', 'salary_min_amount', 'salary_max_amount', 'salary_currency',
+        'date_posted', 'company_industry', 'company_logo'
+    )
+    return [
+        {
+            'title': title,
+            'company': company,
+            'companyUrl': company_url,
+            'jobUrl': job_url,
+            'location': {
+                'country': country,
+                'city': city,
+                'state': state
+            },
+            'isRemote': is_remote,
+            'description': description,
+            'jobType': job_type,
+            'salary': {
+                'interval': interval,
+                'minAmount': min_amount,
+                'maxAmount': max_amount,
+                'currency': currency
+            },
+            'datePosted': date_posted,
+            'companyIndustry': company_industry,
+            'companyLogo': company_logo
+        }
+        for (
+            title, company, company_url, job_url,
+            country, city, state,
+            is_remote, description, job_type,
+            interval, min_amount, max_amount, currency,
+            date_posted, company_industry, company_logo
+        ) in zip(*(get_column(jobs_df, column) for column in columns))
+    ]
+
+def iter_jobs(jobs_df, chunk_size=500):
+    """Yield job dictionaries chunk by chunk so only one chunk is held in memory"""
+    for start in range(0, len(jobs_df), chunk_size):
+        yield from process_jobs(jobs_df.iloc[start:start + chunk_size])
+
+def write_ndjson(jobs_df, out=None, dedup=None, written_jobs=None):
+    """Write one job per line, flushing after each so readers can consume them as they arrive"""
+    out = out or sys.stdout
+    count = 0
+    for job in iter_jobs(jobs_df):
+        if dedup is not None and not dedup.add(job):
+            continue
+        out.write(json.dumps(job, default=str) + '\n')
+        out.flush()
+        if written_jobs is not None:
+            written_jobs.append(job)
+        count += 1
+    return count
+
+def process_jobs_rowwise(jobs_df):
+    """Process the jobs DataFrame one row at a time (reference path, skips rows that fail)"""
     if jobs_df.empty:
         return []
     
@@ -62,32 +162,223 @@ def process_jobs(jobs_df):
     
     return jobs
 
-def main():
+def process_jobs(jobs_df):
+    """Process the jobs DataFrame and return a list of job dictionaries"""
+    if jobs_df.empty:
+        return []
+
     try:
-        # Get command line arguments
-        search_term = sys.argv[1]
-        location = sys.argv[2]
-        results_wanted = int(sys.argv[3])
-        
-        logger.info(f"Searching for jobs with parameters: search_term={search_term}, location={location}, results_wanted={results_wanted}")
-        
-        # Scrape jobs
-        jobs_df = scrape_jobs(
-            site_name=['indeed', 'linkedin'],
-            search_term=search_term,
-            location=location,
-            results_wanted=results_wanted,
-            hours_old=72,
-            linkedin_fetch_description=True
+        return columns_to_dicts(jobs_df)
+    except Exception as e:
+        # Odd values (e.g. lists in a cell) are handled row by row, dropping only the bad rows
+        logger.warning(f"Column-wise conversion failed, falling back to per-row: {e}")
+        return process_jobs_rowwise(jobs_df)
+
+def scrape_site(site, results, cache=None, **scrape_kwargs):
+    """Scrape a single site and put (site, jobs_df, error, elapsed) on the results queue"""
+    start = time.perf_counter()
+    try:
+        if cache is None:
+            jobs_df = scrape_jobs(site_name=[site], **scrape_kwargs)
+        else:
+            jobs_df, outcome = cache.fetch(scrape_jobs, site, **scrape_kwargs)
+            logger.info(f"Scrape cache {outcome} for {site}")
+        results.put((site, jobs_df, None, time.perf_counter() - start))
+    except Exception as e:
+        results.put((site, None, e, time.perf_counter() - start))
+
+def scrape_sites(sites, site_timeout, on_result=None, cache=None, site_kwargs=None, **scrape_kwargs):
+    """
+    Scrape every site in its own worker and collect results as they arrive.
+
+    Args:
+        sites: Site names to scrape (e.g. ['indeed', 'linkedin'])
+        site_timeout: Seconds to wait for each site before giving up on it
+        on_result: Optional callback called with (site, jobs_df) as each site finishes
+        cache: Optional ScrapeCache to serve results from before scraping
+        site_kwargs: Optional per-site overrides of scrape_kwargs, e.g. {'indeed': {'hours_old': 5}}
+        **scrape_kwargs: Arguments passed to jobspy's scrape_jobs
+
+    Returns:
+        Dictionary mapping each site that finished in time to its DataFrame
+    """
+    results = queue.Queue()
+    for site in sites:
+        # Daemon threads so a hung site cannot keep the process alive after we answer
+        threading.Thread(
+            target=scrape_site,
+            args=(site, results, cache),
+            kwargs={**scrape_kwargs, **(site_kwargs or {}).get(site, {})},
+            name=f"scrape-{site}",
+            daemon=True
+        ).start()
+
+    deadline = time.monotonic() + site_timeout
+    pending = set(sites)
+    finished = {}
+    errors = {}
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            site, jobs_df, error, elapsed = results.get(timeout=remaining)
+        except queue.Empty:
+            break
+
+        pending.discard(site)
+        if error is not None:
+            logger.error(f"Scraping {site} failed after {elapsed:.1f}s: {error}")
+            errors[site] = error
+            continue
+
+        logger.info(f"Scraped {len(jobs_df)} jobs from {site} in {elapsed:.1f}s")
+        finished[site] = jobs_df
+        if on_result is not None:
+            on_result(site, jobs_df)
+
+    for site in pending:
+        logger.warning(f"Scraping {site} timed out after {site_timeout}s, returning results from the other sites")
+
+    if errors and not finished:
+        raise RuntimeError('; '.join(f"{site}: {error}" for site, error in errors.items()))
+
+    return finished
+
+def merge_site_results(sites, finished):
+    """Concatenate the per-site DataFrames in the order the sites were requested"""
+    frames = [finished[site] for site in sites if site in finished and not finished[site].empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Scrape job postings and print them as JSON')
+    parser.add_argument('search_term', type=str, help='Job search term')
+    parser.add_argument('location', type=str, help='Job location')
+    parser.add_argument('results_wanted', type=int, help='Number of results wanted per site')
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json',
+                        help='json prints one array at the end, ndjson streams one job per line')
+    parser.add_argument('--sites', type=str, default='indeed,linkedin',
+                        help='Comma-separated list of sites to scrape concurrently')
+    parser.add_argument('--site-timeout', type=float, default=180.0,
+                        help='Seconds to wait for each site before returning without it')
+    parser.add_argument('--no-dedup', action='store_true', help='Keep duplicate postings across sites')
+    parser.add_argument('--no-cache', action='store_true', help='Always scrape, bypassing the result cache')
+    parser.add_argument('--cache-backend', choices=['sqlite', 'redis'], default='sqlite',
+                        help='Where cached results are stored (redis uses REDIS_URL)')
+    parser.add_argument('--cache-ttl', type=float, default=3600.0, help='Seconds a cached result stays valid')
+    parser.add_argument('--cache-max-mb', type=float, default=256.0, help='Maximum size of the SQLite cache')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only ask for postings since the last run of this search and skip ones it already returned')
+    parser.add_argument('--no-archive', dest='archive', action='store_false',
+                        help='Do not add the jobs to the job archive, when JOB_ARCHIVE=1 turns it on')
+    parser.add_argument('--watermark-path', type=str, default=backend_path('data/cache/scrape_watermarks.sqlite3'),
+                        help='SQLite file holding the incremental watermarks and seen postings')
+    return parser.parse_args(argv)
+
+def run_search(args, out=None, cache=None):
+    """
+    Scrape, convert and write jobs for parsed search arguments.
+
+    Args:
+        args: Namespace as returned by parse_args
+        out: File-like object to write the JSON or NDJSON output to, defaults to stdout
+        cache: ScrapeCache to use instead of creating one from args (ignored with no_cache)
+    """
+    out = out or sys.stdout
+    search_term = args.search_term
+    location = args.location
+    results_wanted = args.results_wanted
+    
+    logger.info(f"Searching for jobs with parameters: search_term={search_term}, location={location}, results_wanted={results_wanted}")
+    
+    sites = [site.strip() for site in args.sites.split(',') if site.strip()]
+    scrape_kwargs = dict(
+        search_term=search_term,
+        location=location,
+        results_wanted=results_wanted,
+        hours_old=MAX_HOURS_OLD,
+        linkedin_fetch_description=True
+    )
+    started_at = time.time()
+    watermarks = ScrapeWatermarks(args.watermark_path) if args.incremental else None
+    site_kwargs = None
+    if watermarks is not None:
+        site_kwargs = {site: {'hours_old': watermarks.hours_old(site, search_term, location)} for site in sites}
+        logger.info("Incremental windows: " + ', '.join(f"{site} {kwargs['hours_old']}h" for site, kwargs in site_kwargs.items()))
+
+    def only_new(site, site_df):
+        if watermarks is None:
+            return site_df
+        return watermarks.filter_new(site, search_term, location, site_df)
+
+    def commit(site, site_df):
+        if watermarks is not None:
+            watermarks.commit(site, search_term, location, started_at, site_df)
+
+    if args.no_cache:
+        cache = None
+    elif cache is None:
+        cache = create_cache(
+            backend=args.cache_backend,
+            ttl=args.cache_ttl,
+            max_mb=args.cache_max_mb
         )
-        
-        logger.info(f"Scraped {len(jobs_df)} jobs")
+    dedup = None if args.no_dedup else JobDedupIndex()
+
+    if args.format == 'ndjson':
+        # Stream each site's jobs as soon as that site finishes
+        written = 0
+        def write_site(site, site_df):
+            nonlocal written
+            site_df = only_new(site, site_df)
+            site_jobs = [] if args.archive else None
+            written += write_ndjson(site_df, out=out, dedup=dedup, written_jobs=site_jobs)
+            commit(site, site_df)
+            if site_jobs:
+                archive_jobs(site_jobs, 'scrape')
+
+        scrape_sites(sites, args.site_timeout, on_result=write_site, cache=cache, site_kwargs=site_kwargs, **scrape_kwargs)
+        logger.info(f"Streamed {written} jobs")
+        if dedup is not None:
+            dedup.log_stats()
+        if watermarks is not None:
+            watermarks.log_stats()
+        if cache is not None:
+            cache.log_stats()
+        return
+
+    # Scrape jobs
+    finished = scrape_sites(sites, args.site_timeout, cache=cache, site_kwargs=site_kwargs, **scrape_kwargs)
+    finished = {site: only_new(site, site_df) for site, site_df in finished.items()}
+    jobs_df = merge_site_results(sites, finished)
+    
+    logger.info(f"Scraped {len(jobs_df)} jobs from {len(finished)}/{len(sites)} sites")
+    if cache is not None:
+        cache.log_stats()
+    if watermarks is not None:
+        watermarks.log_stats()
+
+    # Process the jobs
+    processed_jobs = process_jobs(jobs_df)
+    if dedup is not None:
+        processed_jobs = dedup.filter(processed_jobs)
+        dedup.log_stats()
+    
+    # Output the processed jobs
+    out.write(json.dumps(processed_jobs, default=str) + '\n')
+    out.flush()
+    if args.archive:
+        archive_jobs(processed_jobs, 'scrape')
+    for site, site_df in finished.items():
+        commit(site, site_df)
 
-        # Process the jobs
-        processed_jobs = process_jobs(jobs_df)
-        
-        # Output the processed jobs
-        print(json.dumps(processed_jobs, default=str))
+def main():
+    try:
+        # Get command line arguments
+        args = parse_args()
+        run_search(args)
 
     except Exception as e:
         logger.error(f"Error in main: {str(e)}")
@@ -95,4 +386,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
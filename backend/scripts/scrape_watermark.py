@@ -0,0 +1,150 @@
+import os
+import time
+import math
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from job_dedup import normalize_url
+from paths import backend_path
+
+logger = logging.getLogger(__name__)
+
+# jobspy's window for a first search, and the most any search asks for
+MAX_HOURS_OLD = 72
+
+def make_search_key(site: str, search_term: str, location: str) -> str:
+    """Build a watermark key from the normalized search parameters, without the window"""
+    parts = [site.lower(), ' '.join(search_term.lower().split()), ' '.join(location.lower().split())]
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+def url_hash(url: str) -> int:
+    """64-bit hash of a normalized job URL, stored in place of the URL itself"""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+class ScrapeWatermarks:
+    """
+    Remembers, per site and search, when it was last scraped and which postings it returned,
+    so a repeated search only asks for the hours since the last run and drops postings it
+    has already returned before they are converted.
+
+    Postings are stored as 64-bit hashes of their normalized URL and forgotten once they are
+    older than the longest window a search asks for, since no search can return them again.
+    Watermarks only move forward for sites that finished, so a site that failed or timed out
+    is asked for its full gap next time.
+    """
+    def __init__(self, path: str = backend_path('data/cache/scrape_watermarks.sqlite3'), overlap_hours: float = 1.0,
+                 max_hours_old: int = MAX_HOURS_OLD):
+        """
+        Initialize the watermark store.
+
+        Args:
+            path: SQLite file path
+            overlap_hours: Hours added to each window, so postings indexed late by a site are not missed
+            max_hours_old: Window for a search with no watermark, and the most any search asks for
+        """
+        self.path = path
+        self.overlap_hours = overlap_hours
+        self.max_hours_old = max_hours_old
+        self.new: Dict[str, int] = {}
+        self.skipped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS watermarks (key TEXT PRIMARY KEY, scraped_at REAL NOT NULL)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS seen_jobs (key TEXT NOT NULL, url_hash INTEGER NOT NULL, '
+                'seen_at REAL NOT NULL, PRIMARY KEY (key, url_hash)) WITHOUT ROWID'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call so the per-site worker threads never share one
+        return sqlite3.connect(self.path, timeout=30)
+
+    def hours_old(self, site: str, search_term: str, location: str, now: Optional[float] = None) -> int:
+        """Hours of postings to ask a site for: the time since its last scrape plus the overlap"""
+        key = make_search_key(site, search_term, location)
+        with self._connect() as conn:
+            row = conn.execute('SELECT scraped_at FROM watermarks WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return self.max_hours_old
+        elapsed = max(0.0, (now or time.time()) - row[0]) / 3600
+        return max(1, min(self.max_hours_old, math.ceil(elapsed + self.overlap_hours)))
+
+    def job_hashes(self, jobs_df: pd.DataFrame) -> List[Optional[int]]:
+        if jobs_df.empty or 'job_url' not in jobs_df.columns:
+            return [None] * len(jobs_df)
+        hashes = []
+        for value in jobs_df['job_url'].tolist():
+            url = normalize_url(value) if isinstance(value, str) else None
+            hashes.append(url_hash(url) if url else None)
+        return hashes
+
+    def filter_new(self, site: str, search_term: str, location: str, jobs_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drop the postings this search already returned from a site's raw results.
+
+        Args:
+            site: Site the results came from
+            search_term: Search term of the scrape
+            location: Location of the scrape
+            jobs_df: The site's results as returned by jobspy
+
+        Returns:
+            The rows not seen before, in their original order; rows without a URL are kept
+        """
+        hashes = self.job_hashes(jobs_df)
+        known = [value for value in hashes if value is not None]
+        seen = set()
+        if known:
+            key = make_search_key(site, search_term, location)
+            with self._connect() as conn:
+                # In chunks to stay under SQLite's limit on query parameters
+                for start in range(0, len(known), 500):
+                    chunk = known[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    seen.update(row[0] for row in conn.execute(
+                        f'SELECT url_hash FROM seen_jobs WHERE key = ? AND url_hash IN ({placeholders})',
+                        [key, *chunk]
+                    ))
+        keep = [value is None or value not in seen for value in hashes]
+        new_df = jobs_df[keep].reset_index(drop=True) if seen else jobs_df
+        with self._lock:
+            self.new[site] = self.new.get(site, 0) + len(new_df)
+            self.skipped[site] = self.skipped.get(site, 0) + len(jobs_df) - len(new_df)
+        return new_df
+
+    def commit(self, site: str, search_term: str, location: str, started_at: float, jobs_df: pd.DataFrame) -> None:
+        """
+        Record a site's postings as seen and move its watermark to when the scrape started.
+
+        Call this once the postings have been written out, so a run that fails midway is repeated.
+        """
+        key = make_search_key(site, search_term, location)
+        now = time.time()
+        rows = [(key, value, now) for value in self.job_hashes(jobs_df) if value is not None]
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO seen_jobs (key, url_hash, seen_at) VALUES (?, ?, ?)', rows)
+            conn.execute(
+                'INSERT INTO watermarks (key, scraped_at) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET scraped_at = MAX(scraped_at, excluded.scraped_at)',
+                (key, started_at)
+            )
+            retention = (self.max_hours_old + self.overlap_hours) * 3600
+            conn.execute('DELETE FROM seen_jobs WHERE seen_at < ?', (now - retention,))
+
+    def totals(self) -> Tuple[int, int]:
+        """(new, skipped) postings over every site filtered so far"""
+        with self._lock:
+            return sum(self.new.values()), sum(self.skipped.values())
+
+    def log_stats(self) -> None:
+        with self._lock:
+            counts = {site: (self.new.get(site, 0), self.skipped.get(site, 0)) for site in self.new}
+        for site, (new, skipped) in counts.items():
+            logger.info(f"Incremental scrape of {site}: {new} new postings, {skipped} already seen and skipped")
@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import queue
+import asyncio
+import logging
+import time
+import argparse
+import threading
+from typing import Dict, Any, List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel
+import uvicorn
+
+# Add the scripts directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+import scrape_jobs
+from llm_service import load_environment, usage_stats
+from llm_resilience import resilience_stats
+from rate_limiter import rate_limit_stats
+from llm_telemetry import get_telemetry, PrometheusSink, RingBufferSink
+from scrape_cache import create_cache
+from resume_tailor import resume_tailor
+from cover_letter_generator import cover_letter_generator
+from latex_compiler import get_compile_service
+from application_pipeline import application_pipeline
+from job_ranking import JobRankingIndex
+from job_archive import archive_jobs, get_job_archive, job_archive_enabled, retention_from_env
+from prompt_context import read_resume
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_environment()
+
+app = FastAPI(title='JobHunter Python worker')
+
+# Created once per worker process and shared by every request; the LLM clients are
+# shared the same way through llm_service.provider_registry
+tailor = resume_tailor()
+cover_letters = cover_letter_generator()
+compile_service = get_compile_service()
+pipeline = application_pipeline(tailor, cover_letters, compile_service)
+# Jobs scraped through this worker, and with JOB_ARCHIVE on through every worker sharing the
+# archive, ranked on request against a resume; the newest are kept within the limits below
+job_index = JobRankingIndex(
+    max_jobs=int(os.getenv('JOB_INDEX_MAX_JOBS', '50000')) or None,
+    max_age_days=retention_from_env('JOB_INDEX_MAX_AGE_DAYS', '30')
+)
+job_index_loaded_at: Optional[float] = None
+job_index_lock = threading.Lock()
+scrape_cache = None
+scrape_cache_lock = threading.Lock()
+
+def get_scrape_cache():
+    global scrape_cache
+    with scrape_cache_lock:
+        if scrape_cache is None:
+            scrape_cache = create_cache(backend=os.getenv('SCRAPE_CACHE_BACKEND', 'sqlite'))
+        return scrape_cache
+
+def refresh_job_index() -> None:
+    """
+    Add the jobs archived since the last refresh to the ranking index.
+
+    The archive is shared by every worker process, so this is how a worker sees the jobs
+    the others scraped. It runs at most every JOB_INDEX_REFRESH_SECONDS, and only with
+    JOB_ARCHIVE on; the first call loads the archive's postings within the index's limits.
+    """
+    global job_index_loaded_at
+    if not job_archive_enabled():
+        return
+    with job_index_lock:
+        now = time.time()
+        interval = float(os.getenv('JOB_INDEX_REFRESH_SECONDS', '60'))
+        if job_index_loaded_at is not None and now - job_index_loaded_at < interval:
+            return
+        if job_index_loaded_at is not None:
+            # Overlap the last read: a segment is written a moment after its jobs' archived_at,
+            # and jobs read twice are already indexed
+            since = job_index_loaded_at - interval
+        elif job_index.max_age_days is not None:
+            since = now - job_index.max_age_days * 86400
+        else:
+            since = None
+        try:
+            jobs = get_job_archive().recent_jobs(since)
+        except Exception as e:
+            logger.warning(f"Could not load archived jobs into the ranking index: {e}")
+            return
+        job_index_loaded_at = now
+    if job_index.max_jobs is not None:
+        jobs = jobs[:job_index.max_jobs]
+    # Oldest first, so a rebuild past max_jobs keeps the newest
+    added = sum(job_index.add(job, archived_at) for archived_at, job in reversed(jobs))
+    if added:
+        logger.info(f"Added {added} archived jobs to the ranking index")
+
+class ScrapeRequest(BaseModel):
+    search_term: str
+    location: str
+    results_wanted: int = 20
+    format: Literal['json', 'ndjson'] = 'json'
+    sites: str = 'indeed,linkedin'
+    site_timeout: float = 180.0
+    no_cache: bool = False
+    no_dedup: bool = False
+    incremental: bool = False
+
+class TailorRequest(BaseModel):
+    job_data: Dict[str, Any]
+    llm_provider: str
+    api_key: Optional[str] = None
+    primary_resume: str
+    output_dir: str
+    incremental: bool = True
+
+class CoverLetterRequest(BaseModel):
+    job_data: Dict[str, Any]
+    resume_path: str
+    output_dir: str
+    provider: str = 'openai'
+    model: str = 'gpt-4-turbo-preview'
+    api_key: Optional[str] = None
+
+class ApplicationRequest(BaseModel):
+    job_data: Dict[str, Any]
+    llm_provider: str
+    api_key: Optional[str] = None
+    model: str = 'gpt-4-turbo-preview'
+    primary_resume: str
+    output_dir: str
+    incremental: bool = True
+    compile_pdf: bool = True
+
+class RankRequest(BaseModel):
+    primary_resume: str
+    jobs: Optional[List[Dict[str, Any]]] = None
+    limit: int = 20
+
+class CompileRequest(BaseModel):
+    latex_content: str
+    output_dir: str
+    output_filename: str
+    max_pages: Optional[int] = None
+    priority_text: Optional[str] = None
+
+class QueueWriter:
+    """File-like object that hands each write to a queue, so output can be streamed"""
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def write(self, text: str) -> None:
+        self.queue.put(text)
+
+    def flush(self) -> None:
+        pass
+
+@app.get('/health')
+def health():
+    return {'status': 'ok', 'pid': os.getpid()}
+
+@app.get('/metrics')
+def metrics():
+    return {
+        'usage': {f"{provider}/{model}": totals for (provider, model), totals in usage_stats.totals().items()},
+        'resilience': resilience_stats.totals(),
+        'rate_limit': rate_limit_stats.totals(),
+        'pdf_cache': compile_service.pdf_cache.totals() if compile_service.pdf_cache else None
+    }
+
+@app.get('/metrics/prometheus', response_class=PlainTextResponse)
+def prometheus_metrics():
+    sink = get_telemetry().sink(PrometheusSink)
+    if sink is None:
+        raise HTTPException(status_code=404, detail="Add 'prometheus' to LLM_TELEMETRY_SINKS to export metrics")
+    return sink.render()
+
+@app.get('/metrics/calls')
+def recent_calls(limit: int = 100):
+    sink = get_telemetry().sink(RingBufferSink)
+    if sink is None:
+        raise HTTPException(status_code=404, detail="Add 'memory' to LLM_TELEMETRY_SINKS to keep recent calls")
+    return [record.to_dict() for record in sink.snapshot()[-limit:]]
+
+@app.post('/scrape')
+def scrape(request: ScrapeRequest):
+    args = scrape_jobs.parse_args([
+        request.search_term,
+        request.location,
+        str(request.results_wanted),
+        '--format', request.format,
+        '--sites', request.sites,
+        '--site-timeout', str(request.site_timeout)
+    ] + (['--no-cache'] if request.no_cache else []) + (['--no-dedup'] if request.no_dedup else [])
+      + (['--incremental'] if request.incremental else []))
+    cache = None if request.no_cache else get_scrape_cache()
+
+    if request.format != 'ndjson':
+        writer = QueueWriter()
+        try:
+            scrape_jobs.run_search(args, out=writer, cache=cache)
+        except Exception as e:
+            logger.error(f"Scrape failed: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        jobs = json.loads(writer.queue.get())
+        job_index.add_many(jobs)
+        return jobs
+
+    # Run the search in a thread and stream its lines as they are written
+    writer = QueueWriter()
+    done = object()
+
+    def run():
+        try:
+            scrape_jobs.run_search(args, out=writer, cache=cache)
+            writer.queue.put(done)
+        except Exception as e:
+            logger.error(f"Scrape failed: {e}")
+            writer.queue.put(e)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def lines():
+        while True:
+            item = writer.queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                # Abort the response so the client sees an incomplete stream, not a short result
+                raise item
+            job_index.add(json.loads(item))
+            yield item
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+@app.post('/rank')
+def rank_jobs(request: RankRequest):
+    refresh_job_index()
+    job_index.expire()
+    try:
+        if request.jobs:
+            job_index.add_many(request.jobs)
+        results = job_index.rank_resume(read_resume(request.primary_resume), request.limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'indexed': len(job_index), 'results': results}
+
+@app.post('/tailor')
+def tailor_resume(request: TailorRequest):
+    archive_jobs([request.job_data], 'tailor')
+    try:
+        output_path = tailor.generate_tailored_resume(
+            job_data=request.job_data,
+            llm_provider=request.llm_provider,
+            api_key=request.api_key,
+            primary_resume_path=request.primary_resume,
+            output_dir=request.output_dir,
+            incremental=request.incremental
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'output_path': output_path}
+
+@app.post('/cover-letter')
+def cover_letter(request: CoverLetterRequest):
+    archive_jobs([request.job_data], 'cover_letter')
+    try:
+        output_path = cover_letters.generate_tailored_cover_letter(
+            job_data=request.job_data,
+            llm_provider=request.provider,
+            model=request.model,
+            api_key=request.api_key,
+            resume_path=request.resume_path,
+            output_dir=request.output_dir
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'success': True, 'cover_letter_path': output_path, 'error': None}
+
+@app.post('/application')
+async def application(request: ApplicationRequest):
+    await asyncio.to_thread(archive_jobs, [request.job_data], 'application')
+    try:
+        result = await pipeline.generate_application(
+            job_data=request.job_data,
+            llm_provider=request.llm_provider,
+            api_key=request.api_key,
+            resume_path=request.primary_resume,
+            output_dir=request.output_dir,
+            model=request.model,
+            incremental=request.incremental,
+            compile_pdf=request.compile_pdf
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return result
+
+@app.post('/compile')
+def compile_pdf(request: CompileRequest):
+    result = compile_service.compile_document(
+        latex_content=request.latex_content,
+        output_dir=request.output_dir,
+        output_filename=request.output_filename,
+        max_pages=request.max_pages,
+        priority_text=request.priority_text
+    )
+    if result.pdf_path is None:
+        raise HTTPException(status_code=500, detail='LaTeX compilation failed')
+    return {'pdf_path': result.pdf_path, 'pages': result.pages, 'attempts': result.attempts, 'fixes': result.fixes}
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the Python scripts as a long-running worker')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to listen on')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PYTHON_WORKER_PORT', '8765')), help='Port to listen on')
+    parser.add_argument('--uds', type=str, help='Listen on this Unix socket instead of host/port')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('PYTHON_WORKER_PROCESSES', '1')),
+                        help='Number of worker processes')
+    args = parser.parse_args()
+
+    uvicorn.run(
+        'worker_service:app',
+        app_dir=script_dir,
+        host=args.host,
+        port=args.port,
+        uds=args.uds,
+        workers=args.workers
+    )
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import { Request, Response } from 'express';
 import { spawn } from 'child_process';
 import { prisma } from '../lib/prisma';
+import { isPythonWorkerEnabled, callPythonWorker } from '../lib/pythonWorker';
 import path from 'path';
 import fs from 'fs';
 
@@ -109,6 +110,56 @@ export const generateCoverLetter = async (req: Request, res: Response): Promise<
             fs.mkdirSync(outputDir, { recursive: true });
         }
 
+        // Clean up temporary resume file
+        const removeTempResume = () => {
+            try {
+                fs.unlinkSync(tempResumePath);
+            } catch (err) {
+                console.error('Error cleaning up temporary resume file:', err);
+            }
+        };
+
+        const saveCoverLetter = async (coverLetterPath: string) => {
+            // Save the cover letter record in the database
+            const coverLetter = await prisma.coverLetter.create({
+                data: {
+                    userId,
+                    jobId,
+                    filePath: coverLetterPath,
+                    fileName: path.basename(coverLetterPath)
+                }
+            });
+
+            res.json({
+                success: true,
+                coverLetterId: coverLetter.id,
+                fileName: coverLetter.fileName
+            });
+        };
+
+        // Use the resident Python worker when one is configured
+        if (isPythonWorkerEnabled()) {
+            let result: any;
+            try {
+                result = await callPythonWorker('/cover-letter', {
+                    job_data: jobData,
+                    resume_path: tempResumePath,
+                    output_dir: outputDir,
+                    provider,
+                    model,
+                    api_key: apiKey
+                });
+            } catch (err) {
+                console.error('Cover letter generation failed:', err);
+                res.status(500).json({ error: 'Failed to generate cover letter' });
+                return;
+            } finally {
+                removeTempResume();
+            }
+            await saveCoverLetter(result.cover_letter_path);
+            return;
+        }
+
         const pythonProcess = spawn('python3', [
             scriptPath,
             '--resume_path', tempResumePath,
@@ -131,12 +182,7 @@ export const generateCoverLetter = async (req: Request, res: Response): Promise<
         });
 
         pythonProcess.on('close', async (code) => {
-            // Clean up temporary resume file
-            try {
-                fs.unlinkSync(tempResumePath);
-            } catch (err) {
-                console.error('Error cleaning up temporary resume file:', err);
-            }
+            removeTempResume();
 
             if (code !== 0) {
                 console.error('Cover letter generation failed:', error);
@@ -146,23 +192,7 @@ export const generateCoverLetter = async (req: Request, res: Response): Promise<
 
             try {
                 const result = JSON.parse(output);
-                const coverLetterPath = result.cover_letter_path;
-
-                // Save the cover letter record in the database
-                const coverLetter = await prisma.coverLetter.create({
-                    data: {
-                        userId,
-                        jobId,
-                        filePath: coverLetterPath,
-                        fileName: path.basename(coverLetterPath)
-                    }
-                });
-
-                res.json({
-                    success: true,
-                    coverLetterId: coverLetter.id,
-                    fileName: coverLetter.fileName
-                });
+                await saveCoverLetter(result.cover_letter_path);
             } catch (err) {
                 console.error('Error parsing cover letter generator output:', err);
                 res.status(500).json({ error: 'Failed to process cover letter' });
@@ -2,9 +2,40 @@ import { Request, Response } from 'express';
 import { PrismaClient } from '@prisma/client';
 import { spawn } from 'child_process';
 import path from 'path';
+import { isPythonWorkerEnabled, postToPythonWorker } from '../lib/pythonWorker';
 
 const prisma = new PrismaClient();
 
+const saveJob = async (job: any, userId: string) => {
+  try {
+    return await prisma.jobPost.create({
+      data: {
+        title: job.title || '',
+        company: job.company || '',
+        companyUrl: job.companyUrl || null,
+        jobUrl: job.jobUrl || '',
+        country: job.location?.country || null,
+        city: job.location?.city || null,
+        state: job.location?.state || null,
+        isRemote: job.isRemote || false,
+        description: job.description || '',
+        jobType: job.jobType || '',
+        salaryInterval: job.salary?.interval || null,
+        salaryMinAmount: job.salary?.minAmount || null,
+        salaryMaxAmount: job.salary?.maxAmount || null,
+        salaryCurrency: job.salary?.currency || null,
+        datePosted: job.datePosted ? new Date(job.datePosted) : new Date(),
+        companyIndustry: job.companyIndustry || null,
+        companyLogo: job.companyLogo || null,
+        userId: userId // Use userId directly instead of connect
+      }
+    });
+  } catch (error) {
+    console.error('Error saving job:', error);
+    return null;
+  }
+};
+
 export const searchJobs = async (req: Request, res: Response): Promise<void> => {
   try {
     const userId = req.user?.id;
@@ -30,21 +61,95 @@ export const searchJobs = async (req: Request, res: Response): Promise<void> =>
       return;
     }
 
-    // Run the Python script
+    let pendingOutput = '';
+    let scriptError = '';
+    let parseFailed = false;
+    const pendingSaves: Promise<any>[] = [];
+
+    // Start saving each job as soon as its line arrives
+    const handleLine = (line: string) => {
+      if (!line.trim()) {
+        return;
+      }
+      try {
+        pendingSaves.push(saveJob(JSON.parse(line), userId));
+      } catch (error) {
+        console.error('Error parsing job line:', error);
+        parseFailed = true;
+      }
+    };
+
+    const handleData = (data: Buffer) => {
+      pendingOutput += data.toString();
+      const lines = pendingOutput.split('\n');
+      pendingOutput = lines.pop() || '';
+      lines.forEach(handleLine);
+    };
+
+    const finish = async (failed: boolean) => {
+      handleLine(pendingOutput);
+
+      // Wait for the saves already in flight
+      const savedJobs = await Promise.all(pendingSaves);
+
+      // Filter out any null values from failed saves
+      const successfulJobs = savedJobs.filter(job => job !== null);
+
+      if (failed || parseFailed) {
+        console.error('Python script error:', scriptError);
+        if (successfulJobs.length === 0) {
+          res.status(500).json({ error: 'Failed to process job data' });
+          return;
+        }
+        // Jobs streamed before the failure are already saved, so report them rather than fail the search
+        res.status(207).json({
+          jobs: successfulJobs,
+          savedCount: successfulJobs.length,
+          warning: failed
+            ? 'The job search stopped early; only the jobs found before the failure were saved'
+            : 'Some jobs could not be read and were skipped'
+        });
+        return;
+      }
+
+      res.json(successfulJobs);
+    };
+
+    // Use the resident Python worker when one is configured
+    if (isPythonWorkerEnabled()) {
+      try {
+        const response = await postToPythonWorker('/scrape', {
+          search_term,
+          location,
+          results_wanted: results_wanted || 20,
+          format: 'ndjson'
+        });
+        if (response.statusCode === 200) {
+          response.on('data', handleData);
+        } else {
+          response.on('data', (data) => { scriptError += data.toString(); });
+        }
+        // An aborted stream means the search failed part way through
+        response.on('close', () => finish(response.statusCode !== 200 || !response.complete));
+      } catch (error) {
+        scriptError = String(error);
+        await finish(true);
+      }
+      return;
+    }
+
+    // Otherwise run the Python script, streaming one job per line
     const pythonProcess = spawn('python3', [
       path.join(__dirname, '../../scripts/scrape_jobs.py'),
       search_term,
       location,
-      (results_wanted || 20).toString()
+      (results_wanted || 20).toString(),
+      '--format',
+      'ndjson'
     ]);
 
-    let scriptOutput = '';
-    let scriptError = '';
-
     // Collect data from stdout
-    pythonProcess.stdout.on('data', (data) => {
-      scriptOutput += data.toString();
-    });
+    pythonProcess.stdout.on('data', handleData);
 
     // Collect data from stderr
     pythonProcess.stderr.on('data', (data) => {
@@ -53,59 +158,7 @@ export const searchJobs = async (req: Request, res: Response): Promise<void> =>
     });
 
     // Handle process completion
-    pythonProcess.on('close', async (code) => {
-      if (code !== 0) {
-        console.error('Python script error:', scriptError);
-        res.status(500).json({ error: 'Failed to process job data' });
-        return;
-      }
-
-      try {
-        // Parse the job data
-        const jobData = JSON.parse(scriptOutput);
-        
-        // Save jobs to database
-        const savedJobs = await Promise.all(
-          jobData.map(async (job: any) => {
-            try {
-              return await prisma.jobPost.create({
-                data: {
-                  title: job.title || '',
-                  company: job.company || '',
-                  companyUrl: job.companyUrl || null,
-                  jobUrl: job.jobUrl || '',
-                  country: job.location?.country || null,
-                  city: job.location?.city || null,
-                  state: job.location?.state || null,
-                  isRemote: job.isRemote || false,
-                  description: job.description || '',
-                  jobType: job.jobType || '',
-                  salaryInterval: job.salary?.interval || null,
-                  salaryMinAmount: job.salary?.minAmount || null,
-                  salaryMaxAmount: job.salary?.maxAmount || null,
-                  salaryCurrency: job.salary?.currency || null,
-                  datePosted: job.datePosted ? new Date(job.datePosted) : new Date(),
-                  companyIndustry: job.companyIndustry || null,
-                  companyLogo: job.companyLogo || null,
-                  userId: userId // Use userId directly instead of connect
-                }
-              });
-            } catch (error) {
-              console.error('Error saving job:', error);
-              return null;
-            }
-          })
-        );
-
-        // Filter out any null values from failed saves
-        const successfulJobs = savedJobs.filter(job => job !== null);
-        
-        res.json(successfulJobs);
-      } catch (error) {
-        console.error('Error processing jobs:', error);
-        res.status(500).json({ error: 'Failed to process job data' });
-      }
-    });
+    pythonProcess.on('close', (code) => finish(code !== 0));
 
   } catch (error) {
     console.error('Error in searchJobs:', error);
@@ -0,0 +1,48 @@
+import http, { IncomingMessage } from 'http';
+
+// PYTHON_WORKER_URL is either an http URL (http://127.0.0.1:8765) or a Unix socket (unix:/tmp/worker.sock)
+const workerUrl = process.env.PYTHON_WORKER_URL;
+
+export const isPythonWorkerEnabled = (): boolean => Boolean(workerUrl);
+
+// Keep connections to the worker open between requests
+const agent = new http.Agent({ keepAlive: true });
+
+const requestOptions = (route: string): http.RequestOptions => {
+  if (workerUrl!.startsWith('unix:')) {
+    return { socketPath: workerUrl!.slice('unix:'.length), path: route };
+  }
+  const url = new URL(route, workerUrl);
+  return { hostname: url.hostname, port: url.port, path: url.pathname };
+};
+
+// POST a JSON body to the worker and resolve with the response stream
+export const postToPythonWorker = (route: string, body: unknown): Promise<IncomingMessage> => {
+  const payload = JSON.stringify(body);
+  return new Promise((resolve, reject) => {
+    const req = http.request({
+      ...requestOptions(route),
+      method: 'POST',
+      agent,
+      headers: {
+        'Content-Type': 'application/json',
+        'Content-Length': Buffer.byteLength(payload)
+      }
+    }, resolve);
+    req.on('error', reject);
+    req.end(payload);
+  });
+};
+
+// POST to the worker and parse the JSON response, rejecting on a non-2xx status
+export const callPythonWorker = async (route: string, body: unknown): Promise<any> => {
+  const response = await postToPythonWorker(route, body);
+  let text = '';
+  for await (const chunk of response) {
+    text += chunk.toString();
+  }
+  if (!response.statusCode || response.statusCode >= 300) {
+    throw new Error(`Python worker ${route} failed with ${response.statusCode}: ${text}`);
+  }
+  return JSON.parse(text);
+};
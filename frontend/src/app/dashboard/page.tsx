@@ -108,7 +108,12 @@ export default function Dashboard() {
       }
 
       const data = await response.json();
-      setJobs(prevJobs => [...data, ...prevJobs]);
+      // A search that failed part way returns the jobs saved before the failure with a warning
+      const newJobs = Array.isArray(data) ? data : data.jobs;
+      if (!Array.isArray(data) && data.warning) {
+        setError(`${data.warning} (${data.savedCount} saved)`);
+      }
+      setJobs(prevJobs => [...newJobs, ...prevJobs]);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An error occurred');
     } finally {